@@ -1,18 +1,33 @@
 from __future__ import annotations
 
+import asyncio
 import hashlib
+import heapq
+import os
 import secrets
+import threading
+import zlib
+from array import array
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import Dict
+from typing import Dict, List, Sequence
 
 from xagent2.identity_api.core import (
+    AsyncPasswordHasher,
+    AsyncSessionStore,
+    AsyncUserRepository,
     Clock,
+    HasherOverloaded,
     IdGenerator,
     PasswordHasher,
     Session,
     SessionStore,
     User,
+    UserAlreadyExists,
     UserRepository,
+    from_epoch_micros,
+    to_epoch_micros,
 )
 
 
@@ -40,31 +55,554 @@ class SimplePasswordHasher(PasswordHasher):
         return self.hash_password(password) == password_hash
 
 
-class InMemoryUserRepo(UserRepository):
+def _hash_in_worker(hasher: PasswordHasher, password: str) -> str:
+    return hasher.hash_password(password)
+
+
+def _hash_many_in_worker(hasher: PasswordHasher, passwords: Sequence[str]) -> list[str]:
+    return [hasher.hash_password(p) for p in passwords]
+
+
+def _verify_in_worker(hasher: PasswordHasher, password: str, password_hash: str) -> bool:
+    return hasher.verify_password(password, password_hash)
+
+
+class ProcessPoolPasswordHasher(PasswordHasher):
+    """
+    Runs a CPU-heavy hasher on a dedicated process pool.
+
+    At most max_pending jobs may be queued or running; beyond that new work
+    is rejected with HasherOverloaded instead of piling up. hash_many (bulk
+    imports) splits its input into chunks spread over all workers; each
+    chunk is one job, so a bulk import is shed under load like anything else.
+    The wrapped hasher must be picklable (a module-level class).
+    """
+
+    def __init__(
+        self,
+        inner: PasswordHasher,
+        *,
+        max_workers: int | None = None,
+        max_pending: int = 64,
+    ) -> None:
+        if max_pending <= 0:
+            raise ValueError("max_pending must be positive")
+        self._inner = inner
+        self._pool = ProcessPoolExecutor(max_workers=max_workers)
+        self._workers = max_workers or os.cpu_count() or 1
+        self._max_pending = max_pending
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    def submit_hash(self, password: str) -> Future[str]:
+        return self._submit(_hash_in_worker, self._inner, password)
+
+    def submit_verify(self, password: str, password_hash: str) -> Future[bool]:
+        return self._submit(_verify_in_worker, self._inner, password, password_hash)
+
+    def hash_password(self, password: str) -> str:
+        return self.submit_hash(password).result()
+
+    def verify_password(self, password: str, password_hash: str) -> bool:
+        return self.submit_verify(password, password_hash).result()
+
+    def submit_hash_many(self, passwords: Sequence[str]) -> list[Future[list[str]]]:
+        """
+        Raises HasherOverloaded, with nothing left queued, when the chunks
+        don't all fit in the queue.
+        """
+        # A few chunks per worker keeps them all busy without paying a
+        # pickling round trip per password; never more chunks than slots.
+        chunks = max(1, min(4 * self._workers, self._max_pending))
+        size = max(1, -(-len(passwords) // chunks))
+        futures: list[Future[list[str]]] = []
+        try:
+            for i in range(0, len(passwords), size):
+                futures.append(
+                    self._submit(_hash_many_in_worker, self._inner, passwords[i : i + size])
+                )
+        except HasherOverloaded:
+            for fut in futures:
+                fut.cancel()
+            raise
+        return futures
+
+    def hash_many(self, passwords: Sequence[str]) -> list[str]:
+        return [h for fut in self.submit_hash_many(passwords) for h in fut.result()]
+
+    def warm_up(self) -> None:
+        """Starts the workers and has each import the hasher, ahead of real traffic."""
+        self.hash_many(["warm-up"] * self._workers)
+
+    def as_async(self) -> AsyncPasswordHasher:
+        return _AsyncPoolPasswordHasher(self)
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+    def _submit(self, fn, *args) -> Future:
+        if not self._slots.acquire(blocking=False):
+            raise HasherOverloaded("password hashing queue is full")
+        try:
+            fut = self._pool.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        fut.add_done_callback(lambda _: self._slots.release())
+        return fut
+
+
+class _AsyncPoolPasswordHasher(AsyncPasswordHasher):
+    def __init__(self, pool: ProcessPoolPasswordHasher) -> None:
+        self._pool = pool
+
+    async def hash_password(self, password: str) -> str:
+        return await asyncio.wrap_future(self._pool.submit_hash(password))
+
+    async def verify_password(self, password: str, password_hash: str) -> bool:
+        return await asyncio.wrap_future(self._pool.submit_verify(password, password_hash))
+
+    async def hash_many(self, passwords: Sequence[str]) -> list[str]:
+        chunks = await asyncio.gather(
+            *(asyncio.wrap_future(f) for f in self._pool.submit_hash_many(passwords))
+        )
+        return [h for chunk in chunks for h in chunk]
+
+
+def _stripe(key: str, n: int) -> int:
+    return zlib.crc32(key.encode("utf-8")) % n
+
+
+class _UserStripe:
+    __slots__ = ("lock", "by_email")
+
     def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.by_email: Dict[str, User] = {}
+
+
+class InMemoryUserRepo(UserRepository):
+    """
+    Thread-safe user repository, lock-striped by email.
+
+    Emails hash to one of `stripes` stripes, each with its own dict and
+    lock, so create_if_absent is atomic per email while signups for other
+    emails proceed in parallel (on free-threaded Python too). Reads take no
+    lock, and a new user goes into the shared by-id dict before its email
+    stripe: a concurrent reader may briefly find it by id but not yet by
+    email, never the other way round.
+    """
+
+    def __init__(self, *, stripes: int = 64) -> None:
+        if stripes <= 0:
+            raise ValueError("stripes must be positive")
+        self._stripes = tuple(_UserStripe() for _ in range(stripes))
         self._by_id: Dict[str, User] = {}
-        self._by_email: Dict[str, User] = {}
 
     def get_by_email(self, email: str) -> User | None:
-        return self._by_email.get(email)
+        return self._stripes[_stripe(email, len(self._stripes))].by_email.get(email)
 
     def get_by_id(self, user_id: str) -> User | None:
         return self._by_id.get(user_id)
 
     def create(self, user: User) -> None:
-        self._by_id[user.user_id] = user
-        self._by_email[user.email] = user
+        if not self.create_if_absent(user):
+            raise UserAlreadyExists()
+
+    def create_if_absent(self, user: User) -> bool:
+        stripe = self._stripes[_stripe(user.email, len(self._stripes))]
+        with stripe.lock:
+            if user.email in stripe.by_email:
+                return False
+            self._by_id[user.user_id] = user
+            stripe.by_email[user.email] = user
+            return True
+
+    def create_many(self, users: Sequence[User]) -> list[bool]:
+        return [self.create_if_absent(user) for user in users]
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+
+@dataclass(frozen=True)
+class SessionStoreStats:
+    size: int
+    expired_evicted: int
+    capacity_evicted: int
+
+
+_SLOT_BITS = 32
+_SLOT_MASK = (1 << _SLOT_BITS) - 1
 
 
 class InMemorySessionStore(SessionStore):
-    def __init__(self) -> None:
-        self._sessions: Dict[str, Session] = {}
+    """
+    Session store ordered by expiry, in a compact struct-of-arrays layout.
+
+    Each stored session is a slot: creation and expiry times as epoch
+    microseconds in int64 arrays, and its user as an index into an interned
+    user table. Session objects are only built when get_session hands one
+    out. Each user's sessions are chained through the slots in a doubly
+    linked list, so delete_sessions_for_user touches only that user's.
+
+    A min-heap of (expires_at, slot) keys packed into single ints orders the
+    sessions by expiry. Every write sweeps a bounded number of expired
+    entries off the top of the heap, so idle sessions are reclaimed without
+    anyone looking them up again. When max_sessions is set, the sessions
+    closest to expiry are evicted first.
+    """
+
+    def __init__(
+        self,
+        *,
+        clock: Clock | None = None,
+        max_sessions: int | None = None,
+        sweep_batch: int = 64,
+    ) -> None:
+        if max_sessions is not None and max_sessions <= 0:
+            raise ValueError("max_sessions must be positive")
+        if sweep_batch <= 0:
+            raise ValueError("sweep_batch must be positive")
+        self._clock = clock or UtcClock()
+        self._max_sessions = max_sessions
+        self._sweep_batch = sweep_batch
+        # Session slots. A free slot has _session_ids[slot] None and sits on
+        # _free_slots.
+        self._slot_of: Dict[str, int] = {}
+        self._session_ids: List[str | None] = []
+        self._created = array("q")
+        self._expires = array("q")
+        self._user_of = array("i")
+        self._next = array("i")  # next/previous slot of the same user, -1 at the ends
+        self._prev = array("i")
+        self._free_slots: List[int] = []
+        # Interned users: index -> user_id, head slot of its list, session count.
+        self._user_index: Dict[str, int] = {}
+        self._user_ids: List[str | None] = []
+        self._user_head = array("i")
+        self._user_sessions = array("I")
+        self._free_users: List[int] = []
+        # Heap keys are expires_us << 32 | slot. Entries are removed lazily:
+        # deleted or replaced sessions leave a stale key behind that is
+        # skipped when it reaches the top.
+        self._expiry_heap: List[int] = []
+        self._lock = threading.Lock()
+        self._expired_evicted = 0
+        self._capacity_evicted = 0
+
+    def create_session(self, session: Session) -> None:
+        expires_us = to_epoch_micros(session.expires_at)
+        with self._lock:
+            self._remove_locked(session.session_id)
+            slot = self._new_slot_locked()
+            user = self._intern_user_locked(session.user_id)
+            self._slot_of[session.session_id] = slot
+            self._session_ids[slot] = session.session_id
+            self._created[slot] = to_epoch_micros(session.created_at)
+            self._expires[slot] = expires_us
+            self._user_of[slot] = user
+            head = self._user_head[user]
+            self._next[slot] = head
+            self._prev[slot] = -1
+            if head >= 0:
+                self._prev[head] = slot
+            self._user_head[user] = slot
+            self._user_sessions[user] += 1
+            heapq.heappush(self._expiry_heap, expires_us << _SLOT_BITS | slot)
+
+            self._sweep_locked(to_epoch_micros(self._clock.now()), self._sweep_batch)
+            if self._max_sessions is not None:
+                while len(self._slot_of) > self._max_sessions:
+                    self._pop_earliest_locked()
+                    self._capacity_evicted += 1
+            self._compact_locked()
+
+    def get_session(self, session_id: str) -> Session | None:
+        with self._lock:
+            slot = self._slot_of.get(session_id)
+            if slot is None:
+                return None
+            user_id = self._user_ids[self._user_of[slot]]
+            created_us, expires_us = self._created[slot], self._expires[slot]
+        return Session(
+            session_id=session_id,
+            user_id=user_id,
+            created_at=from_epoch_micros(created_us),
+            expires_at=from_epoch_micros(expires_us),
+        )
+
+    def delete_session(self, session_id: str) -> None:
+        with self._lock:
+            self._remove_locked(session_id)
+            self._compact_locked()
+
+    def delete_sessions_for_user(self, user_id: str) -> int:
+        with self._lock:
+            user = self._user_index.get(user_id)
+            if user is None:
+                return 0
+            doomed = []
+            slot = self._user_head[user]
+            while slot >= 0:
+                doomed.append(self._session_ids[slot])
+                slot = self._next[slot]
+            for session_id in doomed:
+                self._remove_locked(session_id)
+            self._compact_locked()
+            return len(doomed)
+
+    def sweep_expired(self, limit: int | None = None) -> int:
+        """
+        Evict expired sessions; meant to be called periodically.
+        Returns the number of sessions removed.
+        """
+        with self._lock:
+            return self._sweep_locked(to_epoch_micros(self._clock.now()), limit)
+
+    def stats(self) -> SessionStoreStats:
+        with self._lock:
+            return SessionStoreStats(
+                size=len(self._slot_of),
+                expired_evicted=self._expired_evicted,
+                capacity_evicted=self._capacity_evicted,
+            )
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+    def _new_slot_locked(self) -> int:
+        if self._free_slots:
+            return self._free_slots.pop()
+        self._session_ids.append(None)
+        for column in (self._created, self._expires):
+            column.append(0)
+        for column in (self._user_of, self._next, self._prev):
+            column.append(-1)
+        return len(self._session_ids) - 1
+
+    def _intern_user_locked(self, user_id: str) -> int:
+        user = self._user_index.get(user_id)
+        if user is not None:
+            return user
+        if self._free_users:
+            user = self._free_users.pop()
+            self._user_ids[user] = user_id
+        else:
+            user = len(self._user_ids)
+            self._user_ids.append(user_id)
+            self._user_head.append(-1)
+            self._user_sessions.append(0)
+        self._user_index[user_id] = user
+        return user
+
+    def _remove_locked(self, session_id: str) -> None:
+        slot = self._slot_of.pop(session_id, None)
+        if slot is None:
+            return
+        user = self._user_of[slot]
+        prev, nxt = self._prev[slot], self._next[slot]
+        if prev >= 0:
+            self._next[prev] = nxt
+        else:
+            self._user_head[user] = nxt
+        if nxt >= 0:
+            self._prev[nxt] = prev
+        self._user_sessions[user] -= 1
+        if self._user_sessions[user] == 0:
+            del self._user_index[self._user_ids[user]]
+            self._user_ids[user] = None
+            self._free_users.append(user)
+        self._session_ids[slot] = None
+        self._free_slots.append(slot)
+
+    def _live_session_id(self, key: int) -> str | None:
+        slot = key & _SLOT_MASK
+        session_id = self._session_ids[slot]
+        if session_id is not None and self._expires[slot] == key >> _SLOT_BITS:
+            return session_id
+        return None
+
+    def _sweep_locked(self, now_us: int, limit: int | None) -> int:
+        removed = 0
+        heap = self._expiry_heap
+        while heap and heap[0] >> _SLOT_BITS <= now_us and (limit is None or removed < limit):
+            session_id = self._live_session_id(heapq.heappop(heap))
+            if session_id is not None:
+                self._remove_locked(session_id)
+                removed += 1
+        self._expired_evicted += removed
+        return removed
+
+    def _pop_earliest_locked(self) -> None:
+        heap = self._expiry_heap
+        while heap:
+            session_id = self._live_session_id(heapq.heappop(heap))
+            if session_id is not None:
+                self._remove_locked(session_id)
+                return
+
+    def _compact_locked(self) -> None:
+        # Keep stale heap entries bounded relative to the live set.
+        if len(self._expiry_heap) > 2 * len(self._slot_of) + 1024:
+            self._expiry_heap = [
+                self._expires[slot] << _SLOT_BITS | slot for slot in self._slot_of.values()
+            ]
+            heapq.heapify(self._expiry_heap)
+
+
+class StripedSessionStore(SessionStore):
+    """
+    InMemorySessionStore split into independently locked stripes by
+    session_id, so concurrent logins and logouts rarely wait on each other.
+
+    max_sessions is split between the stripes (each gets max_sessions //
+    stripes, the first few one more), so the store never holds more than
+    max_sessions. The cap is enforced per stripe: a full stripe evicts its
+    own oldest session even while other stripes have room, so the bound is
+    exact but eviction order is only approximately LRU overall.
+    """
+
+    def __init__(
+        self,
+        *,
+        stripes: int = 16,
+        clock: Clock | None = None,
+        max_sessions: int | None = None,
+        sweep_batch: int = 64,
+    ) -> None:
+        if stripes <= 0:
+            raise ValueError("stripes must be positive")
+        if max_sessions is not None and max_sessions < stripes:
+            raise ValueError("max_sessions must be at least the number of stripes")
+        caps: list[int | None] = [None] * stripes
+        if max_sessions is not None:
+            base, extra = divmod(max_sessions, stripes)
+            caps = [base + (i < extra) for i in range(stripes)]
+        self._stripes = tuple(
+            InMemorySessionStore(clock=clock, max_sessions=cap, sweep_batch=sweep_batch)
+            for cap in caps
+        )
+
+    def _for(self, session_id: str) -> InMemorySessionStore:
+        return self._stripes[_stripe(session_id, len(self._stripes))]
 
     def create_session(self, session: Session) -> None:
-        self._sessions[session.session_id] = session
+        self._for(session.session_id).create_session(session)
 
     def get_session(self, session_id: str) -> Session | None:
-        return self._sessions.get(session_id)
+        return self._for(session_id).get_session(session_id)
 
     def delete_session(self, session_id: str) -> None:
-        self._sessions.pop(session_id, None)
+        self._for(session_id).delete_session(session_id)
+
+    def delete_sessions_for_user(self, user_id: str) -> int:
+        return sum(stripe.delete_sessions_for_user(user_id) for stripe in self._stripes)
+
+    def sweep_expired(self, limit: int | None = None) -> int:
+        return sum(stripe.sweep_expired(limit) for stripe in self._stripes)
+
+    def stats(self) -> SessionStoreStats:
+        parts = [stripe.stats() for stripe in self._stripes]
+        return SessionStoreStats(
+            size=sum(p.size for p in parts),
+            expired_evicted=sum(p.expired_evicted for p in parts),
+            capacity_evicted=sum(p.capacity_evicted for p in parts),
+        )
+
+    def __len__(self) -> int:
+        return sum(len(stripe) for stripe in self._stripes)
+
+
+# ---------- Async port bridges ----------
+# These expose non-blocking sync adapters (in-memory, local SQLite, cheap
+# hashers) through the async ports. Calls run inline on the event loop, so
+# never wrap an adapter that waits on the network or burns noticeable CPU.
+
+
+class AwaitableUserRepo(AsyncUserRepository):
+    def __init__(self, inner: UserRepository) -> None:
+        self._inner = inner
+
+    async def get_by_email(self, email: str) -> User | None:
+        return self._inner.get_by_email(email)
+
+    async def get_by_id(self, user_id: str) -> User | None:
+        return self._inner.get_by_id(user_id)
+
+    async def create(self, user: User) -> None:
+        self._inner.create(user)
+
+    async def create_if_absent(self, user: User) -> bool:
+        return self._inner.create_if_absent(user)
+
+    async def create_many(self, users: Sequence[User]) -> list[bool]:
+        return self._inner.create_many(users)
+
+
+class AwaitableSessionStore(AsyncSessionStore):
+    def __init__(self, inner: SessionStore) -> None:
+        self._inner = inner
+
+    async def create_session(self, session: Session) -> None:
+        self._inner.create_session(session)
+
+    async def get_session(self, session_id: str) -> Session | None:
+        return self._inner.get_session(session_id)
+
+    async def delete_session(self, session_id: str) -> None:
+        self._inner.delete_session(session_id)
+
+    async def delete_sessions_for_user(self, user_id: str) -> int:
+        return self._inner.delete_sessions_for_user(user_id)
+
+
+class AwaitablePasswordHasher(AsyncPasswordHasher):
+    def __init__(self, inner: PasswordHasher) -> None:
+        self._inner = inner
+
+    async def hash_password(self, password: str) -> str:
+        return self._inner.hash_password(password)
+
+    async def verify_password(self, password: str, password_hash: str) -> bool:
+        return self._inner.verify_password(password, password_hash)
+
+
+# Thread-pool bridges: for sync adapters that block on I/O (e.g. proxies of
+# a store in another process), so the event loop keeps serving meanwhile.
+
+
+class ThreadPoolUserRepo(AsyncUserRepository):
+    def __init__(self, inner: UserRepository) -> None:
+        self._inner = inner
+
+    async def get_by_email(self, email: str) -> User | None:
+        return await asyncio.to_thread(self._inner.get_by_email, email)
+
+    async def get_by_id(self, user_id: str) -> User | None:
+        return await asyncio.to_thread(self._inner.get_by_id, user_id)
+
+    async def create(self, user: User) -> None:
+        await asyncio.to_thread(self._inner.create, user)
+
+    async def create_if_absent(self, user: User) -> bool:
+        return await asyncio.to_thread(self._inner.create_if_absent, user)
+
+    async def create_many(self, users: Sequence[User]) -> list[bool]:
+        return await asyncio.to_thread(self._inner.create_many, users)
+
+
+class ThreadPoolSessionStore(AsyncSessionStore):
+    def __init__(self, inner: SessionStore) -> None:
+        self._inner = inner
+
+    async def create_session(self, session: Session) -> None:
+        await asyncio.to_thread(self._inner.create_session, session)
+
+    async def get_session(self, session_id: str) -> Session | None:
+        return await asyncio.to_thread(self._inner.get_session, session_id)
+
+    async def delete_session(self, session_id: str) -> None:
+        await asyncio.to_thread(self._inner.delete_session, session_id)
+
+    async def delete_sessions_for_user(self, user_id: str) -> int:
+        return await asyncio.to_thread(self._inner.delete_sessions_for_user, user_id)
@@ -1,10 +1,21 @@
 from __future__ import annotations
 
-from fastapi import Depends, FastAPI, Header, HTTPException, status
-from pydantic import BaseModel, EmailStr
+import asyncio
+import json
+import math
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import AsyncIterator, Iterator, Sequence
 
+from fastapi import Depends, FastAPI, Header, HTTPException, Request, status
+from fastapi.concurrency import iterate_in_threadpool, run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, EmailStr, ValidationError
+
+from xagent2.identity.core import BulkCreateResult, normalize_email
 from xagent2.identity_api.core import (
     CreateUserCmd,
+    HasherOverloaded,
     InvalidCredentials,
     LoginCmd,
     LogoutCmd,
@@ -12,7 +23,11 @@ from xagent2.identity_api.core import (
     UserAlreadyExists,
     UserDisabled,
 )
-from xagent2.query_service.core import Query
+from xagent2.query_service.core import AnswerChunk, Query
+from xagent2.rate_limit.core import RateDecision, RateLimiter
+from .encoders import EncodedJSONResponse, compile_encoder
+from .instrumentation import LatencyMiddleware
+from .startup import LazyContainer, Readiness, StartupProfiler, WarmupHook
 from .wiring import Container, build_container
 
 
@@ -45,20 +60,146 @@ class QueryResponse(BaseModel):
     created_at: str
 
 
-def create_app() -> FastAPI:
-    app = FastAPI(title="User API")
-    container = build_container()
+# Same bytes as the models above, for create_app(fast_responses=True).
+_encode_login = compile_encoder(
+    LoginResponse,
+    user_id=lambda r: r.user_id,
+    session_id=lambda r: r.session_id,
+    expires_at=lambda r: r.expires_at.isoformat(),
+)
+_encode_me = compile_encoder(MeResponse, user_id=lambda user_id: user_id)
+_encode_answer = compile_encoder(
+    QueryResponse,
+    answer=lambda a: a.text,
+    created_at=lambda a: a.created_at.isoformat(),
+)
+
+
+def _sse_event(event: str, data: dict) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8")
+
+
+async def _sse_stream(chunks: Iterator[AnswerChunk]) -> AsyncIterator[bytes]:
+    # The next chunk is only pulled once the previous one has been sent, so a
+    # slow client throttles the backend instead of buffering the reply.
+    async for chunk in iterate_in_threadpool(chunks):
+        yield _sse_event("chunk", {"index": chunk.index, "text": chunk.text})
+    yield _sse_event("done", {"created_at": datetime.now(timezone.utc).isoformat()})
+
+
+_BULK_BATCH_SIZE = 1000
+# Bigger imports are split into several requests by the client.
+_BULK_MAX_ROWS = 10_000
+_BULK_MAX_BYTES = 4 << 20
+
+
+def _too_large(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_413_CONTENT_TOO_LARGE, detail=detail)
+
+
+async def _ndjson_lines(body: AsyncIterator[bytes], max_bytes: int) -> AsyncIterator[bytes]:
+    pending = b""
+    total = 0
+    async for chunk in body:
+        total += len(chunk)
+        if total > max_bytes:
+            raise _too_large(f"Body larger than {max_bytes} bytes")
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line
+    if pending:
+        yield pending
+
+
+def _bulk_row_result(line: int, result: BulkCreateResult | HasherOverloaded | str) -> dict:
+    if isinstance(result, HasherOverloaded):
+        return {"line": line, "status": "overloaded"}
+    if isinstance(result, str):
+        return {"line": line, "status": "invalid", "error": result}
+    if isinstance(result, UserAlreadyExists):
+        return {"line": line, "status": "exists"}
+    if isinstance(result, ValueError):
+        return {"line": line, "status": "invalid", "error": str(result)}
+    return {"line": line, "status": "created", "user_id": result.user_id, "email": result.email}
+
+
+async def _bulk_create_stream(
+    rows: Sequence[tuple[int, CreateUserCmd | str]], identity, batch_size: int
+) -> AsyncIterator[bytes]:
+    # rows are (line number, command or parse error). Each batch's results go
+    # out as soon as the batch is done.
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start : start + batch_size]
+        try:
+            created = iter(
+                await identity.create_users(
+                    [cmd for _, cmd in batch if isinstance(cmd, CreateUserCmd)]
+                )
+            )
+        except HasherOverloaded as exc:
+            # Nothing from this batch on was created; the caller can retry
+            # the lines reported as overloaded.
+            yield "".join(
+                json.dumps(_bulk_row_result(line, cmd if isinstance(cmd, str) else exc)) + "\n"
+                for line, cmd in rows[start:]
+            ).encode("utf-8")
+            return
+        out = [
+            _bulk_row_result(line, next(created) if isinstance(cmd, CreateUserCmd) else cmd)
+            for line, cmd in batch
+        ]
+        yield "".join(json.dumps(r) + "\n" for r in out).encode("utf-8")
+
+
+def create_app(
+    container: Container | LazyContainer | None = None,
+    *,
+    warmups: Sequence[WarmupHook] = (),
+    profiler: StartupProfiler | None = None,
+    fast_responses: bool = False,
+) -> FastAPI:
+    """
+    container may be a LazyContainer, built on first use instead of now.
+    On startup the container is built (if lazy) and warmed up in the
+    background: its own adapter warmups, then each of warmups in order.
+    /ready answers 503 until that has finished, then 200.
+
+    With fast_responses, /login, /me and /query encode their results with
+    precompiled encoders and skip response-model validation; the JSON and
+    the OpenAPI schema stay the same.
+    """
+    container = container or build_container()
+    readiness = Readiness()
 
-    def get_container() -> Container:
+    async def resolve_container() -> Container:
+        if isinstance(container, LazyContainer):
+            return await container.aget()
         return container
 
-    def get_identity(container: Container = Depends(get_container)):
+    @asynccontextmanager
+    async def lifespan(_app: FastAPI):
+        warming = asyncio.create_task(readiness.run(resolve_container, warmups, profiler))
+        yield
+        warming.cancel()
+        container.close()
+
+    app = FastAPI(title="User API", lifespan=lifespan)
+    if container.metrics is not None:
+        app.add_middleware(LatencyMiddleware, registry=container.metrics)
+
+    get_container = resolve_container
+
+    async def get_identity(container: Container = Depends(get_container)):
         return container.identity
 
-    def get_answer_query(container: Container = Depends(get_container)):
+    async def get_answer_query(container: Container = Depends(get_container)):
         return container.answer_query
 
-    def get_session_id(
+    async def get_stream_answer(container: Container = Depends(get_container)):
+        return container.stream_answer
+
+    async def get_session_id(
         x_session_id: str | None = Header(default=None, alias="X-Session-Id"),
     ) -> str:
         if not x_session_id:
@@ -68,21 +209,118 @@ def create_app() -> FastAPI:
             )
         return x_session_id
 
-    @app.post("/users", status_code=status.HTTP_201_CREATED)
-    def create_user(req: CreateUserRequest, identity=Depends(get_identity)):
+    def overloaded() -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server busy, retry later",
+            headers={"Retry-After": "1"},
+        )
+
+    def enforce(limiter: RateLimiter | None, key: str, cost: float = 1.0) -> None:
+        if limiter is None:
+            return
+        decision: RateDecision = limiter.acquire(key, cost)
+        if not decision.allowed:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests",
+                headers={"Retry-After": str(max(1, math.ceil(decision.retry_after)))},
+            )
+
+    # Both limits run as dependencies, i.e. before the handler starts any
+    # password hashing.
+    def client_ip(request: Request) -> str:
+        # uvicorn rewrites the peer from X-Forwarded-For for trusted proxies
+        # only (--forwarded-allow-ips); see build_container(ip_rate_limit).
+        return request.client.host if request.client else "unknown"
+
+    async def limit_client_ip(request: Request, container: Container = Depends(get_container)):
+        enforce(container.ip_limiter, client_ip(request))
+
+    async def limit_login_email(req: LoginRequest, container: Container = Depends(get_container)):
+        enforce(container.email_limiter, normalize_email(req.email))
+
+    @app.post(
+        "/users",
+        status_code=status.HTTP_201_CREATED,
+        dependencies=[Depends(limit_client_ip)],
+    )
+    async def create_user(req: CreateUserRequest, identity=Depends(get_identity)):
         try:
-            user = identity.create_user(CreateUserCmd(email=req.email, password=req.password))
+            user = await identity.create_user(
+                CreateUserCmd(email=req.email, password=req.password)
+            )
             return {"user_id": user.user_id, "email": user.email}
         except UserAlreadyExists:
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT,
                 detail="User already exists",
             )
+        except HasherOverloaded:
+            raise overloaded()
 
-    @app.post("/login", response_model=LoginResponse)
-    def login(req: LoginRequest, identity=Depends(get_identity)):
+    @app.post("/users:bulk")
+    async def create_users_bulk(
+        request: Request,
+        session_id: str = Depends(get_session_id),
+        container: Container = Depends(get_container),
+    ):
+        """
+        Bulk user import, for signed-in callers. The body is NDJSON with one
+        {"email", "password"} object per line, at most _BULK_MAX_ROWS rows
+        and _BULK_MAX_BYTES bytes (413 otherwise). The response streams one
+        NDJSON result per non-blank input line, in order: {"line": n,
+        "status": "created" | "exists" | "invalid" | "overloaded", ...}.
+
+        The body is parsed as it arrives. Every row then costs one token of
+        the per-IP limit, charged before any hashing (429). Users are
+        created in batches and results are sent as each batch finishes; if
+        the hasher is saturated, the remaining rows come back "overloaded".
+        """
+        identity = container.identity
         try:
-            result = identity.login(LoginCmd(email=req.email, password=req.password))
+            await identity.authenticate_session(session_id)
+        except SessionNotFound:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid session",
+            )
+        rows: list[tuple[int, CreateUserCmd | str]] = []
+        line_no = 0
+        async for line in _ndjson_lines(request.stream(), _BULK_MAX_BYTES):
+            line_no += 1
+            if not line.strip():
+                continue
+            if len(rows) == _BULK_MAX_ROWS:
+                raise _too_large(f"More than {_BULK_MAX_ROWS} rows")
+            try:
+                req = CreateUserRequest.model_validate_json(line)
+            except ValidationError as exc:
+                err = exc.errors()[0]
+                where = ".".join(str(part) for part in err["loc"])
+                rows.append((line_no, f"{where}: {err['msg']}" if where else err["msg"]))
+                continue
+            rows.append((line_no, CreateUserCmd(email=req.email, password=req.password)))
+        limiter = container.ip_limiter
+        if limiter is not None and rows:
+            if len(rows) > limiter.limit.burst:
+                raise _too_large(f"More rows than the rate limit's burst ({limiter.limit.burst:g})")
+            enforce(limiter, client_ip(request), cost=len(rows))
+        return StreamingResponse(
+            _bulk_create_stream(rows, identity, _BULK_BATCH_SIZE),
+            media_type="application/x-ndjson",
+        )
+
+    @app.post(
+        "/login",
+        response_model=LoginResponse,
+        dependencies=[Depends(limit_client_ip), Depends(limit_login_email)],
+    )
+    async def login(req: LoginRequest, identity=Depends(get_identity)):
+        try:
+            result = await identity.login(LoginCmd(email=req.email, password=req.password))
+            if fast_responses:
+                return EncodedJSONResponse(_encode_login(result))
             return LoginResponse(
                 user_id=result.user_id,
                 session_id=result.session_id,
@@ -93,19 +331,35 @@ def create_app() -> FastAPI:
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid credentials",
             )
+        except HasherOverloaded:
+            raise overloaded()
 
     @app.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
-    def logout(session_id: str = Depends(get_session_id), identity=Depends(get_identity)):
+    async def logout(session_id: str = Depends(get_session_id), identity=Depends(get_identity)):
         try:
-            identity.logout(LogoutCmd(session_id=session_id))
+            await identity.logout(LogoutCmd(session_id=session_id))
             return None
         except SessionNotFound:
             return None
 
+    @app.post("/logout/all")
+    async def logout_all(session_id: str = Depends(get_session_id), identity=Depends(get_identity)):
+        """Ends every session of the calling user, including this one."""
+        try:
+            user_id = await identity.authenticate_session(session_id)
+        except SessionNotFound:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid session",
+            )
+        return {"revoked": await identity.revoke_sessions_for_user(user_id)}
+
     @app.get("/me", response_model=MeResponse)
-    def me(session_id: str = Depends(get_session_id), identity=Depends(get_identity)):
+    async def me(session_id: str = Depends(get_session_id), identity=Depends(get_identity)):
         try:
-            user_id = identity.authenticate_session(session_id)
+            user_id = await identity.authenticate_session(session_id)
+            if fast_responses:
+                return EncodedJSONResponse(_encode_me(user_id))
             return MeResponse(user_id=user_id)
         except SessionNotFound:
             raise HTTPException(
@@ -114,7 +368,7 @@ def create_app() -> FastAPI:
             )
 
     @app.post("/query", response_model=QueryResponse)
-    def query(
+    async def query(
         req: QueryRequest,
         session_id: str = Depends(get_session_id),
         identity=Depends(get_identity),
@@ -122,15 +376,63 @@ def create_app() -> FastAPI:
     ):
         """
         Dummy endpoint that validates session and returns a simple answer.
+        The query carries the session's user, for conversation history.
         """
         try:
-            identity.authenticate_session(session_id)
+            user_id = await identity.authenticate_session(session_id)
         except SessionNotFound:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid session",
             )
-        result = answer_query(Query(text=req.text))
+        # answer_query may call a blocking backend; keep it off the event loop.
+        result = await run_in_threadpool(answer_query, Query(text=req.text, user_id=user_id))
+        if fast_responses:
+            return EncodedJSONResponse(_encode_answer(result))
         return QueryResponse(answer=result.text, created_at=result.created_at.isoformat())
 
+    @app.post("/query/stream")
+    async def query_stream(
+        req: QueryRequest,
+        session_id: str = Depends(get_session_id),
+        identity=Depends(get_identity),
+        stream_answer=Depends(get_stream_answer),
+    ):
+        """
+        Same as /query, but streams the answer as server-sent events:
+        one "chunk" event per piece of text, then a final "done" event.
+        """
+        try:
+            user_id = await identity.authenticate_session(session_id)
+        except SessionNotFound:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid session",
+            )
+        chunks = await run_in_threadpool(stream_answer, Query(text=req.text, user_id=user_id))
+        return StreamingResponse(
+            _sse_stream(chunks),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    @app.get("/ready", include_in_schema=False)
+    async def ready():
+        body: dict = {"ready": readiness.ready}
+        if readiness.error is not None:
+            body["error"] = readiness.error
+        if profiler is not None:
+            body["startup"] = profiler.as_dict()
+        code = status.HTTP_200_OK if readiness.ready else status.HTTP_503_SERVICE_UNAVAILABLE
+        return JSONResponse(body, status_code=code)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics(container: Container = Depends(get_container)):
+        if container.metrics is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+        return PlainTextResponse(
+            container.metrics.render(),
+            media_type="text/plain; version=0.0.4; charset=utf-8",
+        )
+
     return app
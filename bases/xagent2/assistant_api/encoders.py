@@ -0,0 +1,50 @@
+"""
+Precompiled JSON encoders for hot response bodies.
+
+A route that declares response_model=SomeModel normally builds the model,
+has FastAPI validate and dump it again, then json.dumps the result.
+compile_encoder(SomeModel, field=getter, ...) does the schema work once:
+the keys, their order and the separators become one %-template, so
+encoding a result is a getter call and one C string escape per field.
+The bytes are exactly what JSONResponse would have sent for the model.
+"""
+from __future__ import annotations
+
+import json
+from typing import Any, Callable
+
+from pydantic import BaseModel
+from starlette.responses import Response
+
+# The escaping json.dumps(ensure_ascii=False) uses, as JSONResponse does.
+_encode_str: Callable[[str], str] = json.encoder.encode_basestring
+
+
+def compile_encoder(
+    model: type[BaseModel], **getters: Callable[[Any], str]
+) -> Callable[[Any], bytes]:
+    """
+    Returns encode(obj) -> bytes with one getter per field of model, in the
+    model's field order. Only str fields are supported; a getter that
+    returns something else is a bug and fails loudly in _encode_str.
+    """
+    fields = list(model.model_fields)
+    if sorted(fields) != sorted(getters):
+        raise TypeError(f"{model.__name__} needs getters for exactly {fields}, got {list(getters)}")
+    for name, field in model.model_fields.items():
+        if field.annotation is not str:
+            raise TypeError(f"{model.__name__}.{name}: only str fields are supported")
+    template = "{" + ",".join(f"{_encode_str(name)}:%s" for name in fields) + "}"
+    ordered = tuple(getters[name] for name in fields)
+
+    def encode(obj: Any) -> bytes:
+        return (template % tuple(_encode_str(get(obj)) for get in ordered)).encode("utf-8")
+
+    encode.__qualname__ = f"encode_{model.__name__}"
+    return encode
+
+
+class EncodedJSONResponse(Response):
+    """A JSON body that is already bytes; FastAPI passes it through untouched."""
+
+    media_type = "application/json"
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import time
+
+from xagent2.metrics.core import Histogram, MetricsRegistry
+
+
+class LatencyMiddleware:
+    """
+    Pure ASGI middleware recording request latency per route template,
+    method and status, from the first byte received to the last byte sent
+    (so streamed responses are timed in full).
+    """
+
+    def __init__(self, app, registry: MetricsRegistry) -> None:
+        self.app = app
+        self._histogram: Histogram = registry.histogram(
+            "http_request_duration_seconds",
+            "HTTP request latency by route.",
+            ("method", "route", "status"),
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            self._histogram.labels(
+                method=scope["method"],
+                route=getattr(route, "path", "<unmatched>"),
+                status=str(status_code),
+            ).observe(time.perf_counter() - start)
@@ -0,0 +1,206 @@
+"""
+Identity state shared by several worker processes on one node.
+
+A small server process owns the in-memory user repository and session
+store; workers reach them through multiprocessing.managers proxies over a
+local socket. Every port call is one round trip to that process, so use
+the thread-pool async bridges (ThreadPoolUserRepo/ThreadPoolSessionStore)
+in front of the proxies rather than calling them on the event loop.
+
+Signed-session revocations are shared too, but without a round trip per
+request: the server keeps an append-only log of revocations and publishes
+its length in a small memory-mapped file. Each worker mirrors the log in a
+local TokenRevocations and only asks the server for the new entries when
+that length has moved.
+"""
+from __future__ import annotations
+
+import bisect
+import mmap
+import os
+import secrets
+import struct
+import tempfile
+import threading
+from multiprocessing import util
+from multiprocessing.managers import BaseManager
+from typing import Any, NamedTuple
+
+from xagent2.identity.tokens import TokenRevocations
+from xagent2.identity_api.core import SessionStore, UserRepository
+from .adapters import InMemoryUserRepo, StripedSessionStore
+
+_state: dict[str, Any] = {}
+_GENERATION = struct.Struct("<Q")
+
+
+def _init_state(session_stripes: int, max_sessions: int | None) -> None:
+    # Runs in the server process.
+    _state["users"] = InMemoryUserRepo()
+    _state["sessions"] = StripedSessionStore(stripes=session_stripes, max_sessions=max_sessions)
+    _state["revocations"] = RevocationLog()
+
+
+def _users() -> InMemoryUserRepo:
+    return _state["users"]
+
+
+def _sessions() -> StripedSessionStore:
+    return _state["sessions"]
+
+
+def _revocations() -> RevocationLog:
+    return _state["revocations"]
+
+
+# One revocation: ("token", mac, expires_us) or ("user", user_id, cutoff_us).
+Revocation = tuple[str, Any, int]
+
+
+class RevocationLog:
+    """
+    Server side of the shared token revocations: every revocation in order,
+    numbered from 0, and their count in a memory-mapped generation file.
+
+    Entries whose expiry has passed are dropped from the log now and then;
+    a worker that never saw them has no use for them, since every token
+    they cover has expired too.
+    """
+
+    def __init__(self) -> None:
+        self._state = TokenRevocations()  # answers "already revoked?"
+        self._seqs: list[int] = []
+        self._entries: list[Revocation] = []
+        self._next = 0
+        self._lock = threading.Lock()
+        fd, self._path = tempfile.mkstemp(prefix="xagent2-revocations-")
+        try:
+            os.write(fd, bytes(_GENERATION.size))
+            self._generation = mmap.mmap(fd, _GENERATION.size)
+        finally:
+            os.close(fd)
+        # Runs when the server process exits (manager.shutdown()).
+        util.Finalize(self, os.unlink, args=(self._path,), exitpriority=0)
+
+    def generation_path(self) -> str:
+        return self._path
+
+    def revoke_token(self, mac: bytes, expires_us: int, now_us: int) -> bool:
+        with self._lock:
+            if not self._state.revoke_token(mac, expires_us, now_us):
+                return False
+            self._append_locked(("token", mac, expires_us), now_us)
+            return True
+
+    def revoke_user(self, user_id: str, cutoff_us: int, now_us: int) -> None:
+        with self._lock:
+            self._state.revoke_user(user_id, cutoff_us, now_us)
+            self._append_locked(("user", user_id, cutoff_us), now_us)
+
+    def changes_since(self, seq: int) -> tuple[list[Revocation], int]:
+        """Entries numbered seq and later that are still kept, and the next number."""
+        with self._lock:
+            start = bisect.bisect_left(self._seqs, seq)
+            return self._entries[start:], self._next
+
+    def _append_locked(self, entry: Revocation, now_us: int) -> None:
+        self._seqs.append(self._next)
+        self._entries.append(entry)
+        self._next += 1
+        if len(self._entries) >= 1024 and len(self._entries) & (len(self._entries) - 1) == 0:
+            kept = [i for i, (_, _, until) in enumerate(self._entries) if until > now_us]
+            self._seqs = [self._seqs[i] for i in kept]
+            self._entries = [self._entries[i] for i in kept]
+        # Published last, so a worker that sees the new count finds the entry.
+        _GENERATION.pack_into(self._generation, 0, self._next)
+
+
+class SharedTokenRevocations(TokenRevocations):
+    """
+    Worker side: a local mirror of the server's RevocationLog. Checks read
+    the generation file and, only when it has moved, fetch the new entries
+    (one round trip). Revoking goes to the server first, so once a logout
+    has returned every worker sees it on its next check.
+    """
+
+    def __init__(self, log: Any) -> None:
+        super().__init__()
+        self._log = log
+        with open(log.generation_path(), "rb") as f:
+            self._generation = mmap.mmap(f.fileno(), _GENERATION.size, access=mmap.ACCESS_READ)
+        self._seen = 0
+        self._sync_lock = threading.Lock()
+
+    def is_revoked(self, mac: bytes, user_id: str, expires_us: int, now_us: int) -> bool:
+        if _GENERATION.unpack_from(self._generation)[0] != self._seen:
+            self._sync(now_us)
+        return super().is_revoked(mac, user_id, expires_us, now_us)
+
+    def revoke_token(self, mac: bytes, expires_us: int, now_us: int) -> bool:
+        revoked = self._log.revoke_token(mac, expires_us, now_us)
+        self._sync(now_us)
+        return revoked
+
+    def revoke_user(self, user_id: str, cutoff_us: int, now_us: int) -> None:
+        self._log.revoke_user(user_id, cutoff_us, now_us)
+        self._sync(now_us)
+
+    def _sync(self, now_us: int) -> None:
+        with self._sync_lock:
+            entries, end = self._log.changes_since(self._seen)
+            for kind, key, until in entries:
+                if kind == "token":
+                    super().revoke_token(key, until, now_us)
+                else:
+                    super().revoke_user(key, until, now_us)
+            self._seen = end
+
+
+class SharedStateManager(BaseManager):
+    pass
+
+
+SharedStateManager.register("users", callable=_users)
+SharedStateManager.register("sessions", callable=_sessions)
+SharedStateManager.register("revocations", callable=_revocations)
+
+
+class SharedState(NamedTuple):
+    users: UserRepository
+    sessions: SessionStore
+    token_revocations: TokenRevocations
+
+
+def new_authkey() -> bytes:
+    return secrets.token_bytes(32)
+
+
+def start_shared_state(
+    *,
+    authkey: bytes,
+    address: str | None = None,
+    session_stripes: int = 16,
+    max_sessions: int | None = None,
+) -> SharedStateManager:
+    """
+    Start the state server in a child process. Workers connect with
+    manager.address and the same authkey; manager.shutdown() stops it.
+    address defaults to a fresh Unix socket in the temp directory.
+    max_sessions caps the shared session store (see StripedSessionStore).
+    """
+    if max_sessions is not None and max_sessions < session_stripes:
+        # Checked here: the store is built in the child, where it would fail silently.
+        raise ValueError("max_sessions must be at least session_stripes")
+    if address is None:
+        address = os.path.join(tempfile.mkdtemp(prefix="xagent2-"), "state.sock")
+    manager = SharedStateManager(address=address, authkey=authkey)
+    manager.start(initializer=_init_state, initargs=(session_stripes, max_sessions))
+    return manager
+
+
+def connect_shared_state(address: str, authkey: bytes) -> SharedState:
+    manager = SharedStateManager(address=address, authkey=authkey)
+    manager.connect()
+    return SharedState(
+        manager.users(), manager.sessions(), SharedTokenRevocations(manager.revocations())
+    )
@@ -0,0 +1,324 @@
+"""
+Startup profiling, lazy container construction and readiness.
+
+    python -m xagent2.assistant_api.startup [--lazy] [--imports 20]
+
+prints how long a cold import of the app took per module, and how long
+creating the app and building the container took per adapter.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import importlib.abc
+import os
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Iterator, Sequence
+
+if TYPE_CHECKING:
+    from xagent2.metrics.core import MetricsRegistry
+    from .wiring import Container
+
+WarmupHook = Callable[["Container"], Awaitable[None] | None]
+
+
+@dataclass(frozen=True)
+class Timing:
+    name: str
+    seconds: float
+    self_seconds: float
+
+
+class StartupProfiler:
+    """
+    Collects wall-clock timings of startup phases: imports (see
+    profile_imports), container construction per adapter (laps), and
+    warmup hooks. Thread-safe; report() renders the slowest entries.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.imports: list[Timing] = []
+        self.phases: list[Timing] = []
+
+    def record(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.phases.append(Timing(name, seconds, seconds))
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def laps(self, prefix: str) -> Callable[[str], None]:
+        """Returns lap(name), recording the time since the previous lap (or now) as prefix.name."""
+        last = time.perf_counter()
+
+        def lap(name: str) -> None:
+            nonlocal last
+            now = time.perf_counter()
+            self.record(f"{prefix}.{name}", now - last)
+            last = now
+
+        return lap
+
+    def as_dict(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "phases": {t.name: round(t.seconds * 1000, 3) for t in self.phases},
+                "imports_ms": round(sum(t.self_seconds for t in self.imports) * 1000, 3),
+            }
+
+    def report(self, top_imports: int = 15) -> str:
+        with self._lock:
+            lines = []
+            if self.imports:
+                total = sum(t.self_seconds for t in self.imports)
+                lines.append(f"imports: {len(self.imports)} modules, {total * 1000:.1f} ms")
+                lines.append(f"  {'cumulative':>10} {'self':>9}  module")
+                slowest = sorted(self.imports, key=lambda t: t.seconds, reverse=True)
+                for t in slowest[:top_imports]:
+                    lines.append(
+                        f"  {t.seconds * 1000:>8.1f}ms {t.self_seconds * 1000:>7.1f}ms  {t.name}"
+                    )
+            if self.phases:
+                lines.append("phases:")
+                for t in self.phases:
+                    lines.append(f"  {t.seconds * 1000:>8.1f}ms  {t.name}")
+            return "\n".join(lines)
+
+
+class _TimingLoader(importlib.abc.Loader):
+    def __init__(self, loader, profiler: StartupProfiler, stack: list[float]) -> None:
+        self._loader = loader
+        self._profiler = profiler
+        self._stack = stack
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module) -> None:
+        # Self time excludes nested imports, like python -X importtime.
+        self._stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = self._stack.pop()
+            if self._stack:
+                self._stack[-1] += elapsed
+            with self._profiler._lock:
+                self._profiler.imports.append(Timing(module.__name__, elapsed, elapsed - nested))
+
+    def __getattr__(self, name: str):
+        return getattr(self._loader, name)
+
+
+class _TimingFinder(importlib.abc.MetaPathFinder):
+    def __init__(self, profiler: StartupProfiler) -> None:
+        self._profiler = profiler
+        self._stack: list[float] = []
+        self._local = threading.local()
+
+    def find_spec(self, fullname, path, target=None):
+        if getattr(self._local, "busy", False):
+            return None
+        self._local.busy = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self._local.busy = False
+        if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+            spec.loader = _TimingLoader(spec.loader, self._profiler, self._stack)
+        return spec
+
+
+@contextmanager
+def profile_imports(profiler: StartupProfiler) -> Iterator[StartupProfiler]:
+    """
+    Times every module first imported inside the block (already imported
+    ones cost nothing), e.g. around the app import in a custom entry point.
+    """
+    finder = _TimingFinder(profiler)
+    sys.meta_path.insert(0, finder)
+    try:
+        yield profiler
+    finally:
+        sys.meta_path.remove(finder)
+
+
+def import_times(module: str) -> list[Timing]:
+    """Per-module import times of module in a fresh interpreter (python -X importtime)."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(p for p in sys.path if p)},
+        check=True,
+    )
+    timings = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        timings.append(Timing(name.strip(), int(cumulative_us) / 1e6, int(self_us) / 1e6))
+    return timings
+
+
+class LazyContainer:
+    """
+    Builds the container on first use instead of at create_app() time, so
+    the app starts serving (liveness, /ready) before adapters are built.
+    The metrics registry exists up front because middleware needs it.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[..., Container] | None = None,
+        *,
+        profiler: StartupProfiler | None = None,
+        **options: Any,
+    ) -> None:
+        if factory is None:
+            from .wiring import build_container as factory
+        self._factory = factory
+        self._options = options
+        self._profiler = profiler
+        self._lock = threading.Lock()
+        self._container: Container | None = None
+        self.metrics: MetricsRegistry | None = None
+        if options.get("instrument", True):
+            from xagent2.metrics.core import MetricsRegistry
+
+            self.metrics = options.setdefault("metrics", MetricsRegistry())
+        if profiler is not None:
+            options.setdefault("profiler", profiler)
+
+    @property
+    def built(self) -> bool:
+        return self._container is not None
+
+    def get(self) -> Container:
+        container = self._container
+        if container is None:
+            with self._lock:
+                container = self._container
+                if container is None:
+                    start = time.perf_counter()
+                    container = self._factory(**self._options)
+                    if self._profiler is not None:
+                        self._profiler.record("container", time.perf_counter() - start)
+                    self._container = container
+        return container
+
+    async def aget(self) -> Container:
+        container = self._container
+        if container is None:
+            # Building may block (files, sockets, worker processes); keep it off the loop.
+            container = await asyncio.to_thread(self.get)
+        return container
+
+    def close(self) -> None:
+        with self._lock:
+            container, self._container = self._container, None
+        if container is not None:
+            container.close()
+
+
+def _name(fn: Callable) -> str:
+    return getattr(fn, "__qualname__", None) or type(fn).__name__
+
+
+class Readiness:
+    """
+    Ready once the container is built, its own adapter warmups
+    (Container.warmups) have run and then every warmup hook has finished.
+    A failing warmup leaves the app unready and is reported by /ready.
+    """
+
+    def __init__(self) -> None:
+        self.ready = False
+        self.error: str | None = None
+
+    async def run(
+        self,
+        resolve: Callable[[], Awaitable[Container]],
+        warmups: Sequence[WarmupHook],
+        profiler: StartupProfiler | None = None,
+    ) -> None:
+        try:
+            container = await resolve()
+            for warm in container.warmups:
+                start = time.perf_counter()
+                await asyncio.to_thread(warm)
+                if profiler is not None:
+                    profiler.record(f"warmup.{_name(warm)}", time.perf_counter() - start)
+            for hook in warmups:
+                start = time.perf_counter()
+                result = hook(container)
+                if asyncio.iscoroutine(result) or isinstance(result, asyncio.Future):
+                    await result
+                if profiler is not None:
+                    profiler.record(f"warmup.{_name(hook)}", time.perf_counter() - start)
+        except Exception as exc:
+            self.error = f"{type(exc).__name__}: {exc}"
+            return
+        self.ready = True
+
+
+def warm_answers(queries: Sequence[str]) -> WarmupHook:
+    """Answers these queries once so caches in front of the backend start warm."""
+
+    async def warm_answers(container: Container) -> None:
+        from xagent2.query_service.core import Query
+
+        for text in queries:
+            await asyncio.to_thread(container.answer_query, Query(text=text))
+
+    return warm_answers
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--lazy", action="store_true", help="profile with a LazyContainer")
+    parser.add_argument("--imports", type=int, default=20, help="slowest imports to list")
+    args = parser.parse_args(argv)
+
+    # This module's package has imported the app already; time a cold import
+    # in a fresh interpreter instead.
+    profiler = StartupProfiler()
+    profiler.imports = import_times("xagent2.assistant_api.core")
+    from .core import create_app
+    from .wiring import build_container
+
+    with profiler.phase("create_app"):
+        if args.lazy:
+            container = LazyContainer(profiler=profiler)
+        else:
+            container = build_container(profiler=profiler)
+        create_app(container)
+    if args.lazy:
+        with profiler.phase("first_use"):
+            container.get()
+    container.close()
+    print(profiler.report(args.imports))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,43 +1,401 @@
 from __future__ import annotations
 
+import secrets
 from dataclasses import dataclass
-from typing import Callable
+from typing import TYPE_CHECKING, Callable, Literal
 
-from xagent2.identity.core import IdentityConfig, IdentityService
-from xagent2.query_service.core import answer_query
+from xagent2.identity.core import AsyncIdentityService, IdentityConfig
+from xagent2.identity.tokens import TokenRevocations
+from xagent2.identity_api.core import AsyncPasswordHasher, SessionStore, UserRepository
+from xagent2.metrics.core import InstrumentedPort, MetricsRegistry
+from xagent2.query_service.batching import MicroBatcher
+from xagent2.query_service.cache import CachedAnswerer
+from xagent2.query_service.core import (
+    Query,
+    answer_queries,
+    answer_query,
+    chunked,
+    stream_answer,
+)
+from xagent2.query_service.history import ConversationalAnswerer, ConversationHistory
+from xagent2.query_service.index_file import MmapIndex
+from xagent2.query_service.retrieval import RetrievalAnswerer, load_jsonl_corpus
+from xagent2.rate_limit.core import BucketStore, InMemoryBucketStore, RateLimit, RateLimiter
 from .adapters import (
+    AwaitablePasswordHasher,
+    AwaitableSessionStore,
+    AwaitableUserRepo,
     InMemorySessionStore,
     InMemoryUserRepo,
+    ProcessPoolPasswordHasher,
     SimplePasswordHasher,
+    StripedSessionStore,
+    ThreadPoolSessionStore,
+    ThreadPoolUserRepo,
     UtcClock,
     UuidLikeIdGenerator,
 )
 
+if TYPE_CHECKING:
+    from .startup import StartupProfiler
 
-from typing import Callable
+# Storage adapters only some deployments use (SQLite, Redis, the session
+# cache) are imported inside build_container where they are chosen, so a
+# default startup doesn't pay for them.
 
 
 @dataclass(frozen=True)
 class Container:
-    identity: IdentityService
+    identity: AsyncIdentityService
     answer_query: Callable
+    stream_answer: Callable = stream_answer
+    closers: tuple[Callable[[], None], ...] = ()
+    metrics: MetricsRegistry | None = None
+    ip_limiter: RateLimiter | None = None
+    email_limiter: RateLimiter | None = None
+    # Blocking calls that get adapters ready for traffic (start worker
+    # processes, page in indexes); run once before the app reports ready.
+    warmups: tuple[Callable[[], object], ...] = ()
 
+    def close(self) -> None:
+        for close in self.closers:
+            close()
 
-def build_container() -> Container:
-    # In-memory skeleton wiring. Swap these adapters later (Postgres/Redis/etc.)
-    users = InMemoryUserRepo()
-    sessions = InMemorySessionStore()
-    hasher = SimplePasswordHasher()
-    ids = UuidLikeIdGenerator()
+
+def build_container(
+    *,
+    hasher_workers: int = 0,
+    hasher_max_pending: int = 64,
+    sqlite_path: str | None = None,
+    sqlite_pool_size: int = 4,
+    session_store_stripes: int = 1,
+    session_max_entries: int | None = None,
+    shared_state_address: str | None = None,
+    shared_state_authkey: bytes | None = None,
+    redis_address: str | None = None,
+    redis_pool_size: int = 8,
+    session_cache_size: int = 0,
+    query_cache_size: int = 0,
+    query_cache_ttl_seconds: float = 60.0,
+    query_batch_size: int = 0,
+    query_batch_wait_ms: float = 5.0,
+    retrieval_corpus_path: str | None = None,
+    retrieval_index_path: str | None = None,
+    semantic_cache_size: int = 0,
+    semantic_cache_threshold: float = 0.9,
+    semantic_cache_ttl_seconds: float = 60.0,
+    conversation_turns: int = 0,
+    conversation_max_users: int = 10_000,
+    conversation_max_bytes: int = 64 << 20,
+    ip_rate_limit: RateLimit | None = None,
+    email_rate_limit: RateLimit | None = None,
+    rate_limit_store: BucketStore | None = None,
+    session_mode: Literal["store", "signed"] = "store",
+    session_token_secret: bytes | None = None,
+    instrument: bool = True,
+    metrics: MetricsRegistry | None = None,
+    profiler: StartupProfiler | None = None,
+) -> Container:
+    """
+    hasher_workers > 0 moves password hashing onto a dedicated process pool
+    with at most hasher_max_pending queued jobs.
+    sqlite_path persists users and sessions in a SQLite file instead of memory.
+    shared_state_address/shared_state_authkey connect to a node-local state
+    server (see shared_state.start_shared_state) so several worker processes
+    share users, sessions and signed-token revocations; sqlite_path takes
+    precedence for users and sessions.
+    session_store_stripes > 1 splits the in-memory session store into that
+    many independently locked stripes, for heavily threaded workers.
+    session_max_entries caps the in-memory session store; past it, the
+    sessions closest to expiry are evicted first.
+    redis_address ("host:port") keeps sessions in a Redis-protocol server
+    shared by all replicas, over up to redis_pool_size pooled connections;
+    sessions expire there on their own. Users still come from sqlite_path,
+    shared state or memory.
+    session_cache_size > 0 puts an LRU cache of that many entries in front of
+    the session store, on the async side: hits never take a worker thread.
+    query_cache_size > 0 caches answers per normalized query and coalesces
+    concurrent identical queries into one backend call.
+    query_batch_size > 0 sends queries to the backend in batches of up to
+    that many, waiting at most query_batch_wait_ms to fill a batch.
+    retrieval_corpus_path indexes a JSON-lines corpus at startup and answers
+    queries with the best BM25 match. retrieval_index_path does the same from
+    a prebuilt index file (see query_service.index_file), mapped instead of
+    rebuilt, and takes precedence.
+    semantic_cache_size > 0 also reuses answers of paraphrased queries whose
+    embeddings are at least semantic_cache_threshold cosine-similar, for up
+    to semantic_cache_ttl_seconds (needs NumPy, the "numpy" extra).
+    conversation_turns > 0 keeps that many recent turns per user and hands
+    them to the backend with each /query (Query.context). At most
+    conversation_max_users users and about conversation_max_bytes of history
+    are kept; the least recently active users go first. It cannot be
+    combined with query_cache_size or semantic_cache_size: those key on the
+    query text alone and would hand one user's answer to another.
+    ip_rate_limit throttles /users and /login per client IP, and
+    email_rate_limit throttles /login per email; over-limit requests get a 429
+    before any password hashing. Buckets live in rate_limit_store, by default
+    an in-process InMemoryBucketStore. The client IP is the connection's
+    peer address. Behind a proxy, the server must trust that proxy's
+    X-Forwarded-For (uvicorn --forwarded-allow-ips or FORWARDED_ALLOW_IPS).
+    Otherwise every client shares the proxy's bucket.
+    session_mode="signed" issues HMAC-signed session tokens verified without a
+    store lookup (see IdentityConfig). Replicas must share
+    session_token_secret; without one a random per-process secret is used.
+    Logouts reach other processes only through the shared state server.
+    instrument records latency of every port call and answer_query call into
+    the container's metrics registry (served on /metrics), or into metrics if
+    one is given.
+    profiler, if given, records how long each group of adapters took to build.
+    """
+    if conversation_turns > 0 and (query_cache_size > 0 or semantic_cache_size > 0):
+        raise ValueError("conversation_turns cannot be combined with an answer cache")
+    lap = profiler.laps("container") if profiler is not None else _no_lap
+    if instrument and metrics is None:
+        metrics = MetricsRegistry()
+    elif not instrument:
+        metrics = None
     clock = UtcClock()
-    cfg = IdentityConfig()
+    ids = UuidLikeIdGenerator()
+    if session_mode == "signed" and session_token_secret is None:
+        session_token_secret = secrets.token_bytes(32)
+    token_revocations: TokenRevocations | None = None
+
+    closers: list[Callable[[], None]] = []
+    warmups: list[Callable[[], object]] = []
+    users: UserRepository
+    sessions: SessionStore
+    blocking_users = blocking_sessions = False
+    if sqlite_path is not None:
+        from xagent2.identity_sqlite.core import (
+            SqliteConnectionPool,
+            SqliteSessionStore,
+            SqliteUserRepo,
+        )
+
+        db = SqliteConnectionPool(sqlite_path, size=sqlite_pool_size)
+        users, sessions = SqliteUserRepo(db), SqliteSessionStore(db, clock=clock)
+        # Lock waits (busy_timeout), batch transactions and WAL checkpoints
+        # can block for seconds.
+        blocking_users = blocking_sessions = True
+        closers.append(db.close)
+    elif shared_state_address is not None:
+        if shared_state_authkey is None:
+            raise ValueError("shared_state_address needs shared_state_authkey")
+        # Imported here: only multi-worker deployments need it.
+        from .shared_state import connect_shared_state
+
+        users, sessions, token_revocations = connect_shared_state(
+            shared_state_address, shared_state_authkey
+        )
+        blocking_users = blocking_sessions = True
+    else:
+        # In-memory skeleton wiring. Swap these adapters later (Postgres/Redis/etc.)
+        users = InMemoryUserRepo()
+        if session_store_stripes > 1:
+            sessions = StripedSessionStore(
+                stripes=session_store_stripes, clock=clock, max_sessions=session_max_entries
+            )
+        else:
+            sessions = InMemorySessionStore(clock=clock, max_sessions=session_max_entries)
+    if redis_address is not None:
+        from xagent2.session_redis.core import RedisConnectionPool, RedisSessionStore
+
+        host, _, port = redis_address.rpartition(":")
+        redis = RedisConnectionPool(host or "127.0.0.1", int(port), size=redis_pool_size)
+        sessions = RedisSessionStore(redis)
+        blocking_sessions = True
+        closers.append(redis.close)
 
-    identity = IdentityService(
+    hasher: AsyncPasswordHasher
+    if hasher_workers > 0:
+        pool = ProcessPoolPasswordHasher(
+            SimplePasswordHasher(), max_workers=hasher_workers, max_pending=hasher_max_pending
+        )
+        hasher = pool.as_async()
+        closers.append(pool.shutdown)
+        warmups.append(pool.warm_up)
+    else:
+        hasher = AwaitablePasswordHasher(SimplePasswordHasher())
+    lap("identity_stores")
+
+    # Ports that block on disk or the network run in threads, off the event loop.
+    async_users = ThreadPoolUserRepo(users) if blocking_users else AwaitableUserRepo(users)
+    if blocking_sessions:
+        async_sessions = ThreadPoolSessionStore(sessions)
+    else:
+        async_sessions = AwaitableSessionStore(sessions)
+    if metrics is not None:
+        ports = _port_histogram(metrics)
+        async_users = InstrumentedPort(async_users, ports, "users")
+        async_sessions = InstrumentedPort(async_sessions, ports, "sessions")
+        hasher = InstrumentedPort(hasher, ports, "hasher")
+        _export_stats(metrics, "session_store", sessions)
+    if session_cache_size > 0:
+        from xagent2.session_cache.core import AsyncCachingSessionStore
+
+        # In front of the thread bridge, so hits never wait for a worker thread.
+        async_sessions = AsyncCachingSessionStore(
+            async_sessions, clock=clock, max_entries=session_cache_size
+        )
+        if metrics is not None:
+            _export_stats(metrics, "session_cache", async_sessions)
+
+    # Logouts of signed tokens must reach every worker that accepts them.
+    cfg = IdentityConfig(
+        session_mode=session_mode,
+        token_secret=session_token_secret,
+        token_revocations=token_revocations,
+    )
+    identity = AsyncIdentityService(
         config=cfg,
-        users=users,
-        sessions=sessions,
+        users=async_users,
+        sessions=async_sessions,
         hasher=hasher,
         ids=ids,
         clock=clock,
     )
-    return Container(identity=identity, answer_query=answer_query)
+    lap("identity_service")
+
+    answer: Callable = answer_query
+    batch_answer: Callable = answer_queries
+    retriever: RetrievalAnswerer | None = None
+    if retrieval_index_path is not None:
+        mapped = MmapIndex(retrieval_index_path)
+        closers.append(mapped.close)
+        retriever = RetrievalAnswerer(mapped)
+    elif retrieval_corpus_path is not None:
+        retriever = RetrievalAnswerer(load_jsonl_corpus(retrieval_corpus_path))
+    if retriever is not None:
+        answer = retriever
+        batch_answer = retriever.answer_many
+        # Pages in the index and loads NumPy before the first real query.
+        warmups.append(lambda: retriever(Query(text="warm up")))
+        lap("retrieval")
+    if query_batch_size > 0:
+        batcher = MicroBatcher(
+            batch_answer,
+            max_batch_size=query_batch_size,
+            max_wait_ms=query_batch_wait_ms,
+            on_batch=_batch_recorder(metrics) if metrics is not None else None,
+        )
+        answer = batcher
+        closers.append(batcher.close)
+        if metrics is not None:
+            _export_stats(metrics, "query_batcher", batcher)
+    if semantic_cache_size > 0:
+        # Imported here because it needs NumPy, which is optional.
+        try:
+            from xagent2.query_service.semantic_cache import (
+                HashingEmbedder,
+                SemanticAnswerCache,
+            )
+        except ModuleNotFoundError as exc:
+            if exc.name != "numpy":
+                raise
+            raise RuntimeError(
+                "semantic_cache_size needs NumPy; install the 'numpy' extra"
+            ) from exc
+
+        answer = SemanticAnswerCache(
+            answer,
+            HashingEmbedder(),
+            capacity=semantic_cache_size,
+            threshold=semantic_cache_threshold,
+            ttl_seconds=semantic_cache_ttl_seconds,
+        )
+        if metrics is not None:
+            _export_stats(metrics, "semantic_cache", answer)
+    if query_cache_size > 0:
+        answer = CachedAnswerer(
+            answer, max_entries=query_cache_size, ttl_seconds=query_cache_ttl_seconds
+        )
+        if metrics is not None:
+            _export_stats(metrics, "answer_cache", answer)
+    if conversation_turns > 0:
+        history = ConversationHistory(
+            turns_per_user=conversation_turns,
+            max_users=conversation_max_users,
+            max_bytes=conversation_max_bytes,
+        )
+        answer = ConversationalAnswerer(answer, history, max_users=conversation_max_users)
+        if metrics is not None:
+            _export_stats(metrics, "conversation_history", history)
+    # Only the built-in backend streams natively; anything configured in
+    # front of it streams its complete answer, so both routes agree.
+    stream: Callable = stream_answer if answer is answer_query else None
+    if metrics is not None:
+        answer = InstrumentedPort(answer, _port_histogram(metrics), "query")
+    if stream is None:
+        stream = chunked(answer)
+
+    ip_limiter = email_limiter = None
+    if ip_rate_limit is not None or email_rate_limit is not None:
+        store = rate_limit_store if rate_limit_store is not None else InMemoryBucketStore()
+        if ip_rate_limit is not None:
+            ip_limiter = RateLimiter(store, ip_rate_limit, name="ip")
+        if email_rate_limit is not None:
+            email_limiter = RateLimiter(store, email_rate_limit, name="email")
+        if metrics is not None:
+            _export_stats(metrics, "ip_rate_limiter", ip_limiter)
+            _export_stats(metrics, "email_rate_limiter", email_limiter)
+    lap("query_and_limits")
+    return Container(
+        identity=identity,
+        answer_query=answer,
+        stream_answer=stream,
+        closers=tuple(closers),
+        metrics=metrics,
+        ip_limiter=ip_limiter,
+        email_limiter=email_limiter,
+        warmups=tuple(warmups),
+    )
+
+
+def _no_lap(name: str) -> None:
+    pass
+
+
+def _port_histogram(metrics: MetricsRegistry):
+    return metrics.histogram(
+        "port_call_duration_seconds",
+        "Latency of identity port and query backend calls.",
+        ("port", "method"),
+    )
+
+
+def _batch_recorder(metrics: MetricsRegistry) -> Callable[[int, float], None]:
+    sizes = metrics.histogram(
+        "query_batch_size",
+        "Queries per backend batch.",
+        buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+    ).labels()
+    latency = metrics.histogram(
+        "query_batch_duration_seconds", "Backend latency per query batch."
+    ).labels()
+
+    def record(size: int, seconds: float) -> None:
+        sizes.observe(size)
+        latency.observe(seconds)
+
+    return record
+
+
+def _export_stats(metrics: MetricsRegistry, name: str, source: object) -> None:
+    """Expose the numeric fields of source.stats() (if it has one) as gauges."""
+    stats = getattr(source, "stats", None)
+    if stats is None:
+        return
+
+    def read() -> dict[tuple[str, ...], float]:
+        snapshot = stats()
+        fields = {
+            key: value
+            for key, value in vars(snapshot).items()
+            if isinstance(value, (int, float)) and not isinstance(value, bool)
+        }
+        if hasattr(snapshot, "hit_rate"):
+            fields["hit_rate"] = snapshot.hit_rate
+        return {(key,): float(value) for key, value in fields.items()}
+
+    metrics.gauge_callback(f"{name}_stats", f"Counters reported by the {name}.", read, ("stat",))
+
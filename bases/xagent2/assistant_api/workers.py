@@ -0,0 +1,107 @@
+"""
+Multi-process entry point: one node-local state server plus N uvicorn
+workers that all see the same users and sessions.
+
+    python -m xagent2.assistant_api.workers --workers 8 --port 8000
+
+The supervisor starts the state server, then hands its address and authkey
+to the workers through environment variables; each worker builds its app
+with create_worker_app(). Signed session tokens (--session-mode signed) get
+one secret shared by all workers the same way, and their revocations live
+in the state server, so a logout on one worker holds on all of them. With --redis-address,
+sessions live in that Redis-protocol server instead, so separate nodes can
+share them too.
+
+Behind a load balancer or ingress, pass its addresses as
+--forwarded-allow-ips: uvicorn then takes the client address from
+X-Forwarded-For, and the per-IP rate limit sees real clients instead of
+the proxy.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import secrets
+
+from fastapi import FastAPI
+
+from .core import create_app
+from .shared_state import new_authkey, start_shared_state
+from .startup import LazyContainer
+
+ADDRESS_ENV = "XAGENT2_SHARED_STATE_ADDRESS"
+AUTHKEY_ENV = "XAGENT2_SHARED_STATE_AUTHKEY"
+SESSION_MODE_ENV = "XAGENT2_SESSION_MODE"
+TOKEN_SECRET_ENV = "XAGENT2_SESSION_TOKEN_SECRET"
+REDIS_ADDRESS_ENV = "XAGENT2_REDIS_ADDRESS"
+FAST_RESPONSES_ENV = "XAGENT2_FAST_RESPONSES"
+
+
+def create_worker_app() -> FastAPI:
+    """
+    App factory for one worker; reads the shared state location from the
+    environment. The container is built lazily, so the worker binds its
+    socket and answers /ready (503 until warmed up) without waiting for it.
+    """
+    secret = os.environ.get(TOKEN_SECRET_ENV)
+    return create_app(
+        LazyContainer(
+            shared_state_address=os.environ[ADDRESS_ENV],
+            shared_state_authkey=bytes.fromhex(os.environ[AUTHKEY_ENV]),
+            session_mode=os.environ.get(SESSION_MODE_ENV, "store"),
+            session_token_secret=bytes.fromhex(secret) if secret else None,
+            redis_address=os.environ.get(REDIS_ADDRESS_ENV),
+        ),
+        fast_responses=os.environ.get(FAST_RESPONSES_ENV) == "1",
+    )
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--session-mode", choices=("store", "signed"), default="store")
+    parser.add_argument("--session-stripes", type=int, default=16)
+    parser.add_argument("--max-sessions", type=int, help="cap on stored sessions")
+    parser.add_argument("--redis-address", help="host:port of a shared session server")
+    parser.add_argument(
+        "--fast-responses", action="store_true", help="precompiled JSON for hot routes"
+    )
+    parser.add_argument(
+        "--forwarded-allow-ips",
+        help="proxies trusted for X-Forwarded-For (default: $FORWARDED_ALLOW_IPS or localhost)",
+    )
+    args = parser.parse_args(argv)
+
+    import uvicorn  # deployment-only dependency
+
+    authkey = new_authkey()
+    state = start_shared_state(
+        authkey=authkey, session_stripes=args.session_stripes, max_sessions=args.max_sessions
+    )
+    os.environ[ADDRESS_ENV] = str(state.address)
+    os.environ[AUTHKEY_ENV] = authkey.hex()
+    os.environ[SESSION_MODE_ENV] = args.session_mode
+    if args.session_mode == "signed":
+        os.environ[TOKEN_SECRET_ENV] = secrets.token_hex(32)
+    if args.redis_address:
+        os.environ[REDIS_ADDRESS_ENV] = args.redis_address
+    if args.fast_responses:
+        os.environ[FAST_RESPONSES_ENV] = "1"
+    try:
+        uvicorn.run(
+            "xagent2.assistant_api.workers:create_worker_app",
+            factory=True,
+            host=args.host,
+            port=args.port,
+            workers=args.workers,
+            proxy_headers=True,
+            forwarded_allow_ips=args.forwarded_allow_ips,
+        )
+    finally:
+        state.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1 @@
-from .core import IdentityService  # noqa: F401
+from .core import AsyncIdentityService, IdentityService  # noqa: F401
@@ -1,12 +1,17 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from datetime import timedelta
+from datetime import datetime, timedelta
+from typing import Literal, Sequence
 
 from xagent2.identity_api.core import (
+    AsyncPasswordHasher,
+    AsyncSessionStore,
+    AsyncUserRepository,
     AuthResult,
     Clock,
     CreateUserCmd,
+    IdentityError,
     IdGenerator,
     InvalidCredentials,
     LoginCmd,
@@ -21,11 +26,122 @@ from xagent2.identity_api.core import (
     UserRepository,
     default_session_ttl,
 )
+from .tokens import SignedSessions, TokenRevocations
 
 
 @dataclass(frozen=True)
 class IdentityConfig:
+    """
+    session_mode "store" issues opaque session IDs kept in the SessionStore.
+    "signed" issues HMAC-signed tokens (keyed by token_secret) that carry the
+    user_id and expiry, so authenticating needs no store lookup. Logouts are
+    recorded in token_revocations, which every service accepting the same
+    tokens must share (default: a new one, local to this service). A
+    disabled user's existing tokens stay valid until they expire.
+    """
+
     session_ttl: timedelta = default_session_ttl()
+    session_mode: Literal["store", "signed"] = "store"
+    token_secret: bytes | None = None
+    token_revocations: TokenRevocations | None = None
+
+
+def _signed_sessions(cfg: IdentityConfig) -> SignedSessions | None:
+    if cfg.session_mode == "store":
+        return None
+    if cfg.session_mode != "signed":
+        raise ValueError(f"unknown session_mode: {cfg.session_mode!r}")
+    if cfg.token_secret is None:
+        raise ValueError("session_mode 'signed' needs a token_secret")
+    return SignedSessions(cfg.token_secret, cfg.token_revocations)
+
+
+def normalize_email(email: str) -> str:
+    """The form emails are stored and looked up in; use it for any per-account key."""
+    return email.strip().lower()
+
+
+def _validate_new_user(cmd: CreateUserCmd) -> str:
+    email = normalize_email(cmd.email)
+    if not email:
+        raise ValueError("email must not be empty")
+    if not cmd.password:
+        raise ValueError("password must not be empty")
+    return email
+
+
+BulkCreateResult = User | IdentityError | ValueError
+
+
+def _plan_bulk_create(
+    cmds: Sequence[CreateUserCmd],
+) -> tuple[list[BulkCreateResult | None], list[tuple[int, str, str]]]:
+    """
+    Validates every command up front. Returns the per-row results known so
+    far (errors; None for rows still pending) and the pending rows as
+    (index, normalized email, password). Later duplicates of an email in
+    the same batch count as already existing.
+    """
+    results: list[BulkCreateResult | None] = [None] * len(cmds)
+    pending: list[tuple[int, str, str]] = []
+    seen: set[str] = set()
+    for i, cmd in enumerate(cmds):
+        try:
+            email = _validate_new_user(cmd)
+        except ValueError as exc:
+            results[i] = exc
+            continue
+        if email in seen:
+            results[i] = UserAlreadyExists()
+            continue
+        seen.add(email)
+        pending.append((i, email, cmd.password))
+    return results, pending
+
+
+def _new_users(
+    ids: IdGenerator, pending: list[tuple[int, str, str]], hashes: list[str]
+) -> list[User]:
+    return [
+        User(user_id=ids.new_id(), email=email, password_hash=pw_hash, is_active=True)
+        for (_, email, _), pw_hash in zip(pending, hashes)
+    ]
+
+
+def _finish_bulk_create(
+    results: list[BulkCreateResult | None],
+    pending: list[tuple[int, str, str]],
+    users: list[User],
+    created: list[bool],
+) -> list[BulkCreateResult]:
+    for (i, _, _), user, ok in zip(pending, users, created):
+        results[i] = user if ok else UserAlreadyExists()
+    return results  # type: ignore[return-value]
+
+
+def _check_login_user(user: User | None) -> User:
+    if user is None:
+        raise InvalidCredentials()
+    if not user.is_active:
+        raise UserDisabled()
+    return user
+
+
+def _new_session(cfg: IdentityConfig, ids: IdGenerator, user: User, now: datetime) -> Session:
+    return Session(
+        session_id=ids.new_id(),
+        user_id=user.user_id,
+        created_at=now,
+        expires_at=now + cfg.session_ttl,
+    )
+
+
+def _auth_result(session: Session) -> AuthResult:
+    return AuthResult(
+        user_id=session.user_id,
+        session_id=session.session_id,
+        expires_at=session.expires_at,
+    )
 
 
 class IdentityService:
@@ -50,13 +166,10 @@ class IdentityService:
         self._hasher = hasher
         self._ids = ids
         self._clock = clock
+        self._signed = _signed_sessions(config)
 
     def create_user(self, cmd: CreateUserCmd) -> User:
-        email = cmd.email.strip().lower()
-        if not email:
-            raise ValueError("email must not be empty")
-        if not cmd.password:
-            raise ValueError("password must not be empty")
+        email = _validate_new_user(cmd)
 
         if self._users.get_by_email(email) is not None:
             raise UserAlreadyExists()
@@ -64,43 +177,81 @@ class IdentityService:
         user_id = self._ids.new_id()
         pw_hash = self._hasher.hash_password(cmd.password)
         user = User(user_id=user_id, email=email, password_hash=pw_hash, is_active=True)
-        self._users.create(user)
+        # The lookup above only saves hashing for known emails; a concurrent
+        # signup with the same email is caught here.
+        if not self._users.create_if_absent(user):
+            raise UserAlreadyExists()
         return user
 
-    def login(self, cmd: LoginCmd) -> AuthResult:
-        email = cmd.email.strip().lower()
-        user = self._users.get_by_email(email)
-        if user is None:
-            raise InvalidCredentials()
+    def create_users(self, cmds: Sequence[CreateUserCmd]) -> list[BulkCreateResult]:
+        """
+        Bulk form of create_user. Returns one entry per command, in order:
+        the new User, or the error create_user would have raised for it.
+        Passwords are hashed as one batch when the hasher has hash_many
+        (e.g. spread over a process pool) and users are inserted with a
+        single create_many call.
+        """
+        results, candidates = _plan_bulk_create(cmds)
+        pending = []
+        for row in candidates:
+            if self._users.get_by_email(row[1]) is not None:
+                results[row[0]] = UserAlreadyExists()
+            else:
+                pending.append(row)
+        passwords = [pw for _, _, pw in pending]
+        hash_many = getattr(self._hasher, "hash_many", None)
+        if hash_many is not None:
+            hashes = hash_many(passwords)
+        else:
+            hashes = [self._hasher.hash_password(pw) for pw in passwords]
+        users = _new_users(self._ids, pending, hashes)
+        created = self._users.create_many(users) if users else []
+        return _finish_bulk_create(results, pending, users, created)
 
-        if not user.is_active:
-            raise UserDisabled()
+    def login(self, cmd: LoginCmd) -> AuthResult:
+        user = _check_login_user(self._users.get_by_email(normalize_email(cmd.email)))
 
         if not self._hasher.verify_password(cmd.password, user.password_hash):
             raise InvalidCredentials()
 
         now = self._clock.now()
-        session_id = self._ids.new_id()
-        expires_at = now + self._cfg.session_ttl
-        session = Session(
-            session_id=session_id,
-            user_id=user.user_id,
-            created_at=now,
-            expires_at=expires_at,
-        )
+        if self._signed is not None:
+            return _auth_result(self._signed.issue(user.user_id, now, now + self._cfg.session_ttl))
+        session = _new_session(self._cfg, self._ids, user, now)
         self._sessions.create_session(session)
-        return AuthResult(user_id=user.user_id, session_id=session_id, expires_at=expires_at)
+        return _auth_result(session)
 
     def logout(self, cmd: LogoutCmd) -> None:
+        if self._signed is not None:
+            if not self._signed.revoke(cmd.session_id, self._clock.now()):
+                raise SessionNotFound()
+            return
         sess = self._sessions.get_session(cmd.session_id)
         if sess is None:
             raise SessionNotFound()
         self._sessions.delete_session(cmd.session_id)
 
+    def revoke_sessions_for_user(self, user_id: str) -> int:
+        """
+        Ends every session of user_id and returns how many were deleted. In
+        signed mode all tokens issued so far are revoked, but since they are
+        not tracked the count is always 0.
+        """
+        if self._signed is not None:
+            now = self._clock.now()
+            self._signed.revoke_user(user_id, now, now + self._cfg.session_ttl)
+            return 0
+        return self._sessions.delete_sessions_for_user(user_id)
+
     def authenticate_session(self, session_id: str) -> str:
         """
         Helper used by inbound adapters: validates session and returns user_id.
         """
+        if self._signed is not None:
+            user_id = self._signed.verify(session_id, self._clock.now())
+            if user_id is None:
+                raise SessionNotFound()
+            return user_id
         sess = self._sessions.get_session(session_id)
         if sess is None:
             raise SessionNotFound()
@@ -108,3 +259,111 @@ class IdentityService:
             self._sessions.delete_session(session_id)
             raise SessionNotFound()
         return sess.user_id
+
+
+class AsyncIdentityService:
+    """
+    Async mirror of IdentityService over the async identity_api ports.
+    Same rules and errors; every repository, session store and hasher call
+    is awaited so an event loop can serve other requests meanwhile.
+    """
+
+    def __init__(
+        self,
+        *,
+        config: IdentityConfig,
+        users: AsyncUserRepository,
+        sessions: AsyncSessionStore,
+        hasher: AsyncPasswordHasher,
+        ids: IdGenerator,
+        clock: Clock,
+    ) -> None:
+        self._cfg = config
+        self._users = users
+        self._sessions = sessions
+        self._hasher = hasher
+        self._ids = ids
+        self._clock = clock
+        self._signed = _signed_sessions(config)
+
+    async def create_user(self, cmd: CreateUserCmd) -> User:
+        email = _validate_new_user(cmd)
+
+        if await self._users.get_by_email(email) is not None:
+            raise UserAlreadyExists()
+
+        user_id = self._ids.new_id()
+        pw_hash = await self._hasher.hash_password(cmd.password)
+        user = User(user_id=user_id, email=email, password_hash=pw_hash, is_active=True)
+        # The lookup above only saves hashing for known emails; a concurrent
+        # signup with the same email is caught here.
+        if not await self._users.create_if_absent(user):
+            raise UserAlreadyExists()
+        return user
+
+    async def create_users(self, cmds: Sequence[CreateUserCmd]) -> list[BulkCreateResult]:
+        """See IdentityService.create_users."""
+        results, candidates = _plan_bulk_create(cmds)
+        pending = []
+        for row in candidates:
+            if await self._users.get_by_email(row[1]) is not None:
+                results[row[0]] = UserAlreadyExists()
+            else:
+                pending.append(row)
+        passwords = [pw for _, _, pw in pending]
+        hash_many = getattr(self._hasher, "hash_many", None)
+        if hash_many is not None:
+            hashes = await hash_many(passwords)
+        else:
+            hashes = [await self._hasher.hash_password(pw) for pw in passwords]
+        users = _new_users(self._ids, pending, hashes)
+        created = await self._users.create_many(users) if users else []
+        return _finish_bulk_create(results, pending, users, created)
+
+    async def login(self, cmd: LoginCmd) -> AuthResult:
+        user = _check_login_user(await self._users.get_by_email(normalize_email(cmd.email)))
+
+        if not await self._hasher.verify_password(cmd.password, user.password_hash):
+            raise InvalidCredentials()
+
+        now = self._clock.now()
+        if self._signed is not None:
+            return _auth_result(self._signed.issue(user.user_id, now, now + self._cfg.session_ttl))
+        session = _new_session(self._cfg, self._ids, user, now)
+        await self._sessions.create_session(session)
+        return _auth_result(session)
+
+    async def logout(self, cmd: LogoutCmd) -> None:
+        if self._signed is not None:
+            if not self._signed.revoke(cmd.session_id, self._clock.now()):
+                raise SessionNotFound()
+            return
+        sess = await self._sessions.get_session(cmd.session_id)
+        if sess is None:
+            raise SessionNotFound()
+        await self._sessions.delete_session(cmd.session_id)
+
+    async def revoke_sessions_for_user(self, user_id: str) -> int:
+        """See IdentityService.revoke_sessions_for_user."""
+        if self._signed is not None:
+            now = self._clock.now()
+            self._signed.revoke_user(user_id, now, now + self._cfg.session_ttl)
+            return 0
+        return await self._sessions.delete_sessions_for_user(user_id)
+
+    async def authenticate_session(self, session_id: str) -> str:
+        """
+        Helper used by inbound adapters: validates session and returns user_id.
+        """
+        if self._signed is not None:
+            user_id = self._signed.verify(session_id, self._clock.now())
+            if user_id is None:
+                raise SessionNotFound()
+            return user_id
+        sess = await self._sessions.get_session(session_id)
+        if sess is None:
+            raise SessionNotFound()
+        if self._clock.now() >= sess.expires_at:
+            await self._sessions.delete_session(session_id)
+            raise SessionNotFound()
+        return sess.user_id
@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import base64
+import binascii
+import hashlib
+import heapq
+import hmac
+import os
+import struct
+import threading
+from datetime import datetime
+
+from xagent2.identity_api.core import Session, to_epoch_micros
+
+_VERSION = 1
+# version, expires_at (epoch microseconds), 8 random bytes
+_HEADER = struct.Struct(">BQ8s")
+_MAC_SIZE = 16
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+class SessionTokenCodec:
+    """
+    Compact HMAC-SHA256 signed session tokens.
+
+    A token is the urlsafe base64 of version | expires_at | nonce | user_id
+    followed by a 128-bit truncated MAC over all of it. Verifying needs only
+    the secret, so no session store is consulted.
+    """
+
+    def __init__(self, secret: bytes) -> None:
+        if len(secret) < 16:
+            raise ValueError("token secret must be at least 16 bytes")
+        self._secret = secret
+
+    def _mac(self, payload: bytes) -> bytes:
+        return hmac.digest(self._secret, payload, "sha256")[:_MAC_SIZE]
+
+    def encode(self, user_id: str, expires_at: datetime) -> str:
+        payload = _HEADER.pack(_VERSION, to_epoch_micros(expires_at), os.urandom(8))
+        payload += user_id.encode("utf-8")
+        return _b64encode(payload + self._mac(payload))
+
+    def decode(self, token: str) -> tuple[str, int, bytes] | None:
+        """
+        Returns (user_id, expires_at in epoch microseconds, MAC) for a token
+        with a valid signature, else None. Expiry is the caller's to check.
+        """
+        try:
+            raw = _b64decode(token)
+        except (binascii.Error, ValueError):
+            return None
+        if len(raw) <= _HEADER.size + _MAC_SIZE:
+            return None
+        payload, mac = raw[:-_MAC_SIZE], raw[-_MAC_SIZE:]
+        if not hmac.compare_digest(mac, self._mac(payload)):
+            return None
+        version, expires_us, _nonce = _HEADER.unpack_from(payload)
+        if version != _VERSION:
+            return None
+        try:
+            user_id = payload[_HEADER.size :].decode("utf-8")
+        except UnicodeDecodeError:
+            return None
+        return user_id, expires_us, mac
+
+
+class RevocationList:
+    """
+    Revoked tokens, remembered only until they expire anyway.
+
+    Lookups first consult a Bloom filter, so the common case (token not
+    revoked) is a few bit tests; hits are confirmed against an exact dict.
+    Entries are pruned once past their expiry, and the filter is rebuilt
+    from the surviving entries when enough have been pruned.
+    """
+
+    def __init__(self, *, bits: int = 1 << 20, hashes: int = 4) -> None:
+        if bits < 8 or bits & (bits - 1) or not 1 <= hashes <= 4:
+            raise ValueError("bits must be a power of two >= 8 and hashes 1..4")
+        self._bits = bits
+        self._mask = bits - 1
+        self._hashes = hashes
+        self._filter = bytearray(bits // 8)
+        self._exact: dict[bytes, int] = {}  # key -> expires_at (epoch us)
+        self._expiry: list[tuple[int, bytes]] = []
+        self._stale = 0  # pruned keys still set in the filter
+        self._lock = threading.Lock()
+
+    def _positions(self, key: bytes) -> list[int]:
+        # Keys are MACs, i.e. already uniformly distributed; shorter keys are hashed.
+        if len(key) < 16:
+            key = hashlib.blake2b(key, digest_size=16).digest()
+        bits = int.from_bytes(key[:16], "little")
+        return [(bits >> (32 * i)) & self._mask for i in range(self._hashes)]
+
+    def add(self, key: bytes, expires_us: int, now_us: int) -> bool:
+        """Adds key; returns False if it was already there."""
+        with self._lock:
+            self._prune_locked(now_us)
+            if key in self._exact:
+                return False
+            self._exact[key] = expires_us
+            heapq.heappush(self._expiry, (expires_us, key))
+            for pos in self._positions(key):
+                self._filter[pos >> 3] |= 1 << (pos & 7)
+            return True
+
+    def __contains__(self, key: bytes) -> bool:
+        for pos in self._positions(key):
+            if not self._filter[pos >> 3] & (1 << (pos & 7)):
+                return False
+        with self._lock:
+            return key in self._exact
+
+    def __len__(self) -> int:
+        return len(self._exact)
+
+    def _prune_locked(self, now_us: int) -> None:
+        while self._expiry and self._expiry[0][0] <= now_us:
+            _, key = heapq.heappop(self._expiry)
+            del self._exact[key]
+            self._stale += 1
+        if self._stale > 1024 and self._stale > len(self._exact):
+            self._filter = bytearray(self._bits // 8)
+            for key in self._exact:
+                for pos in self._positions(key):
+                    self._filter[pos >> 3] |= 1 << (pos & 7)
+            self._stale = 0
+
+
+class TokenRevocations:
+    """
+    What SignedSessions has revoked: single tokens, by MAC, and per-user
+    cutoffs (a user's tokens expiring at or before the cutoff are revoked).
+
+    This one is local to the process. Processes that accept each other's
+    tokens must share one; see assistant_api.shared_state.
+    """
+
+    def __init__(self) -> None:
+        self._tokens = RevocationList()
+        # user_id -> cutoff (epoch us)
+        self._user_cutoffs: dict[str, int] = {}
+        self._cutoffs_lock = threading.Lock()
+
+    def is_revoked(self, mac: bytes, user_id: str, expires_us: int, now_us: int) -> bool:
+        if mac in self._tokens:
+            return True
+        cutoff = self._user_cutoffs.get(user_id)
+        return cutoff is not None and expires_us <= cutoff
+
+    def revoke_token(self, mac: bytes, expires_us: int, now_us: int) -> bool:
+        """Returns False if the token was already revoked."""
+        return self._tokens.add(mac, expires_us, now_us)
+
+    def revoke_user(self, user_id: str, cutoff_us: int, now_us: int) -> None:
+        with self._cutoffs_lock:
+            cutoffs = self._user_cutoffs
+            cutoffs[user_id] = max(cutoffs.get(user_id, 0), cutoff_us)
+            if len(cutoffs) > 1024 and len(cutoffs) & (len(cutoffs) - 1) == 0:
+                # Past a cutoff every token it covers has expired anyway.
+                self._user_cutoffs = {u: c for u, c in cutoffs.items() if c > now_us}
+
+
+class SignedSessions:
+    """Issues, verifies and revokes signed session tokens for the identity services."""
+
+    def __init__(self, secret: bytes, revocations: TokenRevocations | None = None) -> None:
+        self._codec = SessionTokenCodec(secret)
+        self._revocations = revocations if revocations is not None else TokenRevocations()
+
+    def issue(self, user_id: str, now: datetime, expires_at: datetime) -> Session:
+        return Session(
+            session_id=self._codec.encode(user_id, expires_at),
+            user_id=user_id,
+            created_at=now,
+            expires_at=expires_at,
+        )
+
+    def verify(self, token: str, now: datetime) -> str | None:
+        """Returns the token's user_id if it is authentic, unexpired and not revoked."""
+        decoded = self._codec.decode(token)
+        if decoded is None:
+            return None
+        user_id, expires_us, mac = decoded
+        now_us = to_epoch_micros(now)
+        if now_us >= expires_us or self._revocations.is_revoked(mac, user_id, expires_us, now_us):
+            return None
+        return user_id
+
+    def revoke(self, token: str, now: datetime) -> bool:
+        """Revokes a valid token; returns False if it was not valid to begin with."""
+        decoded = self._codec.decode(token)
+        if decoded is None:
+            return False
+        _, expires_us, mac = decoded
+        now_us = to_epoch_micros(now)
+        if now_us >= expires_us:
+            return False
+        return self._revocations.revoke_token(mac, expires_us, now_us)
+
+    def revoke_user(self, user_id: str, now: datetime, latest_expiry: datetime) -> None:
+        """
+        Revokes every token of user_id issued so far. latest_expiry is the
+        expiry a token issued now would get; nothing issued earlier outlives it.
+        """
+        self._revocations.revoke_user(user_id, to_epoch_micros(latest_expiry), to_epoch_micros(now))
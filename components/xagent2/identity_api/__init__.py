@@ -1,7 +1,13 @@
 from .core import (  # noqa: F401
+    AsyncBatchPasswordHasher,
+    AsyncPasswordHasher,
+    AsyncSessionStore,
+    AsyncUserRepository,
     AuthResult,
+    BatchPasswordHasher,
     Clock,
     CreateUserCmd,
+    HasherOverloaded,
     IdentityError,
     IdGenerator,
     InvalidCredentials,
@@ -17,4 +23,6 @@ from .core import (  # noqa: F401
     UserNotFound,
     UserRepository,
     default_session_ttl,
+    from_epoch_micros,
+    to_epoch_micros,
 )
@@ -1,13 +1,13 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from datetime import datetime, timedelta
-from typing import Protocol, runtime_checkable
+from datetime import datetime, timedelta, timezone
+from typing import Protocol, Sequence, runtime_checkable
 
 
 # ---------- Domain models / DTOs ----------
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class User:
     user_id: str
     email: str
@@ -15,7 +15,7 @@ class User:
     is_active: bool = True
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Session:
     session_id: str
     user_id: str
@@ -73,6 +73,10 @@ class SessionNotFound(IdentityError):
     pass
 
 
+class HasherOverloaded(IdentityError):
+    """Raised when the password hasher sheds load instead of queueing more work."""
+
+
 # ---------- Ports (Protocols) ----------
 
 @runtime_checkable
@@ -80,6 +84,11 @@ class UserRepository(Protocol):
     def get_by_email(self, email: str) -> User | None: ...
     def get_by_id(self, user_id: str) -> User | None: ...
     def create(self, user: User) -> None: ...
+    # Atomically inserts user unless its email is taken; False if it was.
+    def create_if_absent(self, user: User) -> bool: ...
+    # Batch insert. Per user, False means its email was already taken (also
+    # by an earlier user in the same batch) and it was skipped.
+    def create_many(self, users: Sequence[User]) -> list[bool]: ...
 
 
 @runtime_checkable
@@ -88,11 +97,50 @@ class PasswordHasher(Protocol):
     def verify_password(self, password: str, password_hash: str) -> bool: ...
 
 
+@runtime_checkable
+class BatchPasswordHasher(Protocol):
+    """Optional hasher capability: hash many passwords at once (e.g. across cores)."""
+
+    def hash_many(self, passwords: Sequence[str]) -> list[str]: ...
+
+
 @runtime_checkable
 class SessionStore(Protocol):
     def create_session(self, session: Session) -> None: ...
     def get_session(self, session_id: str) -> Session | None: ...
     def delete_session(self, session_id: str) -> None: ...
+    # Deletes every session of user_id; returns how many were deleted.
+    def delete_sessions_for_user(self, user_id: str) -> int: ...
+
+
+# Async variants of the I/O ports, for adapters backed by network stores.
+
+@runtime_checkable
+class AsyncUserRepository(Protocol):
+    async def get_by_email(self, email: str) -> User | None: ...
+    async def get_by_id(self, user_id: str) -> User | None: ...
+    async def create(self, user: User) -> None: ...
+    async def create_if_absent(self, user: User) -> bool: ...
+    async def create_many(self, users: Sequence[User]) -> list[bool]: ...
+
+
+@runtime_checkable
+class AsyncPasswordHasher(Protocol):
+    async def hash_password(self, password: str) -> str: ...
+    async def verify_password(self, password: str, password_hash: str) -> bool: ...
+
+
+@runtime_checkable
+class AsyncBatchPasswordHasher(Protocol):
+    async def hash_many(self, passwords: Sequence[str]) -> list[str]: ...
+
+
+@runtime_checkable
+class AsyncSessionStore(Protocol):
+    async def create_session(self, session: Session) -> None: ...
+    async def get_session(self, session_id: str) -> Session | None: ...
+    async def delete_session(self, session_id: str) -> None: ...
+    async def delete_sessions_for_user(self, user_id: str) -> int: ...
 
 
 @runtime_checkable
@@ -107,3 +155,17 @@ class Clock(Protocol):
 
 def default_session_ttl() -> timedelta:
     return timedelta(hours=12)
+
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def to_epoch_micros(value: datetime) -> int:
+    """Microseconds since the Unix epoch, exactly (no float timestamp)."""
+    delta = value - _EPOCH
+    return (delta.days * 86_400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def from_epoch_micros(value: int) -> datetime:
+    """The UTC datetime value microseconds after the Unix epoch."""
+    return _EPOCH + timedelta(microseconds=value)
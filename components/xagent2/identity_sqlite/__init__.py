@@ -0,0 +1,5 @@
+from .core import (  # noqa: F401
+    SqliteConnectionPool,
+    SqliteSessionStore,
+    SqliteUserRepo,
+)
@@ -0,0 +1,257 @@
+from __future__ import annotations
+
+import itertools
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator, Sequence
+
+from xagent2.identity_api.core import (
+    Clock,
+    Session,
+    SessionStore,
+    User,
+    UserAlreadyExists,
+    UserRepository,
+    from_epoch_micros,
+    to_epoch_micros,
+)
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        user_id TEXT PRIMARY KEY,
+        email TEXT NOT NULL,
+        password_hash TEXT NOT NULL,
+        is_active INTEGER NOT NULL
+    ) WITHOUT ROWID
+    """,
+    "CREATE UNIQUE INDEX IF NOT EXISTS users_email_idx ON users (email)",
+    """
+    CREATE TABLE IF NOT EXISTS sessions (
+        session_id TEXT PRIMARY KEY,
+        user_id TEXT NOT NULL,
+        created_at INTEGER NOT NULL,
+        expires_at INTEGER NOT NULL
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS sessions_expires_idx ON sessions (expires_at)",
+    "CREATE INDEX IF NOT EXISTS sessions_user_idx ON sessions (user_id)",
+)
+
+# Statements are module constants so sqlite3's per-connection statement cache
+# reuses the prepared form on every call.
+_GET_USER_BY_EMAIL = (
+    "SELECT user_id, email, password_hash, is_active FROM users WHERE email = ?"
+)
+_GET_USER_BY_ID = (
+    "SELECT user_id, email, password_hash, is_active FROM users WHERE user_id = ?"
+)
+_INSERT_USER = (
+    "INSERT INTO users (user_id, email, password_hash, is_active) VALUES (?, ?, ?, ?)"
+)
+_INSERT_USER_IF_ABSENT = (
+    "INSERT OR IGNORE INTO users (user_id, email, password_hash, is_active) VALUES (?, ?, ?, ?)"
+)
+_INSERT_SESSION = (
+    "INSERT OR REPLACE INTO sessions (session_id, user_id, created_at, expires_at) "
+    "VALUES (?, ?, ?, ?)"
+)
+_GET_SESSION = (
+    "SELECT session_id, user_id, created_at, expires_at FROM sessions WHERE session_id = ?"
+)
+_DELETE_SESSION = "DELETE FROM sessions WHERE session_id = ?"
+_DELETE_USER_SESSIONS = "DELETE FROM sessions WHERE user_id = ?"
+_DELETE_EXPIRED = "DELETE FROM sessions WHERE expires_at <= ?"
+_DELETE_EXPIRED_BATCH = (
+    "DELETE FROM sessions WHERE session_id IN "
+    "(SELECT session_id FROM sessions WHERE expires_at <= ? LIMIT ?)"
+)
+
+
+class SqliteConnectionPool:
+    """
+    Small fixed-size pool of SQLite connections to one database file.
+
+    Connections run in WAL mode so readers never block the writer, and
+    autocommit mode so each statement is its own short transaction.
+    """
+
+    def __init__(self, path: str | Path, *, size: int = 4, busy_timeout_ms: int = 5000) -> None:
+        if size <= 0:
+            raise ValueError("size must be positive")
+        self._path = str(path)
+        self._busy_timeout_ms = busy_timeout_ms
+        self._idle: queue.LifoQueue[sqlite3.Connection] = queue.LifoQueue()
+        self._all: list[sqlite3.Connection] = []
+        self._closed = False
+        self._lock = threading.Lock()
+        for _ in range(size):
+            conn = self._connect()
+            self._all.append(conn)
+            self._idle.put(conn)
+        with self.connection() as conn:
+            for ddl in _SCHEMA:
+                conn.execute(ddl)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self._path,
+            check_same_thread=False,
+            isolation_level=None,
+            cached_statements=64,
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self._busy_timeout_ms)}")
+        return conn
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        if self._closed:
+            raise RuntimeError("connection pool is closed")
+        conn = self._idle.get()
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        for conn in self._all:
+            conn.close()
+
+
+class SqliteUserRepo(UserRepository):
+    def __init__(self, pool: SqliteConnectionPool) -> None:
+        self._pool = pool
+
+    def get_by_email(self, email: str) -> User | None:
+        with self._pool.connection() as conn:
+            row = conn.execute(_GET_USER_BY_EMAIL, (email,)).fetchone()
+        return _row_to_user(row)
+
+    def get_by_id(self, user_id: str) -> User | None:
+        with self._pool.connection() as conn:
+            row = conn.execute(_GET_USER_BY_ID, (user_id,)).fetchone()
+        return _row_to_user(row)
+
+    def create(self, user: User) -> None:
+        with self._pool.connection() as conn:
+            try:
+                conn.execute(
+                    _INSERT_USER,
+                    (user.user_id, user.email, user.password_hash, int(user.is_active)),
+                )
+            except sqlite3.IntegrityError as exc:
+                raise UserAlreadyExists() from exc
+
+    def create_if_absent(self, user: User) -> bool:
+        with self._pool.connection() as conn:
+            cur = conn.execute(
+                _INSERT_USER_IF_ABSENT,
+                (user.user_id, user.email, user.password_hash, int(user.is_active)),
+            )
+        return cur.rowcount == 1
+
+    def create_many(self, users: Sequence[User]) -> list[bool]:
+        # One transaction for the whole batch; INSERT OR IGNORE skips taken
+        # emails and rowcount tells which rows went in.
+        created = []
+        with self._pool.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for user in users:
+                    cur = conn.execute(
+                        _INSERT_USER_IF_ABSENT,
+                        (user.user_id, user.email, user.password_hash, int(user.is_active)),
+                    )
+                    created.append(cur.rowcount == 1)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        return created
+
+
+class SqliteSessionStore(SessionStore):
+    """
+    Sessions in SQLite. Every sweep_every-th create_session also deletes up
+    to sweep_batch expired sessions (found through the expiry index), so
+    the table doesn't keep every session ever issued. delete_expired
+    removes all of them at once, e.g. from a maintenance job.
+    """
+
+    def __init__(
+        self,
+        pool: SqliteConnectionPool,
+        *,
+        clock: Clock | None = None,
+        sweep_every: int = 64,
+        sweep_batch: int = 256,
+    ) -> None:
+        if sweep_every <= 0:
+            raise ValueError("sweep_every must be positive")
+        if sweep_batch <= 0:
+            raise ValueError("sweep_batch must be positive")
+        self._pool = pool
+        self._clock = clock
+        self._sweep_every = sweep_every
+        self._sweep_batch = sweep_batch
+        self._writes = itertools.count(1)
+
+    def create_session(self, session: Session) -> None:
+        sweep = next(self._writes) % self._sweep_every == 0
+        with self._pool.connection() as conn:
+            conn.execute(
+                _INSERT_SESSION,
+                (
+                    session.session_id,
+                    session.user_id,
+                    to_epoch_micros(session.created_at),
+                    to_epoch_micros(session.expires_at),
+                ),
+            )
+            if sweep:
+                now = self._clock.now() if self._clock is not None else datetime.now(timezone.utc)
+                conn.execute(_DELETE_EXPIRED_BATCH, (to_epoch_micros(now), self._sweep_batch))
+
+    def get_session(self, session_id: str) -> Session | None:
+        with self._pool.connection() as conn:
+            row = conn.execute(_GET_SESSION, (session_id,)).fetchone()
+        if row is None:
+            return None
+        return Session(
+            session_id=row[0],
+            user_id=row[1],
+            created_at=from_epoch_micros(row[2]),
+            expires_at=from_epoch_micros(row[3]),
+        )
+
+    def delete_session(self, session_id: str) -> None:
+        with self._pool.connection() as conn:
+            conn.execute(_DELETE_SESSION, (session_id,))
+
+    def delete_sessions_for_user(self, user_id: str) -> int:
+        with self._pool.connection() as conn:
+            return conn.execute(_DELETE_USER_SESSIONS, (user_id,)).rowcount
+
+    def delete_expired(self, now: datetime) -> int:
+        """
+        Remove every session that expired at or before now, in one statement
+        driven by the expiry index. Returns the number of sessions removed.
+        """
+        with self._pool.connection() as conn:
+            return conn.execute(_DELETE_EXPIRED, (to_epoch_micros(now),)).rowcount
+
+
+def _row_to_user(row: tuple | None) -> User | None:
+    if row is None:
+        return None
+    return User(user_id=row[0], email=row[1], password_hash=row[2], is_active=bool(row[3]))
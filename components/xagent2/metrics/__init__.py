@@ -0,0 +1,7 @@
+from .core import (  # noqa: F401
+    DEFAULT_LATENCY_BUCKETS,
+    Counter,
+    Histogram,
+    InstrumentedPort,
+    MetricsRegistry,
+)
@@ -0,0 +1,291 @@
+from __future__ import annotations
+
+import abc
+import inspect
+import math
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Iterable, Mapping
+
+# Seconds; tuned for request paths that range from tens of microseconds
+# (cache hits) to a few seconds (LLM backends).
+DEFAULT_LATENCY_BUCKETS: tuple[float, ...] = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(pairs: Iterable[tuple[str, str]]) -> str:
+    body = ",".join(f'{k}="{_escape(v)}"' for k, v in pairs)
+    return "{" + body + "}" if body else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Family(abc.ABC):
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...]) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._children: dict[tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, **labels: str):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._children[key] = self._new_child()
+        return child
+
+    @abc.abstractmethod
+    def _new_child(self): ...
+
+    def _label_pairs(self, key: tuple[str, ...]) -> list[tuple[str, str]]:
+        return list(zip(self.labelnames, key))
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in sorted(self._children.items()):
+            lines.extend(self._render_child(self._label_pairs(key), child))
+        return lines
+
+    @abc.abstractmethod
+    def _render_child(self, pairs, child) -> list[str]: ...
+
+
+class _CounterChild:
+    __slots__ = ("_value", "_lock")
+
+    def __init__(self) -> None:
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+
+class Counter(_Family):
+    kind = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def _render_child(self, pairs, child: _CounterChild) -> list[str]:
+        return [f"{self.name}_total{_format_labels(pairs)} {_format_value(child.value)}"]
+
+
+class _HistogramChild:
+    __slots__ = ("_bounds", "_counts", "_sum", "_lock")
+
+    def __init__(self, bounds: tuple[float, ...]) -> None:
+        self._bounds = bounds
+        self._counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        idx = bisect_left(self._bounds, value)
+        with self._lock:
+            self._counts[idx] += 1
+            self._sum += value
+
+    def time(self) -> _Timer:
+        return _Timer(self)
+
+    def snapshot(self) -> tuple[list[int], float]:
+        with self._lock:
+            return list(self._counts), self._sum
+
+
+class _Timer:
+    __slots__ = ("_child", "_start")
+
+    def __init__(self, child: _HistogramChild) -> None:
+        self._child = child
+
+    def __enter__(self) -> _Timer:
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._child.observe(time.perf_counter() - self._start)
+
+
+class Histogram(_Family):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: tuple[str, ...],
+        buckets: tuple[float, ...] = DEFAULT_LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, help, labelnames)
+        self._bounds = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self._bounds)
+
+    def _render_child(self, pairs, child: _HistogramChild) -> list[str]:
+        counts, total = child.snapshot()
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self._bounds + (math.inf,), counts):
+            cumulative += count
+            le = pairs + [("le", _format_value(bound))]
+            lines.append(f"{self.name}_bucket{_format_labels(le)} {cumulative}")
+        lines.append(f"{self.name}_sum{_format_labels(pairs)} {_format_value(total)}")
+        lines.append(f"{self.name}_count{_format_labels(pairs)} {cumulative}")
+        return lines
+
+
+class _CallbackGauge:
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: tuple[str, ...],
+        read: Callable[[], Mapping[tuple[str, ...], float] | float],
+    ) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._read = read
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        values = self._read()
+        if not isinstance(values, Mapping):
+            values = {(): values}
+        for key, value in sorted(values.items()):
+            pairs = list(zip(self.labelnames, key))
+            lines.append(f"{self.name}{_format_labels(pairs)} {_format_value(float(value))}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Process-local metrics exported in the Prometheus text format.
+
+    Recording is a bisect plus a short per-series lock, cheap enough to leave
+    on for every request. Gauges are read through callbacks at scrape time,
+    so components can expose their own counters without depending on this
+    module.
+    """
+
+    def __init__(self) -> None:
+        self._families: dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self._register(name, lambda: Counter(name, help, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._register(name, lambda: Histogram(name, help, labelnames, buckets))
+
+    def gauge_callback(
+        self,
+        name: str,
+        help: str,
+        read: Callable[[], Mapping[tuple[str, ...], float] | float],
+        labelnames: tuple[str, ...] = (),
+    ) -> None:
+        self._register(name, lambda: _CallbackGauge(name, help, labelnames, read))
+
+    def render(self) -> str:
+        with self._lock:
+            families = list(self._families.values())
+        lines: list[str] = []
+        for family in families:
+            lines.extend(family.render())
+        return "\n".join(lines) + "\n"
+
+    def _register(self, name: str, make: Callable[[], Any]):
+        with self._lock:
+            family = self._families.get(name)
+            if family is None:
+                family = self._families[name] = make()
+            return family
+
+
+class InstrumentedPort:
+    """
+    Transparent proxy that records the latency of every public method call
+    (sync or async) on the wrapped port in histogram, labelled with port and
+    method. Calling the proxy itself is recorded as method "call".
+    """
+
+    def __init__(self, inner: Any, histogram: Histogram, port: str) -> None:
+        self._inner = inner
+        self._histogram = histogram
+        self._port = port
+        self._call_child = histogram.labels(port=port, method="call")
+
+    def __call__(self, *args, **kwargs):
+        with self._call_child.time():
+            return self._inner(*args, **kwargs)
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._inner, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+        child = self._histogram.labels(port=self._port, method=name)
+        if inspect.iscoroutinefunction(attr):
+
+            async def timed_async(*args, **kwargs):
+                with child.time():
+                    return await attr(*args, **kwargs)
+
+            wrapper = timed_async
+        else:
+
+            def timed(*args, **kwargs):
+                with child.time():
+                    return attr(*args, **kwargs)
+
+            wrapper = timed
+        # Cache on the instance so later lookups skip __getattr__ entirely.
+        self.__dict__[name] = wrapper
+        return wrapper
@@ -1,5 +1,38 @@
 from xagent2.query_service.core import (  # noqa: F401
     Answer,
+    AnswerChunk,
     Query,
+    Turn,
+    answer_queries,
     answer_query,
+    chunked,
+    stream_answer,
+)
+from xagent2.query_service.batching import (  # noqa: F401
+    BatchStats,
+    MicroBatcher,
+)
+from xagent2.query_service.cache import (  # noqa: F401
+    AnswerCacheStats,
+    CachedAnswerer,
+)
+from xagent2.query_service.history import (  # noqa: F401
+    ConversationalAnswerer,
+    ConversationHistory,
+    HistoryStats,
+    HistoryWindow,
+)
+from xagent2.query_service.retrieval import (  # noqa: F401
+    Bm25Params,
+    Bm25Scorer,
+    IndexBuilder,
+    InvertedIndex,
+    RetrievalAnswerer,
+    SearchHit,
+    load_jsonl_corpus,
+)
+from xagent2.query_service.index_file import (  # noqa: F401
+    IndexFormatError,
+    MmapIndex,
+    write_index,
 )
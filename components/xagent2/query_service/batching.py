@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Callable
+
+from xagent2.query_service.core import Answer, Query
+
+_STOP = object()
+
+
+@dataclass(frozen=True)
+class BatchStats:
+    batches: int
+    items: int
+    max_batch_size: int
+    last_batch_size: int
+    last_latency_s: float
+    total_latency_s: float
+
+    @property
+    def mean_batch_size(self) -> float:
+        return self.items / self.batches if self.batches else 0.0
+
+
+class MicroBatcher:
+    """
+    Collects concurrent single-query calls into batches for a batch backend.
+
+    Callers use it like answer_query and block until their answer is ready.
+    A background thread sends a batch once max_batch_size queries are waiting
+    or max_wait_ms has passed since the first one arrived, whichever is
+    first. If a batch fails, its queries are retried one by one so a single
+    bad query only fails its own caller. on_batch(size, latency_s) is called
+    after every backend call.
+    """
+
+    def __init__(
+        self,
+        answer_queries: Callable[[list[Query]], list[Answer]],
+        *,
+        max_batch_size: int = 16,
+        max_wait_ms: float = 5.0,
+        on_batch: Callable[[int, float], None] | None = None,
+    ) -> None:
+        if max_batch_size <= 0:
+            raise ValueError("max_batch_size must be positive")
+        if max_wait_ms < 0:
+            raise ValueError("max_wait_ms must not be negative")
+        self._answer_queries = answer_queries
+        self._max_batch_size = max_batch_size
+        self._max_wait = max_wait_ms / 1000
+        self._on_batch = on_batch
+        self._pending: queue.SimpleQueue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._worker: threading.Thread | None = None
+        self._closed = False
+        self._batches = 0
+        self._items = 0
+        self._max_seen = 0
+        self._last_size = 0
+        self._last_latency = 0.0
+        self._total_latency = 0.0
+
+    def __call__(self, query: Query) -> Answer:
+        return self.submit(query).result()
+
+    def submit(self, query: Query) -> Future[Answer]:
+        fut: Future[Answer] = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("batcher is closed")
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run, name="query-micro-batcher", daemon=True
+                )
+                self._worker.start()
+            self._pending.put((query, fut))
+        return fut
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            worker = self._worker
+            self._pending.put(_STOP)
+        if worker is not None:
+            worker.join()
+
+    def stats(self) -> BatchStats:
+        with self._lock:
+            return BatchStats(
+                batches=self._batches,
+                items=self._items,
+                max_batch_size=self._max_seen,
+                last_batch_size=self._last_size,
+                last_latency_s=self._last_latency,
+                total_latency_s=self._total_latency,
+            )
+
+    def _run(self) -> None:
+        while True:
+            first = self._pending.get()
+            if first is _STOP:
+                return
+            batch = [first]
+            stopping = False
+            deadline = time.monotonic() + self._max_wait
+            while len(batch) < self._max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    if remaining > 0:
+                        item = self._pending.get(timeout=remaining)
+                    else:
+                        item = self._pending.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._dispatch(batch)
+            if stopping:
+                return
+
+    def _dispatch(self, batch: list[tuple[Query, Future[Answer]]]) -> None:
+        queries = [query for query, _ in batch]
+        start = time.perf_counter()
+        try:
+            answers = self._answer_queries(queries)
+            if len(answers) != len(queries):
+                raise RuntimeError("answer_queries returned the wrong number of answers")
+        except Exception:
+            answers = None
+        self._record(len(batch), time.perf_counter() - start)
+
+        if answers is not None:
+            for (_, fut), answer in zip(batch, answers):
+                fut.set_result(answer)
+            return
+        for query, fut in batch:
+            try:
+                fut.set_result(self._answer_queries([query])[0])
+            except Exception as exc:
+                fut.set_exception(exc)
+
+    def _record(self, size: int, latency: float) -> None:
+        with self._lock:
+            self._batches += 1
+            self._items += size
+            self._max_seen = max(self._max_seen, size)
+            self._last_size = size
+            self._last_latency = latency
+            self._total_latency += latency
+        if self._on_batch is not None:
+            self._on_batch(size, latency)
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Callable
+
+from xagent2.query_service.core import Answer, Query
+
+
+def cache_key(query: Query) -> str:
+    """Queries that differ only in case or whitespace share a cache entry."""
+    return " ".join(query.text.split()).casefold()
+
+
+@dataclass(frozen=True)
+class AnswerCacheStats:
+    hits: int
+    misses: int
+    coalesced: int
+    evictions: int
+    size: int
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.coalesced + self.misses
+        return (self.hits + self.coalesced) / total if total else 0.0
+
+
+class CachedAnswerer:
+    """
+    Response cache around an answer function (same signature as answer_query).
+
+    Entries are keyed on the normalized query text and bounded by both
+    max_entries (LRU) and ttl_seconds. Concurrent callers asking the same
+    uncached question wait on a single backend call instead of each making
+    their own. Failures are shared with the waiting callers but not cached.
+    """
+
+    def __init__(
+        self,
+        answer: Callable[[Query], Answer],
+        *,
+        max_entries: int = 1024,
+        ttl_seconds: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if max_entries <= 0:
+            raise ValueError("max_entries must be positive")
+        if ttl_seconds <= 0:
+            raise ValueError("ttl_seconds must be positive")
+        self._answer = answer
+        self._max_entries = max_entries
+        self._ttl = ttl_seconds
+        self._clock = clock
+        self._entries: OrderedDict[str, tuple[Answer, float]] = OrderedDict()
+        self._inflight: dict[str, Future[Answer]] = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._coalesced = 0
+        self._evictions = 0
+
+    def __call__(self, query: Query) -> Answer:
+        key = cache_key(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] > self._clock():
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return entry[0]
+                del self._entries[key]
+            pending = self._inflight.get(key)
+            leader = pending is None
+            if leader:
+                self._misses += 1
+                pending = self._inflight[key] = Future()
+            else:
+                self._coalesced += 1
+        if not leader:
+            return pending.result()
+
+        try:
+            answer = self._answer(query)
+        except BaseException as exc:
+            with self._lock:
+                del self._inflight[key]
+            pending.set_exception(exc)
+            raise
+        with self._lock:
+            del self._inflight[key]
+            self._entries[key] = (answer, self._clock() + self._ttl)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+        pending.set_result(answer)
+        return answer
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> AnswerCacheStats:
+        with self._lock:
+            return AnswerCacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                coalesced=self._coalesced,
+                evictions=self._evictions,
+                size=len(self._entries),
+            )
@@ -1,10 +1,25 @@
 from dataclasses import dataclass
 from datetime import datetime, timezone
+from typing import Callable, Iterator
+
+
+@dataclass(frozen=True)
+class Turn:
+    """One earlier query and its answer; seq orders a user's turns."""
+
+    seq: int
+    query: str
+    answer: str
+    created_at: datetime
 
 
 @dataclass(frozen=True)
 class Query:
     text: str
+    # Who asked, and their recent turns oldest first (see history.py).
+    # Backends that don't use conversation context ignore both.
+    user_id: str | None = None
+    context: tuple[Turn, ...] = ()
 
 
 @dataclass(frozen=True)
@@ -13,13 +28,61 @@ class Answer:
     created_at: datetime
 
 
+@dataclass(frozen=True)
+class AnswerChunk:
+    text: str
+    index: int
+
+
+def _normalize(query: Query) -> str:
+    normalized = query.text.strip()
+    if not normalized:
+        raise ValueError("query text cannot be empty")
+    return normalized
+
+
 def answer_query(query: Query) -> Answer:
     """
     Dummy "answer" generator for a user query.
     In a real system this could call a search index or an LLM.
     """
-    normalized = query.text.strip()
-    if not normalized:
-        raise ValueError("query text cannot be empty")
+    normalized = _normalize(query)
     reply = f"Echo: {normalized}"
     return Answer(text=reply, created_at=datetime.now(timezone.utc))
+
+
+def answer_queries(queries: list[Query]) -> list[Answer]:
+    """
+    Batch variant of answer_query for backends that are cheaper per item when
+    called with many queries at once. Answers come back in input order.
+    """
+    return [answer_query(query) for query in queries]
+
+
+def _word_chunks(text: str) -> Iterator[AnswerChunk]:
+    for i, word in enumerate(text.split(" ")):
+        yield AnswerChunk(text=word if i == 0 else " " + word, index=i)
+
+
+def stream_answer(query: Query) -> Iterator[AnswerChunk]:
+    """
+    Incremental variant of answer_query: yields the reply in chunks as the
+    backend produces them, so callers can forward the first tokens early.
+    Joining every chunk's text gives the same reply as answer_query.
+    The query is validated before the iterator is returned.
+    """
+    normalized = _normalize(query)
+    return _word_chunks(f"Echo: {normalized}")
+
+
+def chunked(answer: Callable[[Query], Answer]) -> Callable[[Query], Iterator[AnswerChunk]]:
+    """
+    stream_answer for an answer function that can't stream: answers the
+    whole query first (so errors surface before the iterator is returned),
+    then hands the reply out in word chunks.
+    """
+
+    def stream(query: Query) -> Iterator[AnswerChunk]:
+        return _word_chunks(answer(query).text)
+
+    return stream
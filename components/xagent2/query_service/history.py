@@ -0,0 +1,274 @@
+from __future__ import annotations
+
+import sys
+import threading
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import Callable, List
+
+from xagent2.identity_api.core import from_epoch_micros, to_epoch_micros
+from xagent2.query_service.core import Answer, Query, Turn
+
+# Fixed cost of one ring entry: two list pointers and an int64 timestamp.
+_ENTRY_BYTES = 8 + 8 + 8
+
+
+def _turn_bytes(query: str, answer: str) -> int:
+    return sys.getsizeof(query) + sys.getsizeof(answer)
+
+
+@dataclass(frozen=True)
+class HistoryWindow:
+    """
+    A user's turns from seq max(since, first) up to end (exclusive).
+
+    first is the oldest turn still kept. A reader that keeps its own copy
+    of earlier windows appends turns and drops what it has below first.
+    """
+
+    turns: tuple[Turn, ...]
+    first: int
+    end: int
+
+
+@dataclass(frozen=True)
+class HistoryStats:
+    users: int
+    turns: int
+    bytes: int
+    evicted_users: int
+    dropped_turns: int
+
+
+class ConversationHistory:
+    """
+    Recent query/answer turns per user, in fixed-size ring buffers.
+
+    Every user holds a slot that owns turns_per_user consecutive entries of
+    shared arrays: the query and answer strings in two lists, creation
+    times as epoch microseconds in an int64 array. Turn seq s of the user
+    in slot u lives at entry u * turns_per_user + s % turns_per_user, so
+    appending overwrites the oldest turn once the ring is full. Turn
+    objects are only built when window() hands them out.
+
+    A new user's seqs start where the highest seq of any user ended. A user
+    that was evicted and comes back therefore starts past every turn it had
+    before, and a reader drops its copies of those (they are below first).
+
+    Users are kept in LRU order; appends and reads both count as use. Past
+    max_users, or past max_bytes in total (the strings' sizes plus each
+    slot's fixed ring cost), the least recently used users are evicted
+    whole. A single user too big for max_bytes keeps only its newest turns.
+    """
+
+    def __init__(
+        self,
+        *,
+        turns_per_user: int = 16,
+        max_users: int = 10_000,
+        max_bytes: int = 64 << 20,
+    ) -> None:
+        if turns_per_user <= 0:
+            raise ValueError("turns_per_user must be positive")
+        if max_users <= 0:
+            raise ValueError("max_users must be positive")
+        if max_bytes <= 0:
+            raise ValueError("max_bytes must be positive")
+        self._capacity = turns_per_user
+        self._max_users = max_users
+        self._max_bytes = max_bytes
+        # user_id -> slot, least recently used first.
+        self._slots: OrderedDict[str, int] = OrderedDict()
+        self._free_slots: List[int] = []
+        # Ring entries, turns_per_user per slot.
+        self._queries: List[str | None] = []
+        self._answers: List[str | None] = []
+        self._created = array("q")
+        # Per slot: oldest kept seq, next seq, bytes held.
+        self._first = array("q")
+        self._end = array("q")
+        self._bytes = array("q")
+        self._next_seq = 0
+        self._total_bytes = 0
+        self._turns = 0
+        self._evicted_users = 0
+        self._dropped_turns = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._slots)
+
+    def append(self, user_id: str, query: str, answer: Answer) -> int:
+        """Records a turn for user_id; returns its seq."""
+        size = _turn_bytes(query, answer.text)
+        created_us = to_epoch_micros(answer.created_at)
+        with self._lock:
+            slot = self._slot_locked(user_id)
+            if self._end[slot] - self._first[slot] == self._capacity:
+                self._drop_oldest_locked(slot)
+                self._dropped_turns += 1
+            seq = self._end[slot]
+            entry = slot * self._capacity + seq % self._capacity
+            self._queries[entry] = query
+            self._answers[entry] = answer.text
+            self._created[entry] = created_us
+            self._end[slot] = seq + 1
+            self._next_seq = max(self._next_seq, seq + 1)
+            self._bytes[slot] += size
+            self._total_bytes += size
+            self._turns += 1
+            self._enforce_limits_locked(slot)
+            return seq
+
+    def window(self, user_id: str, since: int = 0) -> HistoryWindow:
+        """
+        The user's kept turns with seq >= since, oldest first. Pass the end
+        of the previous window as since to read only what was added.
+        """
+        with self._lock:
+            slot = self._slots.get(user_id)
+            if slot is None:
+                return HistoryWindow((), self._next_seq, self._next_seq)
+            self._slots.move_to_end(user_id)
+            first, end = self._first[slot], self._end[slot]
+            base = slot * self._capacity
+            rows = []
+            for seq in range(max(since, first), end):
+                entry = base + seq % self._capacity
+                rows.append(
+                    (seq, self._queries[entry], self._answers[entry], self._created[entry])
+                )
+        turns = tuple(
+            Turn(seq=seq, query=query, answer=answer, created_at=from_epoch_micros(created_us))
+            for seq, query, answer, created_us in rows
+        )
+        return HistoryWindow(turns, first, end)
+
+    def forget(self, user_id: str) -> bool:
+        with self._lock:
+            if user_id not in self._slots:
+                return False
+            self._release_locked(user_id)
+            return True
+
+    def stats(self) -> HistoryStats:
+        with self._lock:
+            return HistoryStats(
+                users=len(self._slots),
+                turns=self._turns,
+                bytes=self._total_bytes,
+                evicted_users=self._evicted_users,
+                dropped_turns=self._dropped_turns,
+            )
+
+    def _slot_locked(self, user_id: str) -> int:
+        slot = self._slots.get(user_id)
+        if slot is not None:
+            self._slots.move_to_end(user_id)
+            return slot
+        if len(self._slots) >= self._max_users:
+            self._release_locked(next(iter(self._slots)))
+            self._evicted_users += 1
+        if self._free_slots:
+            slot = self._free_slots.pop()
+        else:
+            slot = len(self._first)
+            self._queries.extend([None] * self._capacity)
+            self._answers.extend([None] * self._capacity)
+            self._created.frombytes(bytes(8 * self._capacity))
+            self._first.append(0)
+            self._end.append(0)
+            self._bytes.append(0)
+        self._slots[user_id] = slot
+        self._first[slot] = self._end[slot] = self._next_seq
+        self._bytes[slot] = self._capacity * _ENTRY_BYTES
+        self._total_bytes += self._bytes[slot]
+        return slot
+
+    def _drop_oldest_locked(self, slot: int) -> None:
+        seq = self._first[slot]
+        entry = slot * self._capacity + seq % self._capacity
+        size = _turn_bytes(self._queries[entry], self._answers[entry])
+        self._queries[entry] = self._answers[entry] = None
+        self._first[slot] = seq + 1
+        self._bytes[slot] -= size
+        self._total_bytes -= size
+        self._turns -= 1
+
+    def _release_locked(self, user_id: str) -> None:
+        slot = self._slots.pop(user_id)
+        base = slot * self._capacity
+        for entry in range(base, base + self._capacity):
+            self._queries[entry] = self._answers[entry] = None
+        self._turns -= self._end[slot] - self._first[slot]
+        self._total_bytes -= self._bytes[slot]
+        self._bytes[slot] = 0
+        self._free_slots.append(slot)
+
+    def _enforce_limits_locked(self, keep: int) -> None:
+        # keep was just used, so it is the last to go.
+        while self._total_bytes > self._max_bytes and len(self._slots) > 1:
+            self._release_locked(next(iter(self._slots)))
+            self._evicted_users += 1
+        while self._total_bytes > self._max_bytes and self._end[keep] - self._first[keep] > 1:
+            self._drop_oldest_locked(keep)
+            self._dropped_turns += 1
+
+
+class ConversationalAnswerer:
+    """
+    Gives an answer function (same signature as answer_query) conversation
+    memory: a query with a user_id reaches it with that user's recent turns
+    as Query.context, and the answer is recorded as a new turn. Queries
+    without a user_id pass through untouched.
+
+    Caches between this and the backend key on the query text alone, so
+    they only suit backends that ignore context (build_container refuses
+    the combination).
+
+    The context last handed out is kept per user (for up to max_users
+    users, least recently used dropped first), so each query reads only
+    the turns added since, with window(since=...).
+    """
+
+    def __init__(
+        self,
+        answer: Callable[[Query], Answer],
+        history: ConversationHistory,
+        *,
+        max_users: int = 10_000,
+    ) -> None:
+        if max_users <= 0:
+            raise ValueError("max_users must be positive")
+        self._answer = answer
+        self.history = history
+        self._max_users = max_users
+        # user_id -> (end of the last window read, context up to it)
+        self._contexts: OrderedDict[str, tuple[int, tuple[Turn, ...]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __call__(self, query: Query) -> Answer:
+        if query.user_id is None:
+            return self._answer(query)
+        context = self._context(query.user_id)
+        answer = self._answer(replace(query, context=context))
+        self.history.append(query.user_id, query.text, answer)
+        return answer
+
+    def _context(self, user_id: str) -> tuple[Turn, ...]:
+        with self._lock:
+            cursor, context = self._contexts.get(user_id, (0, ()))
+        window = self.history.window(user_id, since=cursor)
+        if context and context[0].seq < window.first:
+            context = tuple(turn for turn in context if turn.seq >= window.first)
+        context += window.turns
+        with self._lock:
+            # A concurrent query of the same user may have read further.
+            if self._contexts.get(user_id, (0, ()))[0] <= window.end:
+                self._contexts[user_id] = (window.end, context)
+            self._contexts.move_to_end(user_id)
+            if len(self._contexts) > self._max_users:
+                self._contexts.popitem(last=False)
+        return context
@@ -0,0 +1,260 @@
+"""
+Versioned on-disk format for the BM25 index, opened with mmap.
+
+Layout (little-endian, every section 8-byte aligned):
+
+    header   magic, format version, section count, doc/term/posting counts,
+             BM25 k1 and b
+    table    (offset, length) in bytes for each section below
+    sections term string offsets (u64, n_terms + 1)
+             term strings (UTF-8, sorted by bytes for binary search)
+             term posting offsets (u64, n_terms + 1)
+             term idf (f64), term score upper bound (f64)
+             postings doc numbers (u32), postings term frequencies (u32)
+             document length norms (f64)
+             doc id offsets (u64, n_docs + 1), doc ids (UTF-8)
+             doc text offsets (u64, n_docs + 1 or empty), doc texts (UTF-8)
+
+Opening a file only parses the header and wraps the sections in memoryviews,
+so startup cost does not depend on index size, and every process mapping the
+same file shares its pages through the OS page cache.
+"""
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import Iterable
+
+from xagent2.query_service.retrieval import Bm25Params, Bm25Scorer, InvertedIndex
+
+MAGIC = b"XA2BM25\0"
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct("<8sIIQQQdd")
+_SECTION = struct.Struct("<QQ")
+
+(
+    _TERM_STR_OFFSETS,
+    _TERM_STRINGS,
+    _TERM_POSTING_OFFSETS,
+    _TERM_IDF,
+    _TERM_MAX_CONTRIB,
+    _POSTING_DOCS,
+    _POSTING_TFS,
+    _DOC_NORMS,
+    _DOC_ID_OFFSETS,
+    _DOC_IDS,
+    _DOC_TEXT_OFFSETS,
+    _DOC_TEXTS,
+) = range(12)
+_N_SECTIONS = 12
+
+_SECTION_FORMATS = {
+    _TERM_STR_OFFSETS: "Q",
+    _TERM_POSTING_OFFSETS: "Q",
+    _TERM_IDF: "d",
+    _TERM_MAX_CONTRIB: "d",
+    _POSTING_DOCS: "I",
+    _POSTING_TFS: "I",
+    _DOC_NORMS: "d",
+    _DOC_ID_OFFSETS: "Q",
+    _DOC_TEXT_OFFSETS: "Q",
+}
+
+
+class IndexFormatError(ValueError):
+    pass
+
+
+def _require_little_endian() -> None:
+    if sys.byteorder != "little":
+        raise IndexFormatError("index files are only supported on little-endian hosts")
+
+
+def _string_table(values: Iterable[str]) -> tuple[array, bytes]:
+    offsets = array("Q", [0])
+    parts = []
+    size = 0
+    for value in values:
+        raw = value.encode("utf-8")
+        parts.append(raw)
+        size += len(raw)
+        offsets.append(size)
+    return offsets, b"".join(parts)
+
+
+def write_index(index: InvertedIndex, path: str | Path) -> None:
+    """
+    Write index to path atomically (temp file + rename), so readers that
+    already have the old file mapped keep a consistent view.
+    """
+    _require_little_endian()
+    terms = sorted(index._term_ids, key=lambda term: term.encode("utf-8"))
+    old_ids = [index._term_ids[term] for term in terms]
+
+    posting_offsets = array("Q", [0])
+    docs = array("I")
+    tfs = array("I")
+    for t in old_ids:
+        start, end = index._offsets[t], index._offsets[t + 1]
+        docs.extend(index._docs[start:end])
+        tfs.extend(index._tfs[start:end])
+        posting_offsets.append(len(docs))
+    term_str_offsets, term_strings = _string_table(terms)
+    doc_id_offsets, doc_ids = _string_table(index._doc_ids)
+    if index._doc_texts is not None:
+        doc_text_offsets, doc_texts = _string_table(index._doc_texts)
+    else:
+        doc_text_offsets, doc_texts = array("Q"), b""
+
+    sections: list[bytes] = [b""] * _N_SECTIONS
+    sections[_TERM_STR_OFFSETS] = term_str_offsets.tobytes()
+    sections[_TERM_STRINGS] = term_strings
+    sections[_TERM_POSTING_OFFSETS] = posting_offsets.tobytes()
+    sections[_TERM_IDF] = array("d", (index._idf[t] for t in old_ids)).tobytes()
+    sections[_TERM_MAX_CONTRIB] = array("d", (index._max_contrib[t] for t in old_ids)).tobytes()
+    sections[_POSTING_DOCS] = docs.tobytes()
+    sections[_POSTING_TFS] = tfs.tobytes()
+    sections[_DOC_NORMS] = index._norms.tobytes()
+    sections[_DOC_ID_OFFSETS] = doc_id_offsets.tobytes()
+    sections[_DOC_IDS] = doc_ids
+    sections[_DOC_TEXT_OFFSETS] = doc_text_offsets.tobytes()
+    sections[_DOC_TEXTS] = doc_texts
+
+    header = _HEADER.pack(
+        MAGIC,
+        FORMAT_VERSION,
+        _N_SECTIONS,
+        len(index),
+        len(terms),
+        len(docs),
+        index.params.k1,
+        index.params.b,
+    )
+    pos = _align(_HEADER.size + _N_SECTIONS * _SECTION.size)
+    table = []
+    for data in sections:
+        table.append(_SECTION.pack(pos, len(data)))
+        pos = _align(pos + len(data))
+
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("wb") as fh:
+        fh.write(header)
+        fh.write(b"".join(table))
+        for data in sections:
+            fh.write(b"\0" * (_align(fh.tell()) - fh.tell()))
+            fh.write(data)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp, path)
+
+
+def _align(pos: int) -> int:
+    return (pos + 7) & ~7
+
+
+class MmapIndex(Bm25Scorer):
+    """
+    Read-only BM25 index backed by an mmap of a file written by write_index.
+    Searches exactly like the InvertedIndex it was written from.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        _require_little_endian()
+        with open(path, "rb") as fh:
+            self._mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._views = self._map_sections()
+        except BaseException:
+            self._mm.close()
+            raise
+        views = self._views
+        self._term_str_offsets = views[_TERM_STR_OFFSETS]
+        self._term_strings = views[_TERM_STRINGS]
+        self._offsets = views[_TERM_POSTING_OFFSETS]
+        self._idf = views[_TERM_IDF]
+        self._max_contrib = views[_TERM_MAX_CONTRIB]
+        self._docs = views[_POSTING_DOCS]
+        self._tfs = views[_POSTING_TFS]
+        self._norms = views[_DOC_NORMS]
+        self._doc_id_offsets = views[_DOC_ID_OFFSETS]
+        self._doc_ids = views[_DOC_IDS]
+        self._doc_text_offsets = views[_DOC_TEXT_OFFSETS]
+        self._doc_texts = views[_DOC_TEXTS]
+
+    def _map_sections(self) -> list[memoryview]:
+        mm = self._mm
+        if len(mm) < _HEADER.size:
+            raise IndexFormatError("file too short for an index header")
+        magic, version, n_sections, n_docs, n_terms, n_postings, k1, b = _HEADER.unpack_from(mm)
+        if magic != MAGIC:
+            raise IndexFormatError("not an index file")
+        if version != FORMAT_VERSION:
+            raise IndexFormatError(f"unsupported index format version {version}")
+        if n_sections != _N_SECTIONS:
+            raise IndexFormatError(f"expected {_N_SECTIONS} sections, found {n_sections}")
+        self._n_docs = n_docs
+        self._n_terms = n_terms
+        self._params = Bm25Params(k1=k1, b=b)
+
+        whole = memoryview(mm)
+        views = []
+        for i in range(n_sections):
+            offset, length = _SECTION.unpack_from(mm, _HEADER.size + i * _SECTION.size)
+            if offset + length > len(mm):
+                raise IndexFormatError(f"section {i} runs past the end of the file")
+            view = whole[offset : offset + length]
+            fmt = _SECTION_FORMATS.get(i)
+            views.append(view.cast(fmt) if fmt else view)
+        if len(views[_POSTING_DOCS]) != n_postings or len(views[_DOC_NORMS]) != n_docs:
+            raise IndexFormatError("section sizes do not match the header")
+        return views
+
+    def close(self) -> None:
+        for view in self._views:
+            view.release()
+        self._views = []
+        self._mm.close()
+
+    def __enter__(self) -> MmapIndex:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._n_docs
+
+    @property
+    def vocabulary_size(self) -> int:
+        return self._n_terms
+
+    def term_id(self, term: str) -> int | None:
+        target = term.encode("utf-8")
+        offsets, strings = self._term_str_offsets, self._term_strings
+        lo, hi = 0, self._n_terms
+        while lo < hi:
+            mid = (lo + hi) // 2
+            candidate = strings[offsets[mid] : offsets[mid + 1]].tobytes()
+            if candidate < target:
+                lo = mid + 1
+            elif candidate > target:
+                hi = mid
+            else:
+                return mid
+        return None
+
+    def doc_id(self, doc_no: int) -> str:
+        offsets = self._doc_id_offsets
+        return str(self._doc_ids[offsets[doc_no] : offsets[doc_no + 1]], "utf-8")
+
+    def document_text(self, doc_no: int) -> str | None:
+        offsets = self._doc_text_offsets
+        if not len(offsets):
+            return None
+        return str(self._doc_texts[offsets[doc_no] : offsets[doc_no + 1]], "utf-8")
@@ -0,0 +1,358 @@
+from __future__ import annotations
+
+import abc
+import heapq
+import json
+import math
+import re
+from array import array
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Iterable, Mapping, Sequence
+
+from xagent2.query_service.core import Answer, Query, answer_query
+
+_UNLOADED = object()
+# NumPy is optional; it only speeds up scoring. It is imported on first use
+# because importing it costs more than the rest of the service's imports.
+np = _UNLOADED
+
+
+def _numpy():
+    global np
+    if np is _UNLOADED:
+        try:
+            import numpy
+        except ImportError:  # pragma: no cover - exercised when numpy is absent
+            numpy = None
+        np = numpy
+    return np
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+@dataclass(frozen=True)
+class SearchHit:
+    doc_id: str
+    score: float
+    doc_no: int
+
+
+@dataclass(frozen=True)
+class Bm25Params:
+    k1: float = 1.2
+    b: float = 0.75
+
+
+class Bm25Scorer(abc.ABC):
+    """
+    Top-k BM25 search over flat postings buffers.
+
+    Subclasses provide the storage: term lookup, per-term posting offsets,
+    the uint32 postings (doc numbers and term frequencies), per-document
+    length norms, and per-term idf and score upper bound. The buffers only
+    need to support indexing and the buffer protocol, so arrays and
+    memoryviews over an mmap both work.
+
+    Terms are scored in decreasing order of their upper bound. Once the
+    remaining terms can no longer lift an unseen document into the top k,
+    only documents already seen are updated; the result stays exact.
+    """
+
+    _params: Bm25Params
+    _offsets: Sequence[int]
+    _docs: Sequence[int]
+    _tfs: Sequence[int]
+    _norms: Sequence[float]
+    _idf: Sequence[float]
+    _max_contrib: Sequence[float]
+
+    @abc.abstractmethod
+    def __len__(self) -> int: ...
+
+    @abc.abstractmethod
+    def term_id(self, term: str) -> int | None: ...
+
+    @abc.abstractmethod
+    def doc_id(self, doc_no: int) -> str: ...
+
+    @abc.abstractmethod
+    def document_text(self, doc_no: int) -> str | None: ...
+
+    def search(self, text: str, k: int = 10) -> list[SearchHit]:
+        if k <= 0:
+            return []
+        found = {self.term_id(tok) for tok in tokenize(text)}
+        found.discard(None)
+        terms = sorted(found, key=lambda t: self._max_contrib[t], reverse=True)
+        if not terms:
+            return []
+        if _numpy() is not None:
+            scored = self._score_numpy(terms, k)
+        else:
+            scored = self._score_python(terms, k)
+        return [SearchHit(doc_id=self.doc_id(doc), score=score, doc_no=doc) for doc, score in scored]
+
+    def _remaining_bounds(self, terms: list[int]) -> list[float]:
+        # bounds[i] = best total any document could still gain from terms[i:].
+        bounds = [0.0] * (len(terms) + 1)
+        for i in range(len(terms) - 1, -1, -1):
+            bounds[i] = bounds[i + 1] + self._max_contrib[terms[i]]
+        return bounds
+
+    def _score_python(self, terms: list[int], k: int) -> list[tuple[int, float]]:
+        k1p1 = self._params.k1 + 1
+        norms, docs, tfs = self._norms, self._docs, self._tfs
+        bounds = self._remaining_bounds(terms)
+        acc: dict[int, float] = {}
+        admitting = True
+        for i, t in enumerate(terms):
+            if admitting and len(acc) >= k:
+                kth = heapq.nlargest(k, acc.values())[-1]
+                admitting = bounds[i] > kth
+            idf_k = self._idf[t] * k1p1
+            start, end = self._offsets[t], self._offsets[t + 1]
+            if admitting:
+                for j in range(start, end):
+                    doc, tf = docs[j], tfs[j]
+                    acc[doc] = acc.get(doc, 0.0) + idf_k * tf / (tf + norms[doc])
+            else:
+                for j in range(start, end):
+                    doc = docs[j]
+                    if doc in acc:
+                        tf = tfs[j]
+                        acc[doc] += idf_k * tf / (tf + norms[doc])
+        return heapq.nlargest(k, acc.items(), key=lambda item: (item[1], -item[0]))
+
+    def _score_numpy(self, terms: list[int], k: int) -> list[tuple[int, float]]:
+        k1p1 = self._params.k1 + 1
+        docs_all = np.frombuffer(self._docs, dtype=np.uint32)
+        tfs_all = np.frombuffer(self._tfs, dtype=np.uint32)
+        norms = np.frombuffer(self._norms, dtype=np.float64)
+        n_docs = len(norms)
+        bounds = self._remaining_bounds(terms)
+        scores = np.zeros(n_docs, dtype=np.float64)
+        touched = np.zeros(n_docs, dtype=bool)
+        n_touched = 0
+        admitting = True
+        for i, t in enumerate(terms):
+            if admitting and n_touched >= k:
+                cand = scores[touched]
+                kth = np.partition(cand, len(cand) - k)[len(cand) - k]
+                admitting = bounds[i] > kth
+            start, end = self._offsets[t], self._offsets[t + 1]
+            docs = docs_all[start:end]
+            tfs = tfs_all[start:end].astype(np.float64)
+            if not admitting:
+                keep = touched[docs]
+                docs, tfs = docs[keep], tfs[keep]
+            else:
+                n_touched += int(np.count_nonzero(~touched[docs]))
+                touched[docs] = True
+            # Doc numbers are unique within one posting list, so plain fancy
+            # indexing accumulates correctly.
+            scores[docs] += self._idf[t] * k1p1 * tfs / (tfs + norms[docs])
+        cand_docs = np.flatnonzero(touched)
+        cand_scores = scores[cand_docs]
+        if len(cand_docs) > k:
+            # Keep every doc tied at the kth score; lexsort then breaks the
+            # tie by lowest doc number, as _score_python does.
+            kth = np.partition(cand_scores, len(cand_scores) - k)[len(cand_scores) - k]
+            top = cand_scores >= kth
+            cand_docs, cand_scores = cand_docs[top], cand_scores[top]
+        order = np.lexsort((cand_docs, -cand_scores))[:k]
+        return [(int(cand_docs[j]), float(cand_scores[j])) for j in order]
+
+
+class InvertedIndex(Bm25Scorer):
+    """
+    Immutable in-memory BM25 index.
+
+    Postings for all terms live in two flat uint32 arrays (doc numbers and
+    term frequencies); term_offsets[t]..term_offsets[t + 1] is the slice for
+    term id t.
+    """
+
+    def __init__(
+        self,
+        *,
+        term_ids: Mapping[str, int],
+        term_offsets: array,
+        postings_docs: array,
+        postings_tfs: array,
+        doc_ids: list[str],
+        doc_lengths: array,
+        doc_texts: list[str] | None = None,
+        params: Bm25Params = Bm25Params(),
+    ) -> None:
+        self._term_ids = term_ids
+        self._offsets = term_offsets
+        self._docs = postings_docs
+        self._tfs = postings_tfs
+        self._doc_ids = doc_ids
+        self._doc_lengths = doc_lengths
+        self._doc_texts = doc_texts
+        self._params = params
+        n_docs = len(doc_ids)
+        avgdl = (sum(doc_lengths) / n_docs) if n_docs else 0.0
+        self._avgdl = avgdl or 1.0
+        # Per-document BM25 length normalisation, precomputed once.
+        self._norms = array(
+            "d",
+            (params.k1 * (1 - params.b + params.b * dl / self._avgdl) for dl in doc_lengths),
+        )
+        self._idf = array("d", bytes(8 * len(term_ids)))
+        for t in range(len(term_ids)):
+            df = term_offsets[t + 1] - term_offsets[t]
+            self._idf[t] = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+        self._max_contrib = self._term_upper_bounds()
+
+    def _term_upper_bounds(self) -> array:
+        k1p1 = self._params.k1 + 1
+        n_terms = len(self._term_ids)
+        if n_terms and _numpy() is not None:
+            tfs = np.frombuffer(self._tfs, dtype=np.uint32).astype(np.float64)
+            norms = np.frombuffer(self._norms, dtype=np.float64)
+            docs = np.frombuffer(self._docs, dtype=np.uint32)
+            sat = tfs / (tfs + norms[docs])
+            starts = np.frombuffer(self._offsets, dtype=np.uint64)[:-1].astype(np.intp)
+            best = np.maximum.reduceat(sat, starts)
+            bounds = best * np.frombuffer(self._idf, dtype=np.float64) * k1p1
+            return array("d", bounds.tobytes())
+        bounds = array("d", bytes(8 * n_terms))
+        for t in range(n_terms):
+            best = 0.0
+            for i in range(self._offsets[t], self._offsets[t + 1]):
+                tf = self._tfs[i]
+                best = max(best, tf / (tf + self._norms[self._docs[i]]))
+            bounds[t] = self._idf[t] * k1p1 * best
+        return bounds
+
+    def __len__(self) -> int:
+        return len(self._doc_ids)
+
+    @property
+    def vocabulary_size(self) -> int:
+        return len(self._term_ids)
+
+    @property
+    def params(self) -> Bm25Params:
+        return self._params
+
+    def term_id(self, term: str) -> int | None:
+        return self._term_ids.get(term)
+
+    def doc_id(self, doc_no: int) -> str:
+        return self._doc_ids[doc_no]
+
+    def document_text(self, doc_no: int) -> str | None:
+        return self._doc_texts[doc_no] if self._doc_texts is not None else None
+
+
+class IndexBuilder:
+    """
+    Accumulates documents and produces a compact InvertedIndex.
+    With store_text=True the document texts are kept for document_text().
+    """
+
+    def __init__(self, params: Bm25Params = Bm25Params(), *, store_text: bool = False) -> None:
+        self._params = params
+        self._term_ids: dict[str, int] = {}
+        self._term_docs: list[array] = []
+        self._term_tfs: list[array] = []
+        self._doc_ids: list[str] = []
+        self._doc_lengths = array("I")
+        self._doc_texts: list[str] | None = [] if store_text else None
+
+    def add(self, doc_id: str, text: str) -> None:
+        doc_no = len(self._doc_ids)
+        tokens = tokenize(text)
+        counts: dict[str, int] = {}
+        for tok in tokens:
+            counts[tok] = counts.get(tok, 0) + 1
+        for tok, tf in counts.items():
+            t = self._term_ids.get(tok)
+            if t is None:
+                t = self._term_ids[tok] = len(self._term_docs)
+                self._term_docs.append(array("I"))
+                self._term_tfs.append(array("I"))
+            self._term_docs[t].append(doc_no)
+            self._term_tfs[t].append(tf)
+        self._doc_ids.append(doc_id)
+        self._doc_lengths.append(len(tokens))
+        if self._doc_texts is not None:
+            self._doc_texts.append(text)
+
+    def add_many(self, docs: Iterable[tuple[str, str]]) -> None:
+        for doc_id, text in docs:
+            self.add(doc_id, text)
+
+    def build(self) -> InvertedIndex:
+        offsets = array("Q", [0])
+        postings_docs = array("I")
+        postings_tfs = array("I")
+        for docs, tfs in zip(self._term_docs, self._term_tfs):
+            postings_docs.extend(docs)
+            postings_tfs.extend(tfs)
+            offsets.append(len(postings_docs))
+        return InvertedIndex(
+            term_ids=dict(self._term_ids),
+            term_offsets=offsets,
+            postings_docs=postings_docs,
+            postings_tfs=postings_tfs,
+            doc_ids=list(self._doc_ids),
+            doc_lengths=array("I", self._doc_lengths),
+            doc_texts=list(self._doc_texts) if self._doc_texts is not None else None,
+            params=self._params,
+        )
+
+
+def load_jsonl_corpus(path: str | Path) -> InvertedIndex:
+    """
+    Index a JSON-lines corpus of {"id": ..., "text": ...} objects, keeping
+    the texts so answers can quote the matching document.
+    """
+    builder = IndexBuilder(store_text=True)
+    with Path(path).open(encoding="utf-8") as fh:
+        for line in fh:
+            if not line.strip():
+                continue
+            doc = json.loads(line)
+            builder.add(str(doc["id"]), doc["text"])
+    return builder.build()
+
+
+class RetrievalAnswerer:
+    """
+    Answer function (same shape as answer_query) that replies with the text
+    of the best matching document. Falls back to the given answer function
+    when nothing in the index matches.
+    """
+
+    def __init__(
+        self,
+        index: Bm25Scorer,
+        *,
+        fallback: Callable[[Query], Answer] = answer_query,
+    ) -> None:
+        self._index = index
+        self._fallback = fallback
+
+    def __call__(self, query: Query) -> Answer:
+        normalized = query.text.strip()
+        if not normalized:
+            raise ValueError("query text cannot be empty")
+        for hit in self._index.search(normalized, k=1):
+            text = self._index.document_text(hit.doc_no)
+            if text is not None:
+                return Answer(text=text, created_at=datetime.now(timezone.utc))
+        return self._fallback(query)
+
+    def answer_many(self, queries: list[Query]) -> list[Answer]:
+        """Batch form for MicroBatcher; answers come back in input order."""
+        return [self(query) for query in queries]
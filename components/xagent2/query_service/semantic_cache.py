@@ -0,0 +1,291 @@
+"""
+Semantic answer cache: serves a cached Answer for paraphrased queries.
+
+Requires NumPy (the "numpy" extra); nothing else in query_service does, so
+this module is not imported by the package __init__.
+"""
+from __future__ import annotations
+
+import re
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Callable, Protocol, Sequence, runtime_checkable
+
+import numpy as np
+
+from xagent2.query_service.cache import cache_key
+from xagent2.query_service.core import Answer, Query
+
+_TOKEN_RE = re.compile(r"\w+")
+
+DEFAULT_STOPWORDS = frozenset(
+    "a an and are can do does for how i in is it me my of on or the to what when "
+    "where which who why with you your".split()
+)
+
+
+@runtime_checkable
+class Embedder(Protocol):
+    dim: int
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Return a (len(texts), dim) float32 matrix of L2-normalised rows."""
+        ...
+
+
+class HashingEmbedder(Embedder):
+    """
+    Dependency-free local embedder: hashes content words and their character
+    trigrams into a fixed number of signed buckets. Good enough to match
+    rewordings that share vocabulary; plug in a model-backed Embedder for
+    real semantic similarity.
+    """
+
+    def __init__(
+        self,
+        dim: int = 128,
+        *,
+        stopwords: frozenset[str] = DEFAULT_STOPWORDS,
+        trigram_weight: float = 0.25,
+    ) -> None:
+        if dim <= 0:
+            raise ValueError("dim must be positive")
+        self.dim = dim
+        self._stopwords = stopwords
+        self._trigram_weight = trigram_weight
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        dim = self.dim
+        for row, text in enumerate(texts):
+            vec = [0.0] * dim
+            for token in _TOKEN_RE.findall(text.lower()):
+                if token in self._stopwords:
+                    continue
+                self._add(vec, token, 1.0)
+                padded = f"#{token}#"
+                for i in range(len(padded) - 2):
+                    self._add(vec, padded[i : i + 3], self._trigram_weight)
+            out[row] = vec
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        np.divide(out, norms, out=out, where=norms > 0)
+        return out
+
+    def _add(self, vec: list[float], feature: str, weight: float) -> None:
+        h = zlib.crc32(feature.encode("utf-8"))
+        vec[h % self.dim] += weight if h & 0x80000000 else -weight
+
+
+@dataclass(frozen=True)
+class SemanticCacheStats:
+    hits: int
+    misses: int
+    evictions: int
+    expired: int
+    size: int
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class SemanticAnswerCache:
+    """
+    Answer-function wrapper that reuses the answer of a previously seen query
+    whose embedding has cosine similarity >= threshold with the new one.
+
+    Vectors live in one preallocated (capacity, dim) float32 matrix. To keep
+    lookups sub-millisecond at large capacities, candidate rows come from
+    random-hyperplane LSH tables (n_tables tables of n_bits each) and only
+    those rows are scored; near-duplicates collide in at least one table with
+    high probability. When full, the least recently used (eviction="lru") or
+    least frequently used (eviction="lfu") entry is replaced. Entries expire
+    ttl_seconds after they were stored, like CachedAnswerer's; an expired
+    entry is dropped when a lookup comes across it.
+    """
+
+    def __init__(
+        self,
+        answer: Callable[[Query], Answer],
+        embedder: Embedder,
+        *,
+        capacity: int = 10_000,
+        threshold: float = 0.9,
+        eviction: str = "lru",
+        n_tables: int = 8,
+        n_bits: int = 10,
+        seed: int = 0,
+        ttl_seconds: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        if ttl_seconds <= 0:
+            raise ValueError("ttl_seconds must be positive")
+        if not 0 < threshold <= 1:
+            raise ValueError("threshold must be in (0, 1]")
+        if eviction not in ("lru", "lfu"):
+            raise ValueError("eviction must be 'lru' or 'lfu'")
+        self._answer = answer
+        self._embedder = embedder
+        self._capacity = capacity
+        self._threshold = threshold
+        self._eviction = eviction
+        self._n_tables = n_tables
+        self._ttl = ttl_seconds
+        self._clock = clock
+        dim = embedder.dim
+        rng = np.random.default_rng(seed)
+        self._planes = rng.standard_normal((n_tables * n_bits, dim)).astype(np.float32)
+        self._bit_weights = (1 << np.arange(n_bits, dtype=np.int64)).astype(np.int64)
+        self._n_bits = n_bits
+
+        self._vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self._answers: list[Answer | None] = [None] * capacity
+        self._slot_keys: list[tuple[int, ...] | None] = [None] * capacity
+        self._last_used = np.zeros(capacity, dtype=np.int64)
+        self._use_count = np.zeros(capacity, dtype=np.int64)
+        self._expires = np.zeros(capacity, dtype=np.float64)
+        self._buckets: list[dict[int, set[int]]] = [{} for _ in range(n_tables)]
+        # Slots below _next_slot have been used; expired ones wait on _free_slots.
+        self._next_slot = 0
+        self._free_slots: list[int] = []
+        self._size = 0
+        self._tick = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expired = 0
+
+    def __call__(self, query: Query) -> Answer:
+        text = cache_key(query)
+        vectors = self._embedder.embed([text])
+        cached = self._lookup_vectors(vectors)[0]
+        if cached is not None:
+            return cached
+        answer = self._answer(query)
+        self._insert_vector(vectors[0], answer)
+        return answer
+
+    def answer_many(self, queries: list[Query]) -> list[Answer]:
+        """Batch form: one embedding call and one candidate scoring pass."""
+        vectors = self._embedder.embed([cache_key(q) for q in queries])
+        found = self._lookup_vectors(vectors)
+        results: list[Answer] = []
+        for i, (query, cached) in enumerate(zip(queries, found)):
+            if cached is None:
+                cached = self._answer(query)
+                self._insert_vector(vectors[i], cached)
+            results.append(cached)
+        return results
+
+    def lookup_many(self, texts: Sequence[str]) -> list[Answer | None]:
+        vectors = self._embedder.embed([cache_key(Query(text=t)) for t in texts])
+        return self._lookup_vectors(vectors)
+
+    def stats(self) -> SemanticCacheStats:
+        with self._lock:
+            return SemanticCacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                expired=self._expired,
+                size=self._size,
+            )
+
+    def _signatures(self, vectors: np.ndarray) -> np.ndarray:
+        bits = (vectors @ self._planes.T) > 0
+        bits = bits.reshape(len(vectors), self._n_tables, self._n_bits)
+        return bits.astype(np.int64) @ self._bit_weights
+
+    def _lookup_vectors(self, vectors: np.ndarray) -> list[Answer | None]:
+        signatures = self._signatures(vectors)
+        results: list[Answer | None] = []
+        with self._lock:
+            for vec, keys in zip(vectors, signatures):
+                slot = self._best_slot_locked(vec, keys)
+                if slot is None:
+                    self._misses += 1
+                    results.append(None)
+                    continue
+                self._hits += 1
+                self._tick += 1
+                self._last_used[slot] = self._tick
+                self._use_count[slot] += 1
+                results.append(self._answers[slot])
+        return results
+
+    def _best_slot_locked(self, vec: np.ndarray, keys: np.ndarray) -> int | None:
+        if not vec.any():
+            return None
+        candidates: set[int] = set()
+        for table, key in zip(self._buckets, keys.tolist()):
+            bucket = table.get(key)
+            if bucket:
+                candidates.update(bucket)
+        if candidates:
+            now = self._clock()
+            stale = [slot for slot in candidates if self._expires[slot] <= now]
+            for slot in stale:
+                self._remove_locked(slot)
+                self._expired += 1
+            candidates.difference_update(stale)
+        if not candidates:
+            return None
+        slots = np.fromiter(candidates, dtype=np.intp, count=len(candidates))
+        sims = self._vectors[slots] @ vec
+        best = int(np.argmax(sims))
+        if sims[best] < self._threshold:
+            return None
+        return int(slots[best])
+
+    def _insert_vector(self, vec: np.ndarray, answer: Answer) -> None:
+        if not vec.any():
+            return  # nothing but stopwords; never similar to anything
+        keys = tuple(self._signatures(vec[None, :])[0].tolist())
+        with self._lock:
+            if self._free_slots:
+                slot = self._free_slots.pop()
+            elif self._next_slot < self._capacity:
+                slot = self._next_slot
+                self._next_slot += 1
+            else:
+                slot = self._victim_locked()
+                self._remove_locked(slot)
+                self._free_slots.pop()
+                self._evictions += 1
+            self._size += 1
+            self._vectors[slot] = vec
+            self._answers[slot] = answer
+            self._slot_keys[slot] = keys
+            self._tick += 1
+            self._last_used[slot] = self._tick
+            self._use_count[slot] = 1
+            self._expires[slot] = self._clock() + self._ttl
+            for table, key in zip(self._buckets, keys):
+                table.setdefault(key, set()).add(slot)
+
+    def _victim_locked(self) -> int:
+        if self._eviction == "lfu":
+            # Least used first; ties broken by least recently used.
+            least = np.flatnonzero(self._use_count == self._use_count.min())
+            return int(least[np.argmin(self._last_used[least])])
+        return int(np.argmin(self._last_used))
+
+    def _remove_locked(self, slot: int) -> None:
+        keys = self._slot_keys[slot]
+        if keys is not None:
+            for table, key in zip(self._buckets, keys):
+                bucket = table.get(key)
+                if bucket is not None:
+                    bucket.discard(slot)
+                    if not bucket:
+                        del table[key]
+        self._answers[slot] = None
+        self._slot_keys[slot] = None
+        self._size -= 1
+        self._free_slots.append(slot)
@@ -0,0 +1,8 @@
+from .core import (  # noqa: F401
+    BucketStore,
+    InMemoryBucketStore,
+    RateDecision,
+    RateLimit,
+    RateLimiter,
+    RateLimiterStats,
+)
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Callable, Protocol, runtime_checkable
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """Token bucket: holds at most burst tokens, refilled at rate tokens per second."""
+
+    rate: float
+    burst: float
+
+    def __post_init__(self) -> None:
+        if self.rate <= 0 or self.burst < 1:
+            raise ValueError("rate must be positive and burst at least 1")
+
+    @classmethod
+    def per_minute(cls, count: float, burst: float | None = None) -> RateLimit:
+        return cls(rate=count / 60.0, burst=count if burst is None else burst)
+
+
+@dataclass(frozen=True)
+class RateDecision:
+    allowed: bool
+    retry_after: float = 0.0  # seconds until the request would be allowed
+
+
+@runtime_checkable
+class BucketStore(Protocol):
+    """
+    Holds token buckets by key. acquire() must take the tokens atomically, so
+    a store shared between replicas (e.g. Redis) enforces one global limit.
+    """
+
+    def acquire(self, key: str, limit: RateLimit, cost: float = 1.0) -> RateDecision: ...
+
+
+class _Shard:
+    __slots__ = ("lock", "buckets", "calls", "evicted")
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        # key -> (tokens, last update, time the bucket is full again); dict
+        # order is least recently used first.
+        self.buckets: dict[str, tuple[float, float, float]] = {}
+        self.calls = 0
+        self.evicted = 0  # guarded by lock, like the buckets
+
+
+class InMemoryBucketStore(BucketStore):
+    """
+    Process-local BucketStore.
+
+    Keys are spread over shards, each with its own lock, so concurrent
+    requests for different keys rarely contend. A bucket that has refilled
+    completely behaves exactly like a missing one, so idle buckets are
+    evicted: every acquire sweeps a few of the least recently used entries
+    of its shard. max_keys bounds memory under floods of distinct keys; past
+    it the least recently used bucket is dropped even if not yet full.
+    """
+
+    def __init__(
+        self,
+        *,
+        shards: int = 64,
+        max_keys: int = 1_000_000,
+        sweep_batch: int = 4,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if shards <= 0 or max_keys < shards:
+            raise ValueError("shards must be positive and max_keys at least shards")
+        self._shards = tuple(_Shard() for _ in range(shards))
+        self._per_shard = max_keys // shards
+        self._sweep_batch = sweep_batch
+        self._clock = clock
+
+    def _shard(self, key: str) -> _Shard:
+        return self._shards[zlib.crc32(key.encode()) % len(self._shards)]
+
+    def acquire(self, key: str, limit: RateLimit, cost: float = 1.0) -> RateDecision:
+        shard = self._shard(key)
+        now = self._clock()
+        with shard.lock:
+            buckets = shard.buckets
+            entry = buckets.pop(key, None)
+            if entry is None:
+                tokens = limit.burst
+            else:
+                tokens = min(limit.burst, entry[0] + (now - entry[1]) * limit.rate)
+            if tokens >= cost:
+                tokens -= cost
+                decision = RateDecision(allowed=True)
+            else:
+                decision = RateDecision(allowed=False, retry_after=(cost - tokens) / limit.rate)
+            buckets[key] = (tokens, now, now + (limit.burst - tokens) / limit.rate)
+            self._sweep_locked(shard, now)
+        return decision
+
+    def _sweep_locked(self, shard: _Shard, now: float) -> None:
+        buckets = shard.buckets
+        evicted = 0
+        while len(buckets) > self._per_shard:
+            del buckets[next(iter(buckets))]
+            evicted += 1
+        for _ in range(self._sweep_batch):
+            key = next(iter(buckets), None)
+            if key is None or buckets[key][2] > now:
+                break
+            del buckets[key]
+            evicted += 1
+        shard.evicted += evicted
+
+    def sweep(self) -> int:
+        """Drop every bucket that has refilled completely; returns how many."""
+        now = self._clock()
+        evicted = 0
+        for shard in self._shards:
+            with shard.lock:
+                full = [key for key, entry in shard.buckets.items() if entry[2] <= now]
+                for key in full:
+                    del shard.buckets[key]
+                shard.evicted += len(full)
+                evicted += len(full)
+        return evicted
+
+    def __len__(self) -> int:
+        return sum(len(shard.buckets) for shard in self._shards)
+
+    @property
+    def evicted(self) -> int:
+        return sum(shard.evicted for shard in self._shards)
+
+
+@dataclass(frozen=True)
+class RateLimiterStats:
+    allowed: int
+    rejected: int
+
+
+class RateLimiter:
+    """
+    One named limit applied per key (client IP, email, ...). Keys are
+    namespaced with the name so several limiters can share a store.
+    """
+
+    def __init__(self, store: BucketStore, limit: RateLimit, *, name: str) -> None:
+        self._store = store
+        self._limit = limit
+        self._prefix = f"{name}:"
+        self._allowed = 0
+        self._rejected = 0
+
+    @property
+    def limit(self) -> RateLimit:
+        return self._limit
+
+    def acquire(self, key: str, cost: float = 1.0) -> RateDecision:
+        decision = self._store.acquire(self._prefix + key, self._limit, cost)
+        # Unlocked increments: the stats are for monitoring and may lose an
+        # update under contention.
+        if decision.allowed:
+            self._allowed += 1
+        else:
+            self._rejected += 1
+        return decision
+
+    def stats(self) -> RateLimiterStats:
+        return RateLimiterStats(allowed=self._allowed, rejected=self._rejected)
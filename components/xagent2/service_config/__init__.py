@@ -1 +1 @@
-from xagent2.service_config import core
+from xagent2.service_config import core, live, schema, snapshot
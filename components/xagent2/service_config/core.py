@@ -3,12 +3,13 @@ from __future__ import annotations
 import argparse
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict
+from types import MappingProxyType
+from typing import Any, Dict, Mapping
 
 
 @dataclass(frozen=True)
 class ServiceConfig:
-    values: Dict[str, Any]
+    values: Mapping[str, Any]
 
 
 def _coerce_scalar(value: str) -> Any:
@@ -39,10 +40,283 @@ def parse_env_file(path: str | Path) -> Dict[str, Any]:
     return data
 
 
+class ConfigError(ValueError):
+    """A config file that can't be parsed, or values that don't fit a schema."""
+
+
+def _strip_comment(line: str) -> str:
+    # "#" starts a comment at the start of a line or after whitespace, outside quotes.
+    quote = None
+    for i, ch in enumerate(line):
+        if quote:
+            if ch == quote:
+                quote = None
+        elif ch in "'\"":
+            quote = ch
+        elif ch == "#" and (i == 0 or line[i - 1] in " \t"):
+            return line[:i].rstrip()
+    return line.rstrip()
+
+
+def _unquote(text: str) -> str:
+    if text[0] == "'":
+        return text[1:-1].replace("''", "'")
+    return text[1:-1].encode("latin-1", "backslashreplace").decode("unicode_escape")
+
+
+def _split_key(content: str) -> tuple[str, str] | None:
+    """Splits "key: rest" (key optionally quoted); None if content isn't a mapping entry."""
+    if content[0] in "'\"":
+        end = content.find(content[0], 1)
+        while end != -1 and content[0] == "'" and content[end + 1 : end + 2] == "'":
+            end = content.find("'", end + 2)
+        if end == -1 or content[end + 1 : end + 2] != ":":
+            return None
+        rest = content[end + 2 :]
+        if rest and rest[0] != " ":
+            return None
+        return _unquote(content[: end + 1]), rest.strip()
+    if content[0] in "[{":
+        return None
+    for i, ch in enumerate(content):
+        if ch == ":" and (i + 1 == len(content) or content[i + 1] == " "):
+            return content[:i].rstrip(), content[i + 1 :].strip()
+    return None
+
+
+class _FlowParser:
+    """Inline [a, b] and {k: v} collections, nested to any depth."""
+
+    def __init__(self, text: str, where: str) -> None:
+        self._text = text
+        self._pos = 0
+        self._where = where
+
+    def parse(self) -> Any:
+        value = self._value("")
+        self._skip()
+        if self._pos != len(self._text):
+            raise ConfigError(f"{self._where}: unexpected {self._text[self._pos:]!r}")
+        return value
+
+    def _skip(self) -> None:
+        while self._pos < len(self._text) and self._text[self._pos] == " ":
+            self._pos += 1
+
+    def _value(self, stops: str) -> Any:
+        self._skip()
+        text = self._text
+        if self._pos >= len(text):
+            raise ConfigError(f"{self._where}: unterminated flow collection")
+        ch = text[self._pos]
+        if ch == "[":
+            self._pos += 1
+            items: list[Any] = []
+            while True:
+                self._skip()
+                if text[self._pos : self._pos + 1] == "]":
+                    self._pos += 1
+                    return items
+                items.append(self._value(",]"))
+                self._skip()
+                if text[self._pos : self._pos + 1] == ",":
+                    self._pos += 1
+        if ch == "{":
+            self._pos += 1
+            mapping: Dict[str, Any] = {}
+            while True:
+                self._skip()
+                if text[self._pos : self._pos + 1] == "}":
+                    self._pos += 1
+                    return mapping
+                key = self._value(":,}")
+                self._skip()
+                value = None
+                if text[self._pos : self._pos + 1] == ":":
+                    self._pos += 1
+                    value = self._value(",}")
+                mapping[str(key)] = value
+                self._skip()
+                if text[self._pos : self._pos + 1] == ",":
+                    self._pos += 1
+        if ch in "'\"":
+            start = self._pos
+            end = text.find(ch, start + 1)
+            if end == -1:
+                raise ConfigError(f"{self._where}: unterminated string")
+            self._pos = end + 1
+            return _unquote(text[start : end + 1])
+        start = self._pos
+        while self._pos < len(text) and text[self._pos] not in stops:
+            self._pos += 1
+        if self._pos >= len(text):
+            raise ConfigError(f"{self._where}: unterminated flow collection")
+        return _coerce_scalar(text[start : self._pos].strip())
+
+
+def _scalar(text: str, where: str) -> Any:
+    if not text:
+        return None
+    if text[0] in "[{":
+        return _FlowParser(text, where).parse()
+    if text[0] in "'\"":
+        if len(text) < 2 or text[-1] != text[0]:
+            raise ConfigError(f"{where}: unterminated string")
+        return _unquote(text)
+    return _coerce_scalar(text)
+
+
+class _BlockParser:
+    """
+    Indentation-structured YAML: nested mappings, "- " sequences (including
+    "- key: value" items), quoted and flow scalars, and | / > block scalars.
+    Anchors, tags and multi-document streams are not supported.
+    """
+
+    def __init__(self, text: str, name: str) -> None:
+        self._raw = text.splitlines()
+        self._name = name
+        # Line index -> (indent, content) for every significant line; "- key: v"
+        # items are rewritten in place as the nested line they introduce.
+        self._lines: Dict[int, tuple[int, str]] = {}
+        for i, raw in enumerate(self._raw):
+            if "\t" in raw[: len(raw) - len(raw.lstrip())]:
+                raise ConfigError(f"{name}:{i + 1}: tabs are not allowed in indentation")
+            content = _strip_comment(raw).strip()
+            if content and not (i == 0 and content == "---"):
+                self._lines[i] = (len(raw) - len(raw.lstrip(" ")), content)
+        self._order = sorted(self._lines)
+
+    def parse(self) -> Dict[str, Any]:
+        if not self._order:
+            return {}
+        value, pos = self._block(0, self._lines[self._order[0]][0])
+        if pos < len(self._order):
+            raise ConfigError(f"{self._where(pos)}: unexpected indentation")
+        if not isinstance(value, dict):
+            raise ConfigError(f"{self._name}: top level must be a mapping")
+        return value
+
+    def _where(self, pos: int) -> str:
+        return f"{self._name}:{self._order[pos] + 1}"
+
+    def _at(self, pos: int) -> tuple[int, str]:
+        return self._lines[self._order[pos]]
+
+    def _block(self, pos: int, indent: int) -> tuple[Any, int]:
+        content = self._at(pos)[1]
+        if content == "-" or content.startswith("- "):
+            return self._sequence(pos, indent)
+        return self._mapping(pos, indent)
+
+    def _child(self, pos: int, indent: int, sequence_ok: bool) -> tuple[Any, int]:
+        """Value of a "key:" or "-" with nothing after it: the next, deeper block."""
+        if pos < len(self._order):
+            child_indent, content = self._at(pos)
+            is_item = content == "-" or content.startswith("- ")
+            if child_indent > indent or (sequence_ok and child_indent == indent and is_item):
+                return self._block(pos, child_indent)
+        return None, pos
+
+    def _mapping(self, pos: int, indent: int) -> tuple[Dict[str, Any], int]:
+        result: Dict[str, Any] = {}
+        while pos < len(self._order):
+            line_indent, content = self._at(pos)
+            if line_indent < indent:
+                break
+            if line_indent > indent:
+                raise ConfigError(f"{self._where(pos)}: unexpected indentation")
+            if content == "-" or content.startswith("- "):
+                break
+            entry = _split_key(content)
+            if entry is None:
+                raise ConfigError(f"{self._where(pos)}: expected 'key: value'")
+            key, rest = entry
+            if key in result:
+                raise ConfigError(f"{self._where(pos)}: duplicate key {key!r}")
+            if rest[:1] in ("|", ">"):
+                result[key], pos = self._block_scalar(pos, indent, rest)
+            elif rest:
+                result[key] = _scalar(rest, self._where(pos))
+                pos += 1
+            else:
+                result[key], pos = self._child(pos + 1, indent, sequence_ok=True)
+        return result, pos
+
+    def _sequence(self, pos: int, indent: int) -> tuple[list[Any], int]:
+        result: list[Any] = []
+        while pos < len(self._order):
+            line_indent, content = self._at(pos)
+            if line_indent != indent or not (content == "-" or content.startswith("- ")):
+                if line_indent > indent:
+                    raise ConfigError(f"{self._where(pos)}: unexpected indentation")
+                break
+            rest = content[1:].lstrip()
+            if not rest:
+                value, pos = self._child(pos + 1, indent, sequence_ok=False)
+            elif rest.startswith("- ") or rest == "-" or _split_key(rest) is not None:
+                # "- key: v" / "- - v": the rest of the line opens a nested block
+                # at its own column.
+                self._lines[self._order[pos]] = (indent + len(content) - len(rest), rest)
+                value, pos = self._block(pos, indent + len(content) - len(rest))
+            else:
+                value = _scalar(rest, self._where(pos))
+                pos += 1
+            result.append(value)
+        return result, pos
+
+    def _block_scalar(self, pos: int, indent: int, header: str) -> tuple[str, int]:
+        style, chomp = header[0], header[1:2]
+        # The block runs until the next line indented no deeper than its key.
+        after = pos + 1
+        while after < len(self._order) and self._at(after)[0] > indent:
+            after += 1
+        end = self._order[after] if after < len(self._order) else len(self._raw)
+        body = self._raw[self._order[pos] + 1 : end]
+        block_indent = min(
+            (len(line) - len(line.lstrip(" ")) for line in body if line.strip()), default=0
+        )
+        lines = [line[block_indent:].rstrip() for line in body]
+        while lines and not lines[-1]:
+            lines.pop()
+        if style == "|":
+            text = "\n".join(lines)
+        else:
+            folded: list[str] = []
+            for line in lines:
+                if not line:
+                    folded.append("\n")
+                elif folded and folded[-1] != "\n":
+                    folded.append(" " + line)
+                else:
+                    folded.append(line)
+            text = "".join(folded)
+        if chomp != "-" and text:
+            text += "\n"
+        return text, after
+
+
+def parse_yaml_text(text: str, name: str = "<string>") -> Dict[str, Any]:
+    return _BlockParser(text, name).parse()
+
+
+def parse_yaml(path: str | Path) -> Dict[str, Any]:
+    """
+    Parse a YAML config file: nested mappings, lists ("- item" blocks or
+    [a, b]), quoted strings, | and > block scalars and # comments. Scalars
+    are typed the same way as env values.
+    """
+    return parse_yaml_text(Path(path).read_text(), str(path))
+
+
 def parse_simple_yaml(path: str | Path) -> Dict[str, Any]:
     """
     Minimal YAML parser for simple key: value pairs.
     Supports comments (#) and scalar values only.
+
+    Kept as it was for existing callers; parse_yaml differs on flat files
+    too (it requires "key: value" with a space, unquotes strings, keeps "#"
+    that does not follow whitespace and returns nested keys as mappings).
     """
     data: Dict[str, Any] = {}
     for raw in Path(path).read_text().splitlines():
@@ -54,15 +328,47 @@ def parse_simple_yaml(path: str | Path) -> Dict[str, Any]:
     return data
 
 
-def merge_config(base: Dict[str, Any], overrides: Dict[str, Any]) -> Dict[str, Any]:
+def merge_config(base: Mapping[str, Any], overrides: Mapping[str, Any]) -> Dict[str, Any]:
+    """
+    Deep merge: nested mappings are merged key by key, anything else
+    (scalars, lists) in overrides replaces the base value. Inputs are not
+    modified.
+    """
     merged = dict(base)
-    merged.update(overrides)
+    for key, value in overrides.items():
+        current = merged.get(key)
+        if isinstance(current, Mapping) and isinstance(value, Mapping):
+            merged[key] = merge_config(current, value)
+        else:
+            merged[key] = value
     return merged
 
 
+def changed_keys(old: Mapping[str, Any], new: Mapping[str, Any], prefix: str = "") -> set[str]:
+    """Dotted paths whose values differ, descending into mappings present on both sides."""
+    changed: set[str] = set()
+    missing = object()
+    for key in old.keys() | new.keys():
+        before, after = old.get(key, missing), new.get(key, missing)
+        if isinstance(before, Mapping) and isinstance(after, Mapping):
+            changed |= changed_keys(before, after, f"{prefix}{key}.")
+        elif before != after:
+            changed.add(prefix + key)
+    return changed
+
+
+def freeze_config(value: Any) -> Any:
+    """Read-only copy of parsed config: mappings become mapping proxies, lists tuples."""
+    if isinstance(value, Mapping):
+        return MappingProxyType({key: freeze_config(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze_config(item) for item in value)
+    return value
+
+
 def load_service_config(env_path: str | Path, yaml_path: str | Path) -> ServiceConfig:
     env_values = parse_env_file(env_path)
-    yaml_values = parse_simple_yaml(yaml_path)
+    yaml_values = parse_yaml(yaml_path)
     return ServiceConfig(values=merge_config(yaml_values, env_values))
 
 
@@ -71,14 +377,14 @@ def load_service_config_from_files(
 ) -> ServiceConfig:
     merged_yaml: Dict[str, Any] = {}
     for path in yaml_paths:
-        merged_yaml = merge_config(merged_yaml, parse_simple_yaml(path))
+        merged_yaml = merge_config(merged_yaml, parse_yaml(path))
     env_values = parse_env_file(env_path)
     return ServiceConfig(values=merge_config(merged_yaml, env_values))
 
 
-def parse_service_args(argv: list[str]) -> ServiceConfig:
+def parse_service_argv(argv: list[str]) -> tuple[str, list[str]]:
     """
-    Parse service CLI arguments and return a merged configuration.
+    Parse service CLI arguments into (env path, conf paths).
     --env points to an env file.
     --conf can be provided multiple times to layer configs.
     Later --conf files override earlier ones.
@@ -94,4 +400,13 @@ def parse_service_args(argv: list[str]) -> ServiceConfig:
     args = parser.parse_args(argv)
     if not args.conf:
         raise ValueError("at least one --conf must be provided")
-    return load_service_config_from_files(args.env, args.conf)
+    return args.env, args.conf
+
+
+def parse_service_args(argv: list[str]) -> ServiceConfig:
+    """
+    Parse service CLI arguments (see parse_service_argv) and return the
+    merged configuration.
+    """
+    env, conf = parse_service_argv(argv)
+    return load_service_config_from_files(env, conf)
@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Generic, TypeVar
+
+from xagent2.service_config.core import (
+    ServiceConfig,
+    changed_keys,
+    freeze_config,
+    parse_service_argv,
+)
+from xagent2.service_config.schema import ConfigSchema
+from xagent2.service_config.snapshot import (
+    load_layers,
+    merge_layers,
+    service_layers,
+    write_snapshot,
+)
+
+T = TypeVar("T")
+Subscriber = Callable[[ServiceConfig, frozenset], None]
+
+
+@dataclass(frozen=True)
+class ReloadStats:
+    polls: int
+    reloads: int
+    layers_parsed: int
+    errors: int
+    last_error: str | None
+
+
+class LiveServiceConfig(Generic[T]):
+    """
+    ServiceConfig that follows its env and conf files.
+
+    poll() stats every layer, re-parses only the ones whose mtime, size or
+    inode changed, and if the merged values differ publishes a new immutable
+    snapshot by swapping one reference. current() is that reference, so
+    readers on the request path take no lock and always see a whole
+    snapshot. Subscribers are called after each swap with the new snapshot
+    and the dotted paths of the values that changed ("limits.ip_per_minute").
+
+    With a schema, settings() is the same snapshot compiled to typed
+    objects; a reload whose values don't fit the schema is rejected and the
+    previous snapshot stays. With a cache_path, startup reads unchanged
+    files from the binary snapshot (see snapshot.load_layers) and every
+    reload refreshes it.
+
+    A layer that can't be read or parsed (mid-write, briefly missing during
+    a rename) keeps its previous values until a later poll succeeds.
+    start() polls every poll_interval seconds on a background thread.
+    """
+
+    def __init__(
+        self,
+        env_path: str | Path,
+        conf_paths: list[str | Path],
+        *,
+        poll_interval: float = 1.0,
+        schema: ConfigSchema[T] | None = None,
+        cache_path: str | Path | None = None,
+    ) -> None:
+        if poll_interval <= 0:
+            raise ValueError("poll_interval must be positive")
+        self._layers = service_layers(env_path, conf_paths)
+        self._poll_interval = poll_interval
+        self._schema = schema
+        self._cache_path = cache_path
+        self._subscribers: tuple[Subscriber, ...] = ()
+        self._lock = threading.Lock()  # serializes polls and subscriber changes
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._polls = self._reloads = self._errors = 0
+        self._last_error: str | None = None
+        merged, self._parsed = load_layers(self._layers, cache_path)
+        self._merged = merged
+        # One reference, so a reader never pairs values with the wrong settings.
+        self._published = self._publish(merged)
+
+    def current(self) -> ServiceConfig:
+        return self._published[0]
+
+    def settings(self) -> T:
+        if self._schema is None:
+            raise RuntimeError("no schema was given")
+        return self._published[1]
+
+    def subscribe(self, callback: Subscriber) -> Callable[[], None]:
+        """Registers callback(snapshot, changed_keys); returns an unsubscribe function."""
+        with self._lock:
+            self._subscribers += (callback,)
+
+        def unsubscribe() -> None:
+            with self._lock:
+                self._subscribers = tuple(s for s in self._subscribers if s is not callback)
+
+        return unsubscribe
+
+    def poll(self) -> frozenset:
+        """Reloads changed layers now; returns the keys whose values changed."""
+        with self._lock:
+            self._polls += 1
+            dirty = False
+            for layer in self._layers:
+                try:
+                    signature = layer.stat()
+                    if signature == layer.signature:
+                        continue
+                    values = layer.parse()
+                except (OSError, ValueError) as exc:
+                    self._record_error(f"{layer.path}: {exc}")
+                    continue
+                self._parsed += 1
+                layer.signature = signature
+                if values != layer.values:
+                    layer.values = values
+                    dirty = True
+            if not dirty:
+                return frozenset()
+            merged = merge_layers(self._layers)
+            changed = frozenset(changed_keys(self._merged, merged))
+            if not changed:
+                return changed
+            try:
+                published = self._publish(merged)
+            except ValueError as exc:
+                self._record_error(f"rejected reload: {exc}")
+                return frozenset()
+            self._published = published
+            self._merged = merged
+            self._reloads += 1
+            if self._cache_path is not None:
+                write_snapshot(self._cache_path, self._layers, merged)
+            subscribers = self._subscribers
+        for callback in subscribers:
+            try:
+                callback(published[0], changed)
+            except Exception as exc:
+                # One broken subscriber must not stop reloads or the others.
+                with self._lock:
+                    self._record_error(f"subscriber {callback!r}: {exc}")
+        return changed
+
+    def start(self) -> LiveServiceConfig[T]:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="service-config-watcher", daemon=True
+                )
+                self._thread.start()
+        return self
+
+    def close(self) -> None:
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join()
+
+    def __enter__(self) -> LiveServiceConfig[T]:
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def stats(self) -> ReloadStats:
+        with self._lock:
+            return ReloadStats(
+                polls=self._polls,
+                reloads=self._reloads,
+                layers_parsed=self._parsed,
+                errors=self._errors,
+                last_error=self._last_error,
+            )
+
+    def _publish(self, merged: dict[str, Any]) -> tuple[ServiceConfig, Any]:
+        settings = self._schema.load(merged) if self._schema is not None else None
+        return ServiceConfig(values=freeze_config(merged)), settings
+
+    def _record_error(self, message: str) -> None:
+        self._errors += 1
+        self._last_error = message
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._poll_interval):
+            self.poll()
+
+
+def watch_service_args(
+    argv: list[str],
+    *,
+    poll_interval: float = 1.0,
+    schema: ConfigSchema[T] | None = None,
+    cache_path: str | Path | None = None,
+) -> LiveServiceConfig[T]:
+    """parse_service_args, but returns a LiveServiceConfig (not yet started)."""
+    env, conf = parse_service_argv(argv)
+    return LiveServiceConfig(
+        env, conf, poll_interval=poll_interval, schema=schema, cache_path=cache_path
+    )
@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import dataclasses
+import types
+import typing
+from typing import Any, Callable, Generic, Mapping, TypeVar
+
+from xagent2.service_config.core import ConfigError
+
+T = TypeVar("T")
+Converter = Callable[[Any, str], Any]
+
+
+def _fail(path: str, expected: str, value: Any) -> typing.NoReturn:
+    raise ConfigError(f"{path or '<root>'}: expected {expected}, got {value!r}")
+
+
+def _to_int(value: Any, path: str) -> int:
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            pass
+    _fail(path, "an integer", value)
+
+
+def _to_float(value: Any, path: str) -> float:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            pass
+    _fail(path, "a number", value)
+
+
+_BOOL_WORDS = {"true": True, "yes": True, "on": True, "false": False, "no": False, "off": False}
+
+
+def _to_bool(value: Any, path: str) -> bool:
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.lower() in _BOOL_WORDS:
+        return _BOOL_WORDS[value.lower()]
+    _fail(path, "a boolean", value)
+
+
+def _to_str(value: Any, path: str) -> str:
+    # Unquoted scalars like 1.2 or 8080 arrive as numbers.
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    _fail(path, "a string", value)
+
+
+def _passthrough(value: Any, path: str) -> Any:
+    return value
+
+
+_SCALARS: dict[Any, Converter] = {
+    int: _to_int,
+    float: _to_float,
+    bool: _to_bool,
+    str: _to_str,
+    Any: _passthrough,
+    object: _passthrough,
+}
+
+
+def _compile(tp: Any) -> Converter:
+    if tp in _SCALARS:
+        return _SCALARS[tp]
+    if dataclasses.is_dataclass(tp):
+        return _compile_dataclass(tp)
+    origin, args = typing.get_origin(tp), typing.get_args(tp)
+    if origin in (typing.Union, types.UnionType):
+        options = [arg for arg in args if arg is not type(None)]
+        nullable = len(options) < len(args)
+        inner = _compile(options[0]) if len(options) == 1 else None
+        if inner is None:
+            raise TypeError(f"unsupported config type {tp!r}: only Optional[X] unions")
+
+        def optional(value: Any, path: str) -> Any:
+            if value is None and nullable:
+                return None
+            return inner(value, path)
+
+        return optional
+    if origin is typing.Literal:
+        allowed = args
+
+        def literal(value: Any, path: str) -> Any:
+            if value not in allowed:
+                _fail(path, f"one of {list(allowed)}", value)
+            return value
+
+        return literal
+    if origin in (list, tuple) and (origin is list or (len(args) == 2 and args[1] is ...)):
+        item = _compile(args[0]) if args else _passthrough
+        build = list if origin is list else tuple
+
+        def sequence(value: Any, path: str) -> Any:
+            if not isinstance(value, (list, tuple)):
+                _fail(path, "a list", value)
+            return build(item(v, f"{path}[{i}]") for i, v in enumerate(value))
+
+        return sequence
+    if origin is dict or tp is dict:
+        item = _compile(args[1]) if args else _passthrough
+
+        def mapping(value: Any, path: str) -> Any:
+            if not isinstance(value, Mapping):
+                _fail(path, "a mapping", value)
+            return {str(k): item(v, f"{path}.{k}" if path else str(k)) for k, v in value.items()}
+
+        return mapping
+    raise TypeError(f"unsupported config type {tp!r}")
+
+
+def _compile_dataclass(cls: type) -> Converter:
+    hints = typing.get_type_hints(cls)
+    fields = []
+    for field in dataclasses.fields(cls):
+        if not field.init:
+            continue
+        tp = hints[field.name]
+        has_default = (
+            field.default is not dataclasses.MISSING
+            or field.default_factory is not dataclasses.MISSING
+        )
+        # A nested section without a default can still be omitted if all of
+        # its own fields have defaults.
+        fields.append((field.name, _compile(tp), has_default, dataclasses.is_dataclass(tp)))
+
+    def convert(value: Any, path: str) -> Any:
+        if not isinstance(value, Mapping):
+            _fail(path, "a mapping", value)
+        kwargs = {}
+        for name, field_converter, has_default, section in fields:
+            field_path = f"{path}.{name}" if path else name
+            if name in value:
+                kwargs[name] = field_converter(value[name], field_path)
+            elif section and not has_default:
+                kwargs[name] = field_converter({}, field_path)
+            elif not has_default:
+                raise ConfigError(f"{field_path}: required")
+        return cls(**kwargs)
+
+    return convert
+
+
+class ConfigSchema(Generic[T]):
+    """
+    Typed view of merged config values, described by a (frozen) dataclass.
+
+        @dataclass(frozen=True, slots=True)
+        class Limits:
+            ip_per_minute: float = 60.0
+            burst: int = 10
+
+        @dataclass(frozen=True, slots=True)
+        class Settings:
+            limits: Limits
+            hosts: tuple[str, ...] = ()
+
+        schema = ConfigSchema(Settings)
+        settings = schema.load(config.values)
+        settings.limits.burst  # plain attribute access
+
+    The dataclass is walked once, here, into a tree of converter functions;
+    load() just runs them. Field types may be int, float, bool, str, Any,
+    nested dataclasses, list[X], tuple[X, ...], dict[str, X], Literal[...]
+    and Optional[X]. Values are coerced where unambiguous ("8" to 8, 1 to
+    1.0) and rejected with a ConfigError naming the dotted path otherwise.
+    Keys the schema doesn't mention are ignored.
+    """
+
+    def __init__(self, cls: type[T]) -> None:
+        if not dataclasses.is_dataclass(cls):
+            raise TypeError("ConfigSchema needs a dataclass")
+        self.cls = cls
+        self._convert = _compile_dataclass(cls)
+
+    def load(self, values: Mapping[str, Any]) -> T:
+        return self._convert(values, "")
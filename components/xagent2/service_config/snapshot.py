@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import marshal
+import os
+import sys
+import tempfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Literal
+
+from xagent2.service_config.core import (
+    ServiceConfig,
+    freeze_config,
+    merge_config,
+    parse_env_file,
+    parse_yaml,
+)
+
+_MAGIC = b"xagent2-config\n"
+# Bump when the parsers change how a file maps to values.
+_FORMAT = 1
+_PARSERS = {"yaml": parse_yaml, "env": parse_env_file}
+
+
+def _signature(path: Path) -> tuple[int, int, int]:
+    st = os.stat(path)
+    # The inode catches editors and deploy tools that replace the file by rename.
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+@dataclass
+class ConfigLayer:
+    """One config file, and what it parsed to as of signature (mtime, size, inode)."""
+
+    path: Path
+    kind: Literal["yaml", "env"]
+    signature: tuple[int, int, int] | None = None
+    values: Dict[str, Any] = field(default_factory=dict)
+
+    def stat(self) -> tuple[int, int, int]:
+        return _signature(self.path)
+
+    def parse(self) -> Dict[str, Any]:
+        return _PARSERS[self.kind](self.path)
+
+
+def service_layers(env_path: str | Path, conf_paths: list[str | Path]) -> list[ConfigLayer]:
+    """Layers in merge order: conf files in order, then the env file over all of them."""
+    layers = [ConfigLayer(Path(p), "yaml") for p in conf_paths]
+    layers.append(ConfigLayer(Path(env_path), "env"))
+    return layers
+
+
+def merge_layers(layers: list[ConfigLayer]) -> Dict[str, Any]:
+    merged: Dict[str, Any] = {}
+    for layer in layers:
+        merged = merge_config(merged, layer.values)
+    return merged
+
+
+def _read(cache_path: Path) -> dict | None:
+    try:
+        data = cache_path.read_bytes()
+    except OSError:
+        return None
+    if not data.startswith(_MAGIC):
+        return None
+    try:
+        payload = marshal.loads(data[len(_MAGIC) :])
+    except (EOFError, ValueError, TypeError):
+        return None
+    if not isinstance(payload, dict) or payload.get("version") != (_FORMAT, sys.version_info[:2]):
+        return None
+    return payload
+
+
+def write_snapshot(
+    cache_path: str | Path, layers: list[ConfigLayer], merged: Dict[str, Any]
+) -> None:
+    """Atomically (re)write the snapshot; a cache that can't be written is skipped."""
+    cache_path = Path(cache_path)
+    payload = {
+        "version": (_FORMAT, sys.version_info[:2]),
+        "layers": [
+            (str(layer.path), layer.kind, layer.signature, layer.values) for layer in layers
+        ],
+        "merged": merged,
+    }
+    try:
+        data = _MAGIC + marshal.dumps(payload)
+        fd, tmp = tempfile.mkstemp(dir=cache_path.parent, prefix=cache_path.name + ".")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                out.write(data)
+            os.replace(tmp, cache_path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+    except (OSError, ValueError):
+        pass
+
+
+def load_layers(
+    layers: list[ConfigLayer], cache_path: str | Path | None = None
+) -> tuple[Dict[str, Any], int]:
+    """
+    Fills in every layer's signature and values; returns the merged values
+    and how many files had to be parsed.
+
+    With a cache_path, layers whose file is unchanged since the snapshot was
+    written (same mtime, size and inode) take their values from it; only the
+    others are parsed. If nothing changed, the merged values come straight
+    from the snapshot too. The snapshot is rewritten when anything was
+    parsed. It is written with marshal, so keep it somewhere only the
+    service can write, like the config files themselves.
+    """
+    cached = _read(Path(cache_path)) if cache_path is not None else None
+    previous = {}
+    if cached is not None:
+        previous = {(path, kind): (sig, values) for path, kind, sig, values in cached["layers"]}
+    parsed = 0
+    for layer in layers:
+        layer.signature = layer.stat()
+        hit = previous.get((str(layer.path), layer.kind))
+        if hit is not None and tuple(hit[0]) == layer.signature:
+            layer.values = hit[1]
+        else:
+            layer.values = layer.parse()
+            parsed += 1
+    order = [(str(layer.path), layer.kind) for layer in layers]
+    if cached is not None and parsed == 0 and order == [entry[:2] for entry in cached["layers"]]:
+        return cached["merged"], 0
+    merged = merge_layers(layers)
+    if cache_path is not None:
+        write_snapshot(cache_path, layers, merged)
+    return merged, parsed
+
+
+def load_service_config_cached(
+    env_path: str | Path, conf_paths: list[str | Path], cache_path: str | Path
+) -> ServiceConfig:
+    """load_service_config_from_files, reusing a binary snapshot of unchanged files."""
+    merged, _ = load_layers(service_layers(env_path, conf_paths), cache_path)
+    return ServiceConfig(values=freeze_config(merged))
@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import timedelta
+
+from xagent2.identity_api.core import AsyncSessionStore, Clock, Session, SessionStore
+
+
+@dataclass(frozen=True)
+class SessionCacheStats:
+    hits: int
+    misses: int
+    negative_hits: int
+    size: int
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.negative_hits + self.misses
+        return (self.hits + self.negative_hits) / total if total else 0.0
+
+
+class _SessionLru:
+    """
+    The LRU, TTLs and counters shared by the sync and async caches. Every
+    method takes the lock only briefly and never calls the backing store.
+    """
+
+    def __init__(
+        self,
+        *,
+        clock: Clock,
+        max_entries: int,
+        ttl: timedelta,
+        negative_ttl: timedelta,
+    ) -> None:
+        if max_entries <= 0:
+            raise ValueError("max_entries must be positive")
+        self._clock = clock
+        self._max_entries = max_entries
+        self._ttl = ttl.total_seconds()
+        self._negative_ttl = negative_ttl.total_seconds()
+        # session_id -> (session or None for a negative entry, valid-until timestamp)
+        self._entries: OrderedDict[str, tuple[Session | None, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._negative_hits = 0
+        # Bumped on every delete so a lookup racing a delete doesn't re-cache
+        # the session it just fetched.
+        self._delete_gen = 0
+
+    def invalidate(self, session_id: str) -> None:
+        with self._lock:
+            self._delete_gen += 1
+            self._entries.pop(session_id, None)
+
+    def stats(self) -> SessionCacheStats:
+        with self._lock:
+            return SessionCacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                negative_hits=self._negative_hits,
+                size=len(self._entries),
+            )
+
+    def _cache_created(self, session: Session) -> None:
+        with self._lock:
+            self._put_locked(session.session_id, session, self._clock.now().timestamp())
+
+    def _lookup(self, session_id: str) -> tuple[bool, Session | None, int, float]:
+        """(found, session, delete generation, now); pass the last two to _fill on a miss."""
+        now_ts = self._clock.now().timestamp()
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None:
+                if entry[1] > now_ts:
+                    self._entries.move_to_end(session_id)
+                    if entry[0] is None:
+                        self._negative_hits += 1
+                    else:
+                        self._hits += 1
+                    return True, entry[0], self._delete_gen, now_ts
+                del self._entries[session_id]
+            self._misses += 1
+            return False, None, self._delete_gen, now_ts
+
+    def _fill(self, session_id: str, session: Session | None, gen: int, now_ts: float) -> None:
+        with self._lock:
+            if gen == self._delete_gen:
+                self._put_locked(session_id, session, now_ts)
+
+    def _forget_user(self, user_id: str) -> None:
+        with self._lock:
+            self._delete_gen += 1
+            stale = [
+                sid
+                for sid, (session, _) in self._entries.items()
+                if session is not None and session.user_id == user_id
+            ]
+            for sid in stale:
+                del self._entries[sid]
+
+    def _put_locked(self, session_id: str, session: Session | None, now_ts: float) -> None:
+        if session is None:
+            valid_until = now_ts + self._negative_ttl
+        else:
+            valid_until = min(now_ts + self._ttl, session.expires_at.timestamp())
+        if valid_until <= now_ts:
+            self._entries.pop(session_id, None)
+            return
+        self._entries[session_id] = (session, valid_until)
+        self._entries.move_to_end(session_id)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+
+class CachingSessionStore(_SessionLru, SessionStore):
+    """
+    Read-through LRU cache in front of another SessionStore.
+
+    Found sessions are cached for at most ttl and never past their own
+    expires_at. Unknown IDs are cached as negative entries for negative_ttl
+    so floods of invalid tokens don't reach the backing store. Writes and
+    deletes go through this instance and keep the cache in step; deletes
+    made by other replicas are seen once ttl runs out.
+    """
+
+    def __init__(
+        self,
+        inner: SessionStore,
+        *,
+        clock: Clock,
+        max_entries: int = 10_000,
+        ttl: timedelta = timedelta(seconds=30),
+        negative_ttl: timedelta = timedelta(seconds=5),
+    ) -> None:
+        super().__init__(clock=clock, max_entries=max_entries, ttl=ttl, negative_ttl=negative_ttl)
+        self._inner = inner
+
+    def create_session(self, session: Session) -> None:
+        self._inner.create_session(session)
+        self._cache_created(session)
+
+    def get_session(self, session_id: str) -> Session | None:
+        found, session, gen, now_ts = self._lookup(session_id)
+        if found:
+            return session
+        session = self._inner.get_session(session_id)
+        self._fill(session_id, session, gen, now_ts)
+        return session
+
+    def delete_session(self, session_id: str) -> None:
+        self._inner.delete_session(session_id)
+        self.invalidate(session_id)
+
+    def delete_sessions_for_user(self, user_id: str) -> int:
+        deleted = self._inner.delete_sessions_for_user(user_id)
+        self._forget_user(user_id)
+        return deleted
+
+
+class AsyncCachingSessionStore(_SessionLru, AsyncSessionStore):
+    """
+    CachingSessionStore for an AsyncSessionStore. Put it in front of a
+    thread-pool bridge: hits are answered on the event loop and only misses
+    and writes take a worker thread.
+    """
+
+    def __init__(
+        self,
+        inner: AsyncSessionStore,
+        *,
+        clock: Clock,
+        max_entries: int = 10_000,
+        ttl: timedelta = timedelta(seconds=30),
+        negative_ttl: timedelta = timedelta(seconds=5),
+    ) -> None:
+        super().__init__(clock=clock, max_entries=max_entries, ttl=ttl, negative_ttl=negative_ttl)
+        self._inner = inner
+
+    async def create_session(self, session: Session) -> None:
+        await self._inner.create_session(session)
+        self._cache_created(session)
+
+    async def get_session(self, session_id: str) -> Session | None:
+        found, session, gen, now_ts = self._lookup(session_id)
+        if found:
+            return session
+        session = await self._inner.get_session(session_id)
+        self._fill(session_id, session, gen, now_ts)
+        return session
+
+    async def delete_session(self, session_id: str) -> None:
+        await self._inner.delete_session(session_id)
+        self.invalidate(session_id)
+
+    async def delete_sessions_for_user(self, user_id: str) -> int:
+        deleted = await self._inner.delete_sessions_for_user(user_id)
+        self._forget_user(user_id)
+        return deleted
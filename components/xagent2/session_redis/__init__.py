@@ -0,0 +1,6 @@
+from .core import (  # noqa: F401
+    RedisConnection,
+    RedisConnectionPool,
+    RedisSessionStore,
+    RespError,
+)
@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import queue
+import socket
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Sequence, Union
+
+from xagent2.identity_api.core import (
+    Session,
+    SessionStore,
+    from_epoch_micros,
+    to_epoch_micros,
+)
+
+Arg = Union[bytes, str, int]
+Reply = Union[bytes, int, list, None, "RespError"]
+
+
+class RespError(Exception):
+    """Error reply (-ERR ...) from the server."""
+
+
+def encode_command(args: Sequence[Arg]) -> bytes:
+    out = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if isinstance(arg, int):
+            arg = b"%d" % arg
+        elif isinstance(arg, str):
+            arg = arg.encode("utf-8")
+        out.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+    return b"".join(out)
+
+
+def read_reply(stream) -> Reply:
+    """
+    Read one RESP2 reply from a buffered binary stream. Error replies are
+    returned (not raised) so one failed command doesn't hide the rest of a
+    pipeline.
+    """
+    line = stream.readline()
+    if not line.endswith(b"\r\n"):
+        raise ConnectionError("connection closed by server")
+    kind, body = line[:1], line[1:-2]
+    if kind == b"+":
+        return body
+    if kind == b"-":
+        return RespError(body.decode("utf-8", "replace"))
+    if kind == b":":
+        return int(body)
+    if kind == b"$":
+        size = int(body)
+        if size < 0:
+            return None
+        data = stream.read(size + 2)
+        if len(data) != size + 2:
+            raise ConnectionError("connection closed by server")
+        return data[:-2]
+    if kind == b"*":
+        count = int(body)
+        if count < 0:
+            return None
+        return [read_reply(stream) for _ in range(count)]
+    raise ConnectionError(f"unexpected RESP reply type {kind!r}")
+
+
+class RedisConnection:
+    """One blocking connection speaking RESP2."""
+
+    def __init__(self, host: str, port: int, *, timeout: float | None = 5.0) -> None:
+        self._sock = socket.create_connection((host, port), timeout=timeout)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._reader = self._sock.makefile("rb")
+
+    def execute(self, *args: Arg) -> Reply:
+        reply = self.pipeline([args])[0]
+        if isinstance(reply, RespError):
+            raise reply
+        return reply
+
+    def pipeline(self, commands: Sequence[Sequence[Arg]]) -> list[Reply]:
+        """Send all commands in one write and read their replies in order."""
+        self._sock.sendall(b"".join(encode_command(args) for args in commands))
+        return [read_reply(self._reader) for _ in commands]
+
+    def close(self) -> None:
+        self._reader.close()
+        self._sock.close()
+
+
+class RedisConnectionPool:
+    """
+    Up to size connections to one server, opened on demand and reused
+    most-recently-used first. A connection that fails mid-command is closed
+    rather than returned, since its reply stream is out of step.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 6379,
+        *,
+        size: int = 8,
+        timeout: float | None = 5.0,
+        db: int = 0,
+    ) -> None:
+        if size <= 0:
+            raise ValueError("size must be positive")
+        self._host, self._port = host, port
+        self._timeout = timeout
+        self._db = db
+        self._idle: queue.LifoQueue[RedisConnection] = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._closed = False
+
+    def _connect(self) -> RedisConnection:
+        conn = RedisConnection(self._host, self._port, timeout=self._timeout)
+        if self._db:
+            conn.execute("SELECT", self._db)
+        return conn
+
+    @contextmanager
+    def connection(self) -> Iterator[RedisConnection]:
+        if self._closed:
+            raise RuntimeError("connection pool is closed")
+        self._slots.acquire()
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+            healthy = False
+            try:
+                yield conn
+                healthy = True
+            except RespError:
+                healthy = True  # the reply was read in full; the stream is in step
+                raise
+            finally:
+                if healthy and not self._closed:
+                    self._idle.put(conn)
+                else:
+                    conn.close()
+        finally:
+            self._slots.release()
+
+    def execute(self, *args: Arg) -> Reply:
+        with self.connection() as conn:
+            return conn.execute(*args)
+
+    def pipeline(self, commands: Sequence[Sequence[Arg]]) -> list[Reply]:
+        with self.connection() as conn:
+            return conn.pipeline(commands)
+
+    def close(self) -> None:
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+def _check(replies: list[Reply]) -> list[Reply]:
+    for reply in replies:
+        if isinstance(reply, RespError):
+            raise reply
+    return replies
+
+
+class RedisSessionStore(SessionStore):
+    """
+    SessionStore on a Redis-protocol server, shareable by any number of
+    replicas.
+
+    Each session is one string key, "<created_us>:<expires_us>:<user_id>",
+    stored with PXAT at its expires_at so the server drops it on expiry and
+    lookups never see expired sessions. A per-user sorted set of session IDs
+    scored by expiry (ms) backs delete_sessions_for_user; every new session
+    trims the IDs that expired by its created_at, and the set itself expires
+    with the user's last session. Multi-command writes go out as one
+    pipelined round trip.
+
+    delete_session only knows the session ID, so it leaves that ID in the
+    user's set until it would have expired; delete_sessions_for_user counts
+    only the sessions that were still there.
+    """
+
+    def __init__(self, pool: RedisConnectionPool, *, prefix: str = "xagent2:") -> None:
+        self._pool = pool
+        self._session_prefix = f"{prefix}session:"
+        self._user_prefix = f"{prefix}user-sessions:"
+
+    def create_session(self, session: Session) -> None:
+        created_us = to_epoch_micros(session.created_at)
+        expires_us = to_epoch_micros(session.expires_at)
+        expires_ms = -(-expires_us // 1000)
+        user_key = self._user_prefix + session.user_id
+        value = f"{created_us}:{expires_us}:{session.user_id}"
+        _check(
+            self._pool.pipeline(
+                [
+                    ("SET", self._session_prefix + session.session_id, value, "PXAT", expires_ms),
+                    ("ZREMRANGEBYSCORE", user_key, "-inf", created_us // 1000),
+                    ("ZADD", user_key, expires_ms, session.session_id),
+                    ("PEXPIREAT", user_key, expires_ms, "GT"),
+                    # GT leaves a key without TTL alone; give a new set one.
+                    ("PEXPIREAT", user_key, expires_ms, "NX"),
+                ]
+            )
+        )
+
+    def get_session(self, session_id: str) -> Session | None:
+        value = self._pool.execute("GET", self._session_prefix + session_id)
+        return self._decode(session_id, value)
+
+    def get_sessions(self, session_ids: Sequence[str]) -> list[Session | None]:
+        """Batch lookup with a single MGET."""
+        if not session_ids:
+            return []
+        values = self._pool.execute("MGET", *(self._session_prefix + sid for sid in session_ids))
+        return [self._decode(sid, value) for sid, value in zip(session_ids, values)]
+
+    def delete_session(self, session_id: str) -> None:
+        self._pool.execute("DEL", self._session_prefix + session_id)
+
+    def delete_sessions_for_user(self, user_id: str) -> int:
+        user_key = self._user_prefix + user_id
+        with self._pool.connection() as conn:
+            members = conn.execute("ZRANGE", user_key, 0, -1)
+            if not members:
+                return 0
+            keys = [self._session_prefix.encode("utf-8") + sid for sid in members]
+            deleted, _ = _check(conn.pipeline([("DEL", *keys), ("DEL", user_key)]))
+        return deleted
+
+    def _decode(self, session_id: str, value: bytes | None) -> Session | None:
+        if value is None:
+            return None
+        created_us, expires_us, user_id = value.decode("utf-8").split(":", 2)
+        return Session(
+            session_id=session_id,
+            user_id=user_id,
+            created_at=from_epoch_micros(int(created_us)),
+            expires_at=from_epoch_micros(int(expires_us)),
+        )
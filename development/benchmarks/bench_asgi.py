@@ -0,0 +1,57 @@
+"""
+In-process benchmarks of the assistant_api routes: create_app() driven
+through httpx's ASGI transport at configurable concurrency. Measures the
+application and framework cost without any network stack.
+"""
+from __future__ import annotations
+
+import asyncio
+
+import httpx
+from harness import BenchResult, add_workspace_to_path, measure_async
+
+add_workspace_to_path()
+
+from xagent2.assistant_api.core import create_app  # noqa: E402
+from xagent2.assistant_api.wiring import build_container  # noqa: E402
+
+
+async def _run(
+    n: int, concurrency: int, fast_responses: bool, container_kwargs: dict
+) -> list[BenchResult]:
+    app = create_app(build_container(**container_kwargs), fast_responses=fast_responses)
+    transport = httpx.ASGITransport(app=app)
+    options = {**container_kwargs, **({"fast_responses": True} if fast_responses else {})}
+    tag = ",".join(f"{k}={v}" for k, v in sorted(options.items())) or "default"
+    results = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.post("/users", json={"email": "a@example.com", "password": "pw"})
+        creds = {"email": "a@example.com", "password": "pw"}
+        login = await client.post("/login", json=creds)
+        headers = {"X-Session-Id": login.json()["session_id"]}
+
+        async def do_login():
+            r = await client.post("/login", json=creds)
+            assert r.status_code == 200, r.text
+
+        async def do_me():
+            r = await client.get("/me", headers=headers)
+            assert r.status_code == 200, r.text
+
+        async def do_query():
+            r = await client.post("/query", json={"text": "hello"}, headers=headers)
+            assert r.status_code == 200, r.text
+
+        for route, fn in (("/login", do_login), ("/me", do_me), ("/query", do_query)):
+            results.append(
+                await measure_async(
+                    f"asgi{route}[c={concurrency},{tag}]", fn, n, concurrency=concurrency
+                )
+            )
+    return results
+
+
+def run(
+    n: int, concurrency: int = 64, *, fast_responses: bool = False, **container_kwargs
+) -> list[BenchResult]:
+    return asyncio.run(_run(n, concurrency, fast_responses, container_kwargs))
@@ -0,0 +1,98 @@
+"""
+Throughput of the in-memory identity adapters under thread contention:
+signups (create_if_absent) and login/lookup/logout session traffic, for the
+single-lock InMemorySessionStore vs the lock-striped stores, at increasing
+thread counts. Scaling beyond one core needs a free-threaded build
+(python3.14t); on a GIL build the numbers show lock overhead only.
+
+Run from the workspace root:
+    python development/benchmarks/bench_contention.py --ops 200000
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from harness import add_workspace_to_path
+
+add_workspace_to_path()
+
+from xagent2.assistant_api.adapters import (  # noqa: E402
+    InMemorySessionStore,
+    InMemoryUserRepo,
+    StripedSessionStore,
+)
+from xagent2.identity_api.core import Session, User  # noqa: E402
+
+
+def run_threads(n_threads: int, ops: int, work) -> float:
+    per_thread = ops // n_threads
+    barrier = threading.Barrier(n_threads + 1)
+
+    def worker(t: int) -> None:
+        barrier.wait()
+        work(t, per_thread)
+
+    threads = [threading.Thread(target=worker, args=(t,)) for t in range(n_threads)]
+    for t in threads:
+        t.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for t in threads:
+        t.join()
+    return per_thread * n_threads / (time.perf_counter() - start)
+
+
+def signups(repo: InMemoryUserRepo):
+    def work(t: int, n: int) -> None:
+        for i in range(n):
+            repo.create_if_absent(
+                User(user_id=f"{t}-{i}", email=f"{t}-{i}@example.com", password_hash="h")
+            )
+
+    return work
+
+
+def session_traffic(store):
+    now = datetime.now(timezone.utc)
+    expires = now + timedelta(hours=1)
+
+    def work(t: int, n: int) -> None:
+        for i in range(n):
+            sid = f"{t}-{i}"
+            store.create_session(
+                Session(session_id=sid, user_id=str(t), created_at=now, expires_at=expires)
+            )
+            store.get_session(sid)
+            store.delete_session(sid)
+
+    return work
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ops", type=int, default=200_000)
+    parser.add_argument("--threads", default="1,2,4,8")
+    args = parser.parse_args()
+
+    gil = getattr(sys, "_is_gil_enabled", lambda: True)()
+    print(f"python {sys.version.split()[0]}, GIL {'enabled' if gil else 'disabled'}")
+    cases = {
+        "users.create_if_absent[striped-64]": lambda: signups(InMemoryUserRepo(stripes=64)),
+        "users.create_if_absent[1-lock]": lambda: signups(InMemoryUserRepo(stripes=1)),
+        "sessions.create+get+delete[1-lock]": lambda: session_traffic(InMemorySessionStore()),
+        "sessions.create+get+delete[striped-16]": lambda: session_traffic(
+            StripedSessionStore(stripes=16)
+        ),
+    }
+    for name, make in cases.items():
+        for n_threads in (int(x) for x in args.threads.split(",")):
+            rate = run_threads(n_threads, args.ops, make())
+            print(f"{name:<42} threads={n_threads:<3} {rate:>12,.0f} ops/s")
+
+
+if __name__ == "__main__":
+    main()
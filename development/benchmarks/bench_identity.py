@@ -0,0 +1,123 @@
+"""
+Micro-benchmarks for IdentityService use-cases and the identity adapters.
+"""
+from __future__ import annotations
+
+import tempfile
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from harness import BenchResult, add_workspace_to_path, measure
+
+add_workspace_to_path()
+
+from xagent2.assistant_api.adapters import (  # noqa: E402
+    InMemorySessionStore,
+    InMemoryUserRepo,
+    SimplePasswordHasher,
+    UtcClock,
+    UuidLikeIdGenerator,
+)
+from xagent2.identity.core import IdentityConfig, IdentityService  # noqa: E402
+from xagent2.identity_api.core import CreateUserCmd, LoginCmd, Session, User  # noqa: E402
+from xagent2.identity_sqlite.core import (  # noqa: E402
+    SqliteConnectionPool,
+    SqliteSessionStore,
+    SqliteUserRepo,
+)
+from xagent2.session_cache.core import CachingSessionStore  # noqa: E402
+
+
+def _identity(users, sessions) -> IdentityService:
+    return IdentityService(
+        config=IdentityConfig(),
+        users=users,
+        sessions=sessions,
+        hasher=SimplePasswordHasher(),
+        ids=UuidLikeIdGenerator(),
+        clock=UtcClock(),
+    )
+
+
+def _session(i: int) -> Session:
+    now = datetime.now(timezone.utc)
+    return Session(
+        session_id=f"s{i}", user_id="u", created_at=now, expires_at=now + timedelta(hours=1)
+    )
+
+
+def run(n: int) -> list[BenchResult]:
+    results = []
+    clock = UtcClock()
+
+    identity = _identity(InMemoryUserRepo(), InMemorySessionStore(clock=clock))
+    counter = iter(range(10**9))
+    results.append(
+        measure(
+            "identity.create_user[memory]",
+            lambda: identity.create_user(
+                CreateUserCmd(email=f"u{next(counter)}@example.com", password="pw")
+            ),
+            n,
+        )
+    )
+    results.append(
+        measure(
+            "identity.create_users[memory,batch=1000]",
+            lambda: identity.create_users(
+                [
+                    CreateUserCmd(email=f"u{next(counter)}@example.com", password="pw")
+                    for _ in range(1000)
+                ]
+            ),
+            max(1, n // 1000),
+            warmup=1,
+        )
+    )
+    identity.create_user(CreateUserCmd(email="a@example.com", password="pw"))
+    login = LoginCmd(email="a@example.com", password="pw")
+    results.append(measure("identity.login[memory]", lambda: identity.login(login), n))
+    session_id = identity.login(login).session_id
+    results.append(
+        measure(
+            "identity.authenticate_session[memory]",
+            lambda: identity.authenticate_session(session_id),
+            n,
+        )
+    )
+
+    store = InMemorySessionStore(clock=clock)
+    ids = iter(range(10**9))
+    results.append(
+        measure("session_store.create[memory]", lambda: store.create_session(_session(next(ids))), n)
+    )
+    results.append(measure("session_store.get[memory]", lambda: store.get_session("s1"), n))
+
+    cached = CachingSessionStore(store, clock=clock)
+    results.append(measure("session_store.get[cached]", lambda: cached.get_session("s1"), n))
+    results.append(
+        measure("session_store.get[cached-negative]", lambda: cached.get_session("nope"), n)
+    )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = SqliteConnectionPool(Path(tmp) / "bench.db")
+        users = SqliteUserRepo(pool)
+        users.create(User(user_id="u1", email="a@example.com", password_hash="h"))
+        sql_sessions = SqliteSessionStore(pool)
+        sql_sessions.create_session(_session(1))
+        results.append(
+            measure("user_repo.get_by_email[sqlite]", lambda: users.get_by_email("a@example.com"), n)
+        )
+        results.append(
+            measure("session_store.get[sqlite]", lambda: sql_sessions.get_session("s1"), n)
+        )
+        sql_ids = iter(range(2, 10**9))
+        results.append(
+            measure(
+                "session_store.create[sqlite]",
+                lambda: sql_sessions.create_session(_session(next(sql_ids))),
+                n,
+            )
+        )
+        pool.close()
+    return results
@@ -0,0 +1,122 @@
+"""
+RedisSessionStore against InMemorySessionStore: per-call latency of
+create/get/delete, batched lookups (MGET vs per-ID gets), and the effect of
+pooling by running the same traffic from several threads.
+
+Without --redis the Redis store talks to the in-process RespServer stand-in,
+so the numbers are dominated by the loopback round trip and the stand-in's
+Python command loop; point --redis at a real server for deployment numbers.
+
+Run from the workspace root:
+    python development/benchmarks/bench_redis_sessions.py -n 5000
+    python development/benchmarks/bench_redis_sessions.py --redis 127.0.0.1:6379
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from harness import BenchResult, add_workspace_to_path, measure
+
+add_workspace_to_path()
+
+from resp_server import RespServer  # noqa: E402
+from xagent2.assistant_api.adapters import InMemorySessionStore  # noqa: E402
+from xagent2.identity_api.core import Session  # noqa: E402
+from xagent2.session_redis.core import RedisConnectionPool, RedisSessionStore  # noqa: E402
+
+
+def store_benchmarks(label: str, store, n: int) -> list[BenchResult]:
+    now = datetime.now(timezone.utc)
+    expires = now + timedelta(hours=1)
+    ids = (f"{label}-{i}" for i in itertools.count())
+    created: list[str] = []
+
+    def create() -> None:
+        sid = next(ids)
+        user_id = f"u{len(created) % 100}"
+        store.create_session(
+            Session(session_id=sid, user_id=user_id, created_at=now, expires_at=expires)
+        )
+        created.append(sid)
+
+    results = [measure(f"{label}.create_session", create, n)]
+    hits = itertools.cycle(created)
+    results.append(measure(f"{label}.get_session", lambda: store.get_session(next(hits)), n))
+    batch = created[:32]
+    get_many = getattr(store, "get_sessions", None)
+    if get_many is None:
+        get_many = lambda sids: [store.get_session(sid) for sid in sids]  # noqa: E731
+    results.append(measure(f"{label}.get_sessions[32]", lambda: get_many(batch), max(1, n // 32)))
+    doomed = iter(created)
+    delete = lambda: store.delete_session(next(doomed))  # noqa: E731
+    results.append(measure(f"{label}.delete_session", delete, n))
+    return results
+
+
+def threaded_gets(store, sids: list[str], threads: int, per_thread: int) -> float:
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(offset: int) -> None:
+        barrier.wait()
+        for i in range(per_thread):
+            store.get_session(sids[(offset + i) % len(sids)])
+
+    workers = [threading.Thread(target=worker, args=(t * 7,)) for t in range(threads)]
+    for w in workers:
+        w.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for w in workers:
+        w.join()
+    return threads * per_thread / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=5_000)
+    parser.add_argument("--redis", help="host:port of a Redis server (default: stand-in)")
+    parser.add_argument("--pool-size", type=int, default=8)
+    parser.add_argument("--threads", default="1,4,8")
+    args = parser.parse_args()
+
+    stand_in = None
+    if args.redis:
+        host, _, port = args.redis.rpartition(":")
+    else:
+        stand_in = RespServer().start()
+        host, port = stand_in.host, stand_in.port
+    pool = RedisConnectionPool(host, int(port), size=args.pool_size)
+    try:
+        stores = {
+            "memory": InMemorySessionStore(),
+            "redis": RedisSessionStore(pool, prefix=f"bench-{time.time_ns()}:"),
+        }
+        for label, store in stores.items():
+            for result in store_benchmarks(label, store, args.n):
+                print(result.line())
+
+        print()
+        now = datetime.now(timezone.utc)
+        expires = now + timedelta(hours=1)
+        for label, store in stores.items():
+            sids = [f"t{i}" for i in range(1000)]
+            for sid in sids:
+                store.create_session(
+                    Session(session_id=sid, user_id="u", created_at=now, expires_at=expires)
+                )
+            for threads in (int(t) for t in args.threads.split(",")):
+                rate = threaded_gets(store, sids, threads, args.n // threads)
+                print(f"{label + '.get_session':<40} threads={threads:<3} {rate:>11,.0f}/s")
+            store.delete_sessions_for_user("u")
+    finally:
+        pool.close()
+        if stand_in is not None:
+            stand_in.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Indexing throughput and query latency of the in-process BM25 index.
+
+Builds a synthetic Zipf-distributed corpus and times IndexBuilder plus
+InvertedIndex.search with and without NumPy scoring, then writes the index
+file and times opening it with MmapIndex.
+
+Run from the workspace root:
+    python development/benchmarks/bench_retrieval.py --docs 1000000
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from harness import add_workspace_to_path, percentile
+
+add_workspace_to_path()
+
+from xagent2.query_service import retrieval  # noqa: E402
+from xagent2.query_service.index_file import MmapIndex, write_index  # noqa: E402
+from xagent2.query_service.retrieval import IndexBuilder  # noqa: E402
+
+
+def synthetic_corpus(n_docs: int, vocab_size: int, seed: int):
+    rng = random.Random(seed)
+    vocab = [f"t{i}" for i in range(vocab_size)]
+    cum_weights = []
+    total = 0.0
+    for i in range(vocab_size):
+        total += 1 / (i + 1)
+        cum_weights.append(total)
+    for i in range(n_docs):
+        yield f"doc-{i}", " ".join(rng.choices(vocab, cum_weights=cum_weights, k=rng.randint(20, 80)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=1_000_000)
+    parser.add_argument("--vocab", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    builder = IndexBuilder()
+    start = time.perf_counter()
+    builder.add_many(synthetic_corpus(args.docs, args.vocab, seed=1))
+    index = builder.build()
+    elapsed = time.perf_counter() - start
+    print(
+        f"indexed {args.docs} docs ({index.vocabulary_size} terms) in {elapsed:.1f}s "
+        f"= {args.docs / elapsed:,.0f} docs/s"
+    )
+
+    rng = random.Random(2)
+    queries = [
+        " ".join(f"t{rng.randint(0, args.vocab // 10)}" for _ in range(rng.randint(2, 5)))
+        for _ in range(args.queries)
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "corpus.idx"
+        start = time.perf_counter()
+        write_index(index, path)
+        print(
+            f"wrote index file ({path.stat().st_size / 2**20:.0f} MiB) "
+            f"in {time.perf_counter() - start:.1f}s"
+        )
+        start = time.perf_counter()
+        mapped = MmapIndex(path)
+        print(f"opened index file in {(time.perf_counter() - start) * 1e3:.2f}ms")
+
+        np_module = retrieval.np
+        modes = [("numpy", np_module), ("python", None)] if np_module is not None else [
+            ("python", None)
+        ]
+        for label, mode in modes:
+            retrieval.np = mode
+            for source, searchable in (("memory", index), ("mmap", mapped)):
+                samples = []
+                for q in queries:
+                    start = time.perf_counter()
+                    searchable.search(q, k=args.k)
+                    samples.append((time.perf_counter() - start) * 1e3)
+                print(
+                    f"{label:<7} {source:<7} search k={args.k} n={len(queries)} "
+                    f"p50={statistics.median(samples):.2f}ms "
+                    f"p99={percentile(samples, 99):.2f}ms"
+                )
+        retrieval.np = np_module
+        mapped.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Lookup latency of SemanticAnswerCache at large capacities (needs NumPy).
+
+Run from the workspace root:
+    python development/benchmarks/bench_semantic_cache.py --entries 100000
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timezone
+
+from harness import add_workspace_to_path, percentile
+
+add_workspace_to_path()
+
+from xagent2.query_service.core import Answer, Query  # noqa: E402
+from xagent2.query_service.semantic_cache import (  # noqa: E402
+    HashingEmbedder,
+    SemanticAnswerCache,
+)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=100_000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=32)
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    vocab = ["".join(rng.choices(letters, k=rng.randint(4, 9))) for _ in range(20_000)]
+    texts = [" ".join(rng.choices(vocab, k=rng.randint(3, 8))) for _ in range(args.entries)]
+    fixed = Answer(text="cached", created_at=datetime.now(timezone.utc))
+    cache = SemanticAnswerCache(lambda q: fixed, HashingEmbedder(), capacity=args.entries)
+
+    start = time.perf_counter()
+    for i in range(0, len(texts), 1000):
+        cache.answer_many([Query(text=t) for t in texts[i : i + 1000]])
+    print(f"filled {args.entries} entries in {time.perf_counter() - start:.1f}s")
+
+    for label, pick in (
+        ("hit", lambda: rng.choice(texts)),
+        ("miss", lambda: " ".join(rng.choices(vocab, k=5)) + " novel"),
+    ):
+        samples = []
+        for _ in range(args.lookups):
+            text = pick()
+            start = time.perf_counter()
+            cache.lookup_many([text])
+            samples.append((time.perf_counter() - start) * 1e3)
+        print(
+            f"{label:<5} lookup p50={statistics.median(samples):.3f}ms "
+            f"p99={percentile(samples, 99):.3f}ms"
+        )
+
+    batch = [rng.choice(texts) for _ in range(args.batch)]
+    start = time.perf_counter()
+    for _ in range(100):
+        cache.lookup_many(batch)
+    per_query = (time.perf_counter() - start) / (100 * args.batch) * 1e3
+    print(f"batched lookup ({args.batch}/call) {per_query:.3f}ms per query")
+    print(f"stats: {cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Per-response CPU of the hot JSON bodies (/login, /me, /query).
+
+"model" is what a response_model route does per request: build the
+pydantic model, let FastAPI dump, re-validate and serialize it, then
+JSONResponse renders it. "encoder" is the precompiled encoder that
+create_app(fast_responses=True) uses. The ASGI section then runs the
+routes end to end with the option off and on.
+
+Run from the workspace root:
+    python development/benchmarks/bench_serialization.py -n 100000
+"""
+from __future__ import annotations
+
+import argparse
+from datetime import datetime, timedelta, timezone
+
+import bench_asgi
+from harness import BenchResult, add_workspace_to_path, measure
+
+add_workspace_to_path()
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+
+from xagent2.assistant_api.core import (  # noqa: E402
+    LoginResponse,
+    MeResponse,
+    QueryResponse,
+    _encode_answer,
+    _encode_login,
+    _encode_me,
+)
+from xagent2.assistant_api.encoders import EncodedJSONResponse  # noqa: E402
+from xagent2.identity_api.core import AuthResult  # noqa: E402
+from xagent2.query_service.core import Answer  # noqa: E402
+
+
+def _via_model(model, build):
+    # Mirrors fastapi.routing.serialize_response for a returned model.
+    adapter = TypeAdapter(model)
+
+    def respond(obj):
+        content = build(obj).model_dump()
+        value = adapter.validate_python(content)
+        return JSONResponse(adapter.dump_python(value, mode="json")).body
+
+    return respond
+
+
+def run(n: int) -> list[BenchResult]:
+    now = datetime.now(timezone.utc)
+    result = AuthResult(user_id="u" * 32, session_id="s" * 43, expires_at=now + timedelta(hours=12))
+    answer = Answer(text="Echo: what is the refund policy for annual plans?", created_at=now)
+    cases = [
+        (
+            "login",
+            result,
+            _via_model(
+                LoginResponse,
+                lambda r: LoginResponse(
+                    user_id=r.user_id, session_id=r.session_id, expires_at=r.expires_at.isoformat()
+                ),
+            ),
+            _encode_login,
+        ),
+        ("me", result.user_id, _via_model(MeResponse, lambda u: MeResponse(user_id=u)), _encode_me),
+        (
+            "query",
+            answer,
+            _via_model(
+                QueryResponse,
+                lambda a: QueryResponse(answer=a.text, created_at=a.created_at.isoformat()),
+            ),
+            _encode_answer,
+        ),
+    ]
+    results = []
+    for name, obj, slow, fast in cases:
+        assert slow(obj) == fast(obj)
+        results.append(measure(f"serialize.{name}[model]", lambda: slow(obj), n))
+        results.append(
+            measure(f"serialize.{name}[encoder]", lambda: EncodedJSONResponse(fast(obj)).body, n)
+        )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=100_000, help="encodings per case")
+    parser.add_argument("--requests", type=int, default=5000, help="ASGI requests per route")
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args()
+
+    for line in (r.line() for r in run(args.n)):
+        print(line)
+    for fast in (False, True):
+        for r in bench_asgi.run(args.requests, args.concurrency, fast_responses=fast):
+            print(r.line())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Bytes per stored session in the in-memory session stores, measured with
+tracemalloc: allocations made while inserting --sessions sessions (for
+--users distinct users, with token-sized random session IDs), minus the
+memory of the session-ID strings themselves, which any store must keep.
+
+Run from the workspace root:
+    python development/benchmarks/bench_session_memory.py --sessions 1000000
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import secrets
+import sys
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+from harness import add_workspace_to_path
+
+add_workspace_to_path()
+
+from xagent2.assistant_api.adapters import (  # noqa: E402
+    InMemorySessionStore,
+    StripedSessionStore,
+)
+from xagent2.identity_api.core import Session  # noqa: E402
+
+
+def measure(make_store, n_sessions: int, n_users: int) -> float:
+    now = datetime.now(timezone.utc)
+    user_ids = [secrets.token_hex(16) for _ in range(n_users)]
+    gc.collect()
+    tracemalloc.start()
+    session_ids = [secrets.token_urlsafe(32) for _ in range(n_sessions)]
+    ids_bytes = tracemalloc.get_traced_memory()[0]
+    store = make_store()
+    for i, sid in enumerate(session_ids):
+        store.create_session(
+            Session(
+                session_id=sid,
+                user_id=user_ids[i % n_users],
+                created_at=now,
+                expires_at=now + timedelta(hours=12, microseconds=i),
+            )
+        )
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - ids_bytes
+    tracemalloc.stop()
+    assert len(store) == n_sessions
+    return used / n_sessions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=100_000)
+    args = parser.parse_args()
+    id_bytes = sys.getsizeof(secrets.token_urlsafe(32))
+    for name, make in (
+        ("InMemorySessionStore", InMemorySessionStore),
+        ("StripedSessionStore(16)", lambda: StripedSessionStore(stripes=16)),
+    ):
+        per_session = measure(make, args.sessions, args.users)
+        print(
+            f"{name:<24} {per_session:>7.1f} bytes/session "
+            f"(+ {id_bytes} for the session ID) "
+            f"-> {2**30 / (per_session + id_bytes):>12,.0f} sessions/GiB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Latency of GET /me with the SQLite-backed identity adapters vs in-memory.
+
+Run from the workspace root:
+    python development/benchmarks/bench_sqlite_me.py --requests 20000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from harness import add_workspace_to_path, percentile
+
+add_workspace_to_path()
+
+import httpx  # noqa: E402
+
+from xagent2.assistant_api.core import create_app  # noqa: E402
+from xagent2.assistant_api.wiring import build_container  # noqa: E402
+
+
+async def run(label: str, sqlite_path: str | None, requests: int) -> None:
+    app = create_app(build_container(sqlite_path=sqlite_path))
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.post("/users", json={"email": "a@example.com", "password": "pw"})
+        login = await client.post("/login", json={"email": "a@example.com", "password": "pw"})
+        headers = {"X-Session-Id": login.json()["session_id"]}
+        for _ in range(500):
+            await client.get("/me", headers=headers)
+
+        samples = []
+        for _ in range(requests):
+            start = time.perf_counter()
+            r = await client.get("/me", headers=headers)
+            samples.append((time.perf_counter() - start) * 1e6)
+            assert r.status_code == 200
+
+    print(
+        f"{label:<8} /me n={requests} "
+        f"p50={statistics.median(samples):.0f}us "
+        f"p99={percentile(samples, 99):.0f}us "
+        f"p999={percentile(samples, 99.9):.0f}us"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    asyncio.run(run("memory", None, args.requests))
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(run("sqlite", str(Path(tmp) / "identity.db"), args.requests))
+
+
+if __name__ == "__main__":
+    main()
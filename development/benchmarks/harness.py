@@ -0,0 +1,168 @@
+"""
+Shared timing, reporting and baseline comparison for the benchmark scripts.
+
+Results are plain JSON so runs can be archived and diffed:
+
+    {"meta": {...}, "results": [{"name": ..., "p50_us": ..., ...}, ...]}
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import platform
+import statistics
+import sys
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Awaitable, Callable, Iterable
+
+ROOT = Path(__file__).resolve().parents[2]
+
+
+def add_workspace_to_path() -> None:
+    for sub in ("components", "bases", "development"):
+        path = str(ROOT / sub)
+        if path not in sys.path:
+            sys.path.insert(0, path)
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+@dataclass(frozen=True)
+class BenchResult:
+    name: str
+    n: int
+    throughput_per_s: float
+    mean_us: float
+    p50_us: float
+    p99_us: float
+    p999_us: float
+
+    @classmethod
+    def from_samples(cls, name: str, samples_s: list[float], wall_s: float) -> BenchResult:
+        us = [s * 1e6 for s in samples_s]
+        return cls(
+            name=name,
+            n=len(us),
+            throughput_per_s=len(us) / wall_s if wall_s else 0.0,
+            mean_us=statistics.fmean(us),
+            p50_us=percentile(us, 50),
+            p99_us=percentile(us, 99),
+            p999_us=percentile(us, 99.9),
+        )
+
+    def line(self) -> str:
+        return (
+            f"{self.name:<40} n={self.n:<7} {self.throughput_per_s:>11,.0f}/s "
+            f"p50={self.p50_us:>9.1f}us p99={self.p99_us:>9.1f}us p999={self.p999_us:>9.1f}us"
+        )
+
+
+def measure(name: str, fn: Callable[[], object], n: int, warmup: int = 100) -> BenchResult:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    clock = time.perf_counter
+    wall = clock()
+    for _ in range(n):
+        start = clock()
+        fn()
+        samples.append(clock() - start)
+    return BenchResult.from_samples(name, samples, clock() - wall)
+
+
+async def measure_async(
+    name: str,
+    fn: Callable[[], Awaitable[object]],
+    n: int,
+    *,
+    concurrency: int = 1,
+    warmup: int = 100,
+) -> BenchResult:
+    """Run fn n times from `concurrency` concurrent tasks; latency is per call."""
+    for _ in range(warmup):
+        await fn()
+    samples: list[float] = []
+    remaining = n
+    clock = time.perf_counter
+
+    async def worker() -> None:
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            start = clock()
+            await fn()
+            samples.append(clock() - start)
+
+    wall = clock()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return BenchResult.from_samples(name, samples, clock() - wall)
+
+
+def write_results(path: str | Path, results: Iterable[BenchResult], **meta: object) -> None:
+    payload = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            **meta,
+        },
+        "results": [asdict(r) for r in results],
+    }
+    Path(path).write_text(json.dumps(payload, indent=2) + "\n")
+
+
+def load_results(path: str | Path) -> dict[str, dict]:
+    payload = json.loads(Path(path).read_text())
+    return {r["name"]: r for r in payload["results"]}
+
+
+@dataclass(frozen=True)
+class Regression:
+    name: str
+    metric: str
+    baseline: float
+    current: float
+
+    @property
+    def change(self) -> float:
+        return self.current / self.baseline - 1 if self.baseline else float("inf")
+
+    def line(self) -> str:
+        return (
+            f"REGRESSION {self.name} {self.metric}: "
+            f"{self.baseline:.1f} -> {self.current:.1f} ({self.change:+.0%})"
+        )
+
+
+def compare(
+    baseline: dict[str, dict],
+    current: Iterable[BenchResult],
+    *,
+    tolerance: float = 0.15,
+    metrics: tuple[str, ...] = ("p50_us", "p99_us"),
+) -> list[Regression]:
+    """
+    Flag every benchmark present in both runs whose latency metrics grew by
+    more than tolerance (or whose throughput dropped by more than it).
+    """
+    regressions = []
+    for result in current:
+        base = baseline.get(result.name)
+        if base is None:
+            continue
+        for metric in metrics:
+            if getattr(result, metric) > base[metric] * (1 + tolerance):
+                regressions.append(Regression(result.name, metric, base[metric], getattr(result, metric)))
+        if result.throughput_per_s < base["throughput_per_s"] * (1 - tolerance):
+            regressions.append(
+                Regression(
+                    result.name, "throughput_per_s", base["throughput_per_s"], result.throughput_per_s
+                )
+            )
+    return regressions
@@ -0,0 +1,152 @@
+"""
+Closed-loop HTTP load generator for the assistant_api over a real socket.
+
+By default it starts `uvicorn --factory xagent2.assistant_api.core:create_app`
+in a subprocess (or, with --workers > 1, the multi-worker entry point
+xagent2.assistant_api.workers; uvicorn must be installed) and drives
+it with `--concurrency` keep-alive connections for `--duration` seconds per
+route. Pass --url to target a server that is already running instead.
+
+Run from the workspace root:
+    python development/benchmarks/loadgen.py --concurrency 256 --duration 10
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import importlib.util
+import os
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+
+import httpx
+from harness import ROOT, BenchResult, write_results
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_uvicorn(port: int, workers: int = 1) -> subprocess.Popen:
+    if importlib.util.find_spec("uvicorn") is None:
+        raise SystemExit("uvicorn is not installed; install it or pass --url")
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        [str(ROOT / "components"), str(ROOT / "bases"), env.get("PYTHONPATH", "")]
+    )
+    if workers > 1:
+        # Workers must share users and sessions, so use the multi-worker entry point.
+        cmd = [
+            sys.executable, "-m", "xagent2.assistant_api.workers",
+            "--workers", str(workers), "--host", "127.0.0.1", "--port", str(port),
+        ]  # fmt: skip
+    else:
+        cmd = [
+            sys.executable, "-m", "uvicorn", "--factory", "xagent2.assistant_api.core:create_app",
+            "--host", "127.0.0.1", "--port", str(port),
+            "--log-level", "warning", "--no-access-log",
+        ]  # fmt: skip
+    return subprocess.Popen(cmd, env=env)
+
+
+async def _wait_ready(url: str, timeout: float = 15.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=url) as client:
+        while True:
+            try:
+                await client.get("/docs")
+                return
+            except httpx.TransportError:
+                if time.monotonic() > deadline:
+                    raise
+                await asyncio.sleep(0.1)
+
+
+async def drive(
+    client: httpx.AsyncClient,
+    name: str,
+    send,
+    *,
+    concurrency: int,
+    duration: float,
+) -> tuple[BenchResult, Counter]:
+    samples: list[float] = []
+    statuses: Counter = Counter()
+    clock = time.perf_counter
+    stop_at = clock() + duration
+
+    async def worker() -> None:
+        while clock() < stop_at:
+            start = clock()
+            try:
+                r = await send(client)
+                statuses[r.status_code] += 1
+            except httpx.TransportError as exc:
+                statuses[type(exc).__name__] += 1
+                continue
+            samples.append(clock() - start)
+
+    wall = clock()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return BenchResult.from_samples(name, samples, clock() - wall), statuses
+
+
+async def run(url: str, concurrency: int, duration: float) -> list[BenchResult]:
+    await _wait_ready(url)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30.0) as client:
+        creds = {"email": "load@example.com", "password": "pw"}
+        await client.post("/users", json=creds)
+        login = await client.post("/login", json=creds)
+        headers = {"X-Session-Id": login.json()["session_id"]}
+        routes = {
+            "/me": lambda c: c.get("/me", headers=headers),
+            "/login": lambda c: c.post("/login", json=creds),
+            "/query": lambda c: c.post("/query", json={"text": "hello"}, headers=headers),
+        }
+        results = []
+        for route, send in routes.items():
+            result, statuses = await drive(
+                client,
+                f"http{route}[c={concurrency}]",
+                send,
+                concurrency=concurrency,
+                duration=duration,
+            )
+            print(result.line(), dict(statuses))
+            results.append(result)
+        return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", help="target a running server instead of starting uvicorn")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if url is None:
+        port = _free_port()
+        server = start_uvicorn(port, workers=args.workers)
+        url = f"http://127.0.0.1:{port}"
+    try:
+        results = asyncio.run(run(url, args.concurrency, args.duration))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+    if args.output:
+        write_results(args.output, results, url=url, concurrency=args.concurrency)
+
+
+if __name__ == "__main__":
+    main()
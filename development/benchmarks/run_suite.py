@@ -0,0 +1,51 @@
+"""
+Runs the in-process benchmark suites (identity micro-benchmarks and the
+ASGI route benchmarks), writes the results as JSON, and optionally compares
+them with an earlier run, exiting non-zero when anything regressed.
+
+Run from the workspace root:
+    python development/benchmarks/run_suite.py --output after.json --baseline before.json
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+
+import bench_asgi
+import bench_identity
+from harness import compare, load_results, write_results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=5000, help="calls per benchmark")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--output", help="write JSON results to this file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.15, help="allowed relative slowdown (0.15 = 15%%)"
+    )
+    args = parser.parse_args()
+
+    results = bench_identity.run(args.n)
+    results += bench_asgi.run(args.n, concurrency=args.concurrency)
+    results += bench_asgi.run(
+        args.n, concurrency=args.concurrency, session_cache_size=10_000, query_cache_size=10_000
+    )
+    results += bench_asgi.run(args.n, concurrency=args.concurrency, fast_responses=True)
+    for result in results:
+        print(result.line())
+
+    if args.output:
+        write_results(args.output, results, n=args.n, concurrency=args.concurrency)
+    if args.baseline:
+        regressions = compare(load_results(args.baseline), results, tolerance=args.tolerance)
+        for regression in regressions:
+            print(regression.line())
+        if regressions:
+            sys.exit(1)
+        print(f"no regressions beyond {args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
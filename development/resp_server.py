@@ -0,0 +1,384 @@
+from __future__ import annotations
+
+import socket
+import socketserver
+import threading
+import time
+from typing import Callable
+
+from xagent2.session_redis.core import RespError, read_reply
+
+Value = bytes | set[bytes] | dict[bytes, float]
+
+
+def _encode(reply) -> bytes:
+    if reply is None:
+        return b"$-1\r\n"
+    if isinstance(reply, RespError):
+        return b"-%s\r\n" % str(reply).encode("utf-8")
+    if isinstance(reply, bool):
+        return b":%d\r\n" % int(reply)
+    if isinstance(reply, int):
+        return b":%d\r\n" % reply
+    if isinstance(reply, str):
+        return b"+%s\r\n" % reply.encode("utf-8")
+    if isinstance(reply, (list, tuple)):
+        return b"*%d\r\n" % len(reply) + b"".join(_encode(item) for item in reply)
+    return b"$%d\r\n%s\r\n" % (len(reply), reply)
+
+
+class _Keyspace:
+    """Keys with optional millisecond expiry, expired lazily on access."""
+
+    def __init__(self, clock: Callable[[], float]) -> None:
+        self._clock = clock
+        self._values: dict[bytes, Value] = {}
+        self._expires: dict[bytes, int] = {}  # key -> epoch ms
+        self.lock = threading.Lock()
+
+    def now_ms(self) -> int:
+        return int(self._clock() * 1000)
+
+    def get(self, key: bytes) -> Value | None:
+        expires = self._expires.get(key)
+        if expires is not None and expires <= self.now_ms():
+            self.delete(key)
+            return None
+        return self._values.get(key)
+
+    def set(self, key: bytes, value: Value, expires_ms: int | None) -> None:
+        self._values[key] = value
+        if expires_ms is None:
+            self._expires.pop(key, None)
+        else:
+            self._expires[key] = expires_ms
+
+    def delete(self, key: bytes) -> bool:
+        self._expires.pop(key, None)
+        return self._values.pop(key, None) is not None
+
+    def ttl_ms(self, key: bytes) -> int | None:
+        return self._expires.get(key)
+
+    def clear(self) -> None:
+        self._values.clear()
+        self._expires.clear()
+
+
+class _Wrongtype(Exception):
+    pass
+
+
+_WRONGTYPE = RespError("WRONGTYPE Operation against a key holding the wrong kind of value")
+_SYNTAX = RespError("ERR syntax error")
+
+
+def _score_bound(raw: bytes) -> tuple[float, bool]:
+    """A ZRANGEBYSCORE-style bound: (value, exclusive)."""
+    exclusive = raw.startswith(b"(")
+    return float(raw[1:] if exclusive else raw), exclusive
+
+
+def _score_range(low: bytes, high: bytes) -> Callable[[float], bool]:
+    (lo, lo_open), (hi, hi_open) = _score_bound(low), _score_bound(high)
+    return lambda score: (lo < score if lo_open else lo <= score) and (
+        score < hi if hi_open else score <= hi
+    )
+
+
+class _Commands:
+    """The subset of Redis commands the session store (and its tests) use."""
+
+    def __init__(self, keys: _Keyspace) -> None:
+        self._keys = keys
+
+    def dispatch(self, args: list[bytes]):
+        if not args:
+            return RespError("ERR empty command")
+        handler = getattr(self, "cmd_" + args[0].decode("ascii", "replace").lower(), None)
+        if handler is None:
+            return RespError(f"ERR unknown command '{args[0].decode('utf-8', 'replace')}'")
+        try:
+            with self._keys.lock:
+                return handler(*args[1:])
+        except (TypeError, ValueError):
+            return RespError(f"ERR wrong arguments for '{args[0].decode('utf-8', 'replace')}'")
+
+    def _string(self, key: bytes) -> bytes | None:
+        value = self._keys.get(key)
+        if value is not None and not isinstance(value, bytes):
+            raise _Wrongtype
+        return value
+
+    def _set(self, key: bytes, *, create: bool) -> set[bytes] | None:
+        value = self._keys.get(key)
+        if value is None:
+            if not create:
+                return None
+            value = set()
+            self._keys.set(key, value, None)
+        elif not isinstance(value, set):
+            raise _Wrongtype
+        return value
+
+    def _zset(self, key: bytes, *, create: bool) -> dict[bytes, float] | None:
+        value = self._keys.get(key)
+        if value is None:
+            if not create:
+                return None
+            value = {}
+            self._keys.set(key, value, None)
+        elif not isinstance(value, dict):
+            raise _Wrongtype
+        return value
+
+    def cmd_ping(self, message: bytes | None = None):
+        return "PONG" if message is None else message
+
+    def cmd_select(self, db: bytes):
+        int(db)
+        return "OK"
+
+    def cmd_flushall(self, *_options: bytes):
+        self._keys.clear()
+        return "OK"
+
+    def cmd_get(self, key: bytes):
+        return self._string(key)
+
+    def cmd_mget(self, *keys: bytes):
+        out = []
+        for key in keys:
+            value = self._keys.get(key)
+            out.append(value if isinstance(value, bytes) else None)
+        return out
+
+    def cmd_set(self, key: bytes, value: bytes, *options: bytes):
+        expires_ms = None
+        only_new = False
+        opts = [opt.upper() for opt in options]
+        i = 0
+        while i < len(opts):
+            opt = opts[i]
+            if opt == b"NX":
+                only_new = True
+            elif opt in (b"PX", b"PXAT", b"EX", b"EXAT") and i + 1 < len(opts):
+                amount = int(options[i + 1])
+                i += 1
+                if opt == b"PX":
+                    expires_ms = self._keys.now_ms() + amount
+                elif opt == b"EX":
+                    expires_ms = self._keys.now_ms() + amount * 1000
+                elif opt == b"PXAT":
+                    expires_ms = amount
+                else:
+                    expires_ms = amount * 1000
+            else:
+                return _SYNTAX
+            i += 1
+        if only_new and self._keys.get(key) is not None:
+            return None
+        self._keys.set(key, value, expires_ms)
+        return "OK"
+
+    def cmd_getdel(self, key: bytes):
+        value = self._string(key)
+        if value is not None:
+            self._keys.delete(key)
+        return value
+
+    def cmd_del(self, *keys: bytes):
+        if not keys:
+            raise TypeError
+        deleted = 0
+        for key in keys:
+            if self._keys.get(key) is not None:
+                deleted += self._keys.delete(key)
+        return deleted
+
+    def cmd_exists(self, *keys: bytes):
+        return sum(1 for key in keys if self._keys.get(key) is not None)
+
+    def cmd_sadd(self, key: bytes, *members: bytes):
+        if not members:
+            raise TypeError
+        value = self._set(key, create=True)
+        before = len(value)
+        value.update(members)
+        return len(value) - before
+
+    def cmd_srem(self, key: bytes, *members: bytes):
+        value = self._set(key, create=False)
+        if value is None:
+            return 0
+        removed = sum(1 for member in members if member in value)
+        value.difference_update(members)
+        if not value:
+            self._keys.delete(key)
+        return removed
+
+    def cmd_smembers(self, key: bytes):
+        value = self._set(key, create=False)
+        return sorted(value) if value else []
+
+    def cmd_zadd(self, key: bytes, *pairs: bytes):
+        if not pairs or len(pairs) % 2:
+            raise TypeError
+        scores = [(member, float(score)) for score, member in zip(pairs[::2], pairs[1::2])]
+        value = self._zset(key, create=True)
+        before = len(value)
+        value.update(scores)
+        return len(value) - before
+
+    def cmd_zrem(self, key: bytes, *members: bytes):
+        value = self._zset(key, create=False)
+        if value is None:
+            return 0
+        removed = sum(value.pop(member, None) is not None for member in members)
+        if not value:
+            self._keys.delete(key)
+        return removed
+
+    def cmd_zremrangebyscore(self, key: bytes, low: bytes, high: bytes):
+        value = self._zset(key, create=False)
+        if value is None:
+            return 0
+        in_range = _score_range(low, high)
+        doomed = [member for member, score in value.items() if in_range(score)]
+        for member in doomed:
+            del value[member]
+        if not value:
+            self._keys.delete(key)
+        return len(doomed)
+
+    def cmd_zrange(self, key: bytes, start: bytes, stop: bytes):
+        value = self._zset(key, create=False)
+        if not value:
+            return []
+        ordered = [member for member, _ in sorted(value.items(), key=lambda kv: (kv[1], kv[0]))]
+        first, last = int(start), int(stop)
+        if first < 0:
+            first += len(ordered)
+        if last < 0:
+            last += len(ordered)
+        return ordered[max(first, 0) : last + 1]
+
+    def cmd_zcard(self, key: bytes):
+        value = self._zset(key, create=False)
+        return len(value) if value else 0
+
+    def cmd_pexpireat(self, key: bytes, when: bytes, *options: bytes):
+        if self._keys.get(key) is None:
+            return 0
+        expires_ms = int(when)
+        current = self._keys.ttl_ms(key)
+        for opt in (opt.upper() for opt in options):
+            if opt == b"NX" and current is not None:
+                return 0
+            if opt == b"XX" and current is None:
+                return 0
+            # As in Redis, a key without a TTL counts as expiring never.
+            if opt == b"GT" and (current is None or expires_ms <= current):
+                return 0
+            if opt == b"LT" and current is not None and expires_ms >= current:
+                return 0
+            if opt not in (b"NX", b"XX", b"GT", b"LT"):
+                return _SYNTAX
+        if expires_ms <= self._keys.now_ms():
+            self._keys.delete(key)
+        else:
+            self._keys.set(key, self._keys.get(key), expires_ms)
+        return 1
+
+    def cmd_pttl(self, key: bytes):
+        if self._keys.get(key) is None:
+            return -2
+        expires = self._keys.ttl_ms(key)
+        return -1 if expires is None else max(0, expires - self._keys.now_ms())
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: _TcpServer
+
+    def setup(self) -> None:
+        super().setup()
+        # Pipelined replies go out one write each; don't let Nagle hold them back.
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def handle(self) -> None:
+        commands = self.server.commands
+        while True:
+            try:
+                request = read_reply(self.rfile)
+            except (ConnectionError, OSError, ValueError):
+                return
+            if not isinstance(request, list):
+                return
+            try:
+                reply = commands.dispatch(request)
+            except _Wrongtype:
+                reply = _WRONGTYPE
+            self.wfile.write(_encode(reply))
+
+
+class _TcpServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address: tuple[str, int], commands: _Commands) -> None:
+        self.commands = commands
+        super().__init__(address, _Handler)
+
+
+class RespServer:
+    """
+    Small in-process server speaking enough of the Redis protocol for
+    RedisSessionStore: strings, sets and sorted sets with millisecond
+    expiry (PXAT, PEXPIREAT NX/GT), expired lazily on access. Meant for
+    tests and benchmarks, not production.
+
+        with RespServer() as server:
+            pool = RedisConnectionPool(server.host, server.port)
+
+    clock returns epoch seconds; tests may pass their own to move time.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        *,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self._server = _TcpServer((host, port), _Commands(_Keyspace(clock)))
+        self.host, self.port = self._server.server_address[:2]
+        self._thread: threading.Thread | None = None
+
+    @property
+    def address(self) -> str:
+        return f"{self.host}:{self.port}"
+
+    def start(self) -> RespServer:
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._server.serve_forever,
+                kwargs={"poll_interval": 0.05},
+                name="resp-server",
+                daemon=True,
+            )
+            self._thread.start()
+        return self
+
+    def close(self) -> None:
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+
+    def __enter__(self) -> RespServer:
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from xagent2.assistant_api.adapters import (
+    InMemorySessionStore,
+    InMemoryUserRepo,
+    ProcessPoolPasswordHasher,
+    SimplePasswordHasher,
+    StripedSessionStore,
+)
+from xagent2.identity_api.core import HasherOverloaded, Session, User, UserAlreadyExists
+
+
+class FixedClock:
+    def __init__(self, now: datetime):
+        self._now = now
+
+    def now(self) -> datetime:
+        return self._now
+
+
+NOW = datetime(2026, 2, 8, tzinfo=timezone.utc)
+
+
+def make_session(session_id: str, ttl: timedelta, user_id: str = "u") -> Session:
+    return Session(
+        session_id=session_id,
+        user_id=user_id,
+        created_at=NOW,
+        expires_at=NOW + ttl,
+    )
+
+
+def test_session_store_sweeps_expired_sessions_on_write():
+    clock = FixedClock(NOW)
+    store = InMemorySessionStore(clock=clock)
+    store.create_session(make_session("a", timedelta(seconds=10)))
+    store.create_session(make_session("b", timedelta(hours=1)))
+
+    clock._now = NOW + timedelta(seconds=11)
+    store.create_session(make_session("c", timedelta(hours=1)))
+
+    assert store.get_session("a") is None
+    assert store.get_session("b") is not None
+    assert store.stats().expired_evicted == 1
+    assert len(store) == 2
+
+
+def test_session_store_explicit_sweep_removes_all_expired():
+    clock = FixedClock(NOW)
+    store = InMemorySessionStore(clock=clock, sweep_batch=1)
+    for i in range(5):
+        store.create_session(make_session(f"s{i}", timedelta(seconds=1)))
+
+    clock._now = NOW + timedelta(seconds=2)
+    assert store.sweep_expired() == 5
+    assert len(store) == 0
+
+
+def test_session_store_cap_evicts_soonest_to_expire():
+    store = InMemorySessionStore(clock=FixedClock(NOW), max_sessions=2)
+    store.create_session(make_session("late", timedelta(hours=3)))
+    store.create_session(make_session("soon", timedelta(hours=1)))
+    store.create_session(make_session("mid", timedelta(hours=2)))
+
+    assert store.get_session("soon") is None
+    assert store.get_session("late") is not None
+    assert store.get_session("mid") is not None
+    assert store.stats().capacity_evicted == 1
+
+
+def test_session_store_ignores_stale_heap_entries_after_delete():
+    clock = FixedClock(NOW)
+    store = InMemorySessionStore(clock=clock)
+    store.create_session(make_session("a", timedelta(seconds=1)))
+    store.delete_session("a")
+    store.create_session(make_session("a", timedelta(hours=1)))
+
+    clock._now = NOW + timedelta(seconds=2)
+    assert store.sweep_expired() == 0
+    assert store.get_session("a") is not None
+
+
+def test_session_store_rejects_non_positive_cap():
+    with pytest.raises(ValueError):
+        InMemorySessionStore(max_sessions=0)
+
+
+def test_process_pool_hasher_round_trip_sync_and_async():
+    hasher = ProcessPoolPasswordHasher(SimplePasswordHasher(), max_workers=1)
+    try:
+        pw_hash = hasher.hash_password("pw")
+        assert pw_hash == SimplePasswordHasher().hash_password("pw")
+        assert hasher.verify_password("pw", pw_hash)
+
+        async_hasher = hasher.as_async()
+        assert asyncio.run(async_hasher.verify_password("pw", pw_hash))
+        assert not asyncio.run(async_hasher.verify_password("nope", pw_hash))
+    finally:
+        hasher.shutdown()
+
+
+def test_process_pool_hasher_sheds_load_when_queue_is_full():
+    hasher = ProcessPoolPasswordHasher(SimplePasswordHasher(), max_workers=1, max_pending=1)
+    try:
+        first = hasher.submit_hash("pw")
+        with pytest.raises(HasherOverloaded):
+            hasher.submit_hash("pw")
+        first.result()
+        # The slot is released once the queued job completes.
+        assert hasher.hash_password("pw") == first.result()
+    finally:
+        hasher.shutdown()
+
+
+def test_process_pool_hasher_hash_many_keeps_order():
+    hasher = ProcessPoolPasswordHasher(SimplePasswordHasher(), max_workers=2, max_pending=1)
+    passwords = [f"pw{i}" for i in range(50)]
+    expected = [SimplePasswordHasher().hash_password(p) for p in passwords]
+    try:
+        assert hasher.hash_many(passwords) == expected
+        assert asyncio.run(hasher.as_async().hash_many(passwords)) == expected
+        assert hasher.hash_many([]) == []
+    finally:
+        hasher.shutdown()
+
+
+def test_process_pool_hasher_hash_many_is_shed_when_queue_is_full():
+    hasher = ProcessPoolPasswordHasher(SimplePasswordHasher(), max_workers=1, max_pending=1)
+    try:
+        first = hasher.submit_hash("pw")
+        with pytest.raises(HasherOverloaded):
+            hasher.hash_many(["a", "b"])
+        first.result()
+        assert len(hasher.hash_many(["a", "b"])) == 2
+    finally:
+        hasher.shutdown()
+
+
+def test_session_store_deletes_all_sessions_of_a_user():
+    clock = FixedClock(NOW)
+    store = InMemorySessionStore(clock=clock)
+    for i in range(3):
+        store.create_session(make_session(f"a{i}", timedelta(hours=1), user_id="alice"))
+    store.create_session(make_session("b", timedelta(hours=1), user_id="bob"))
+    store.create_session(make_session("a-short", timedelta(seconds=1), user_id="alice"))
+    clock._now = NOW + timedelta(seconds=2)
+    store.sweep_expired()
+
+    assert store.delete_sessions_for_user("alice") == 3
+    assert store.delete_sessions_for_user("alice") == 0
+    assert [store.get_session(s) for s in ("a0", "a1", "a2")] == [None, None, None]
+    assert store.get_session("b") is not None
+
+
+def test_user_repo_create_many_skips_taken_emails():
+    repo = InMemoryUserRepo()
+    repo.create(User(user_id="u0", email="a@example.com", password_hash="h"))
+    created = repo.create_many(
+        [
+            User(user_id="u1", email="a@example.com", password_hash="h"),
+            User(user_id="u2", email="b@example.com", password_hash="h"),
+            User(user_id="u3", email="b@example.com", password_hash="h"),
+        ]
+    )
+    assert created == [False, True, False]
+    assert repo.get_by_email("b@example.com").user_id == "u2"
+
+
+def test_user_repo_create_if_absent_is_atomic_under_threads():
+    repo = InMemoryUserRepo(stripes=4)
+    barrier = threading.Barrier(8)
+    wins = []
+
+    def signup(i: int) -> None:
+        barrier.wait()
+        for n in range(200):
+            user = User(user_id=f"u{i}-{n}", email=f"user{n}@example.com", password_hash="h")
+            if repo.create_if_absent(user):
+                wins.append(user)
+
+    threads = [threading.Thread(target=signup, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(wins) == 200 == len(repo)
+    for user in wins:
+        assert repo.get_by_email(user.email) is user
+        assert repo.get_by_id(user.user_id) is user
+    with pytest.raises(UserAlreadyExists):
+        repo.create(User(user_id="x", email="user0@example.com", password_hash="h"))
+
+
+def test_striped_session_store_spreads_sessions_and_aggregates():
+    clock = FixedClock(NOW)
+    store = StripedSessionStore(stripes=4, clock=clock)
+    for i in range(20):
+        store.create_session(make_session(f"s{i}", timedelta(seconds=10 if i < 5 else 3600)))
+    assert len(store) == 20
+    assert store.get_session("s7") is not None
+
+    clock._now = NOW + timedelta(seconds=11)
+    assert store.sweep_expired() == 5
+    store.delete_session("s7")
+    assert store.get_session("s7") is None
+    assert store.delete_sessions_for_user("u") == 14
+    assert store.stats().size == 0
+    assert store.stats().expired_evicted == 5
+
+
+def test_striped_session_store_never_exceeds_max_sessions():
+    with pytest.raises(ValueError):
+        StripedSessionStore(stripes=4, max_sessions=3)
+    store = StripedSessionStore(stripes=4, clock=FixedClock(NOW), max_sessions=10)
+    for i in range(200):
+        store.create_session(make_session(f"s{i}", timedelta(hours=1)))
+    assert len(store) == 10
+    assert store.stats().capacity_evicted == 190
+
+
+def test_session_store_round_trips_sessions_and_reuses_slots():
+    store = InMemorySessionStore(clock=FixedClock(NOW))
+    first = Session(
+        session_id="s",
+        user_id="alice",
+        created_at=NOW,
+        expires_at=NOW + timedelta(hours=1, microseconds=7),
+    )
+    store.create_session(first)
+    assert store.get_session("s") == first
+
+    # Re-creating an ID replaces the session, including its owner.
+    moved = make_session("s", timedelta(hours=2), user_id="bob")
+    store.create_session(moved)
+    assert store.get_session("s") == moved
+    assert store.delete_sessions_for_user("alice") == 0
+    for i in range(5):
+        store.create_session(make_session(f"b{i}", timedelta(hours=1), user_id="bob"))
+    store.delete_session("b2")
+    store.create_session(make_session("c", timedelta(hours=1), user_id="carol"))
+    assert store.delete_sessions_for_user("bob") == 5
+    assert len(store) == 1
+    assert store.get_session("c").user_id == "carol"
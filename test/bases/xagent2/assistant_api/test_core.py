@@ -1,8 +1,17 @@
 from __future__ import annotations
 
+import asyncio
+import json
+import sys
+
+import pytest
 from fastapi.testclient import TestClient
+from resp_server import RespServer
 
 from xagent2.assistant_api.core import create_app
+from xagent2.assistant_api.wiring import build_container
+from xagent2.identity_api.core import HasherOverloaded
+from xagent2.rate_limit.core import RateLimit
 
 
 def test_happy_path_create_login_me_logout():
@@ -51,3 +60,376 @@ def test_query_requires_session_and_returns_answer():
     assert r.status_code == 200
     body = r.json()
     assert body["answer"].startswith("Echo:")
+
+
+def test_login_through_process_pool_hasher():
+    container = build_container(hasher_workers=1)
+    with TestClient(create_app(container)) as client:
+        r = client.post("/users", json={"email": "a@example.com", "password": "pw"})
+        assert r.status_code == 201
+        r = client.post("/login", json={"email": "a@example.com", "password": "pw"})
+        assert r.status_code == 200
+        r = client.post("/login", json={"email": "a@example.com", "password": "nope"})
+        assert r.status_code == 401
+
+
+def test_sqlite_backed_sessions_survive_app_restart(tmp_path):
+    db = str(tmp_path / "identity.db")
+    with TestClient(create_app(build_container(sqlite_path=db))) as client:
+        client.post("/users", json={"email": "a@example.com", "password": "pw"})
+        session_id = client.post(
+            "/login", json={"email": "a@example.com", "password": "pw"}
+        ).json()["session_id"]
+
+    with TestClient(create_app(build_container(sqlite_path=db))) as client:
+        r = client.get("/me", headers={"X-Session-Id": session_id})
+        assert r.status_code == 200
+
+
+def test_logout_invalidates_cached_session(tmp_path):
+    container = build_container(sqlite_path=str(tmp_path / "identity.db"), session_cache_size=100)
+    with TestClient(create_app(container)) as client:
+        client.post("/users", json={"email": "a@example.com", "password": "pw"})
+        session_id = client.post(
+            "/login", json={"email": "a@example.com", "password": "pw"}
+        ).json()["session_id"]
+        headers = {"X-Session-Id": session_id}
+
+        assert client.get("/me", headers=headers).status_code == 200
+        assert client.post("/logout", headers=headers).status_code == 204
+        assert client.get("/me", headers=headers).status_code == 401
+
+
+def test_session_cache_hits_skip_the_thread_bridge(tmp_path, monkeypatch):
+    container = build_container(sqlite_path=str(tmp_path / "identity.db"), session_cache_size=100)
+    with TestClient(create_app(container)) as client:
+        client.post("/users", json={"email": "a@example.com", "password": "pw"})
+        session_id = client.post(
+            "/login", json={"email": "a@example.com", "password": "pw"}
+        ).json()["session_id"]
+        headers = {"X-Session-Id": session_id}
+
+        hops = []
+        real = asyncio.to_thread
+
+        def counting(func, *args, **kwargs):
+            hops.append(func)
+            return real(func, *args, **kwargs)
+
+        monkeypatch.setattr(asyncio, "to_thread", counting)
+        for _ in range(3):
+            assert client.get("/me", headers=headers).status_code == 200
+        assert hops == []
+
+
+def test_session_max_entries_evicts_oldest_session():
+    client = TestClient(create_app(build_container(session_max_entries=1)))
+    client.post("/users", json={"email": "a@example.com", "password": "pw"})
+    creds = {"email": "a@example.com", "password": "pw"}
+    first = client.post("/login", json=creds).json()["session_id"]
+    second = client.post("/login", json=creds).json()["session_id"]
+    assert client.get("/me", headers={"X-Session-Id": first}).status_code == 401
+    assert client.get("/me", headers={"X-Session-Id": second}).status_code == 200
+
+
+def test_query_stream_sends_sse_chunks():
+    client = TestClient(create_app())
+    client.post("/users", json={"email": "a@example.com", "password": "pw"})
+    login = client.post("/login", json={"email": "a@example.com", "password": "pw"})
+    headers = {"X-Session-Id": login.json()["session_id"]}
+
+    r = client.post("/query/stream", json={"text": "hello world"}, headers=headers)
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/event-stream")
+
+    events = [block.split("\n") for block in r.text.strip().split("\n\n")]
+    names = [lines[0].removeprefix("event: ") for lines in events]
+    assert names[-1] == "done"
+    assert set(names[:-1]) == {"chunk"}
+    text = "".join(json.loads(lines[1].removeprefix("data: "))["text"] for lines in events[:-1])
+    assert text == "Echo: hello world"
+
+    r = client.post("/query/stream", json={"text": "hello"})
+    assert r.status_code == 401
+
+
+def test_query_stream_matches_configured_answerer(tmp_path):
+    corpus = tmp_path / "corpus.jsonl"
+    corpus.write_text(
+        json.dumps({"id": "refunds", "text": "Refunds take five days."}) + "\n"
+        + json.dumps({"id": "hours", "text": "Support is open nine to five."}) + "\n"
+    )
+    container = build_container(retrieval_corpus_path=str(corpus), query_cache_size=4)
+    client = TestClient(create_app(container))
+    client.post("/users", json={"email": "a@example.com", "password": "pw"})
+    login = client.post("/login", json={"email": "a@example.com", "password": "pw"})
+    headers = {"X-Session-Id": login.json()["session_id"]}
+
+    answer = client.post("/query", json={"text": "refunds"}, headers=headers).json()["answer"]
+    r = client.post("/query/stream", json={"text": "refunds"}, headers=headers)
+    chunks = [
+        json.loads(block.split("\n")[1].removeprefix("data: "))["text"]
+        for block in r.text.strip().split("\n\n")
+        if block.startswith("event: chunk")
+    ]
+    assert "".join(chunks) == answer
+    assert "Refunds" in answer
+
+
+def test_query_through_cache_and_micro_batcher():
+    container = build_container(query_cache_size=10, query_batch_size=4, query_batch_wait_ms=1)
+    with TestClient(create_app(container)) as client:
+        client.post("/users", json={"email": "a@example.com", "password": "pw"})
+        login = client.post("/login", json={"email": "a@example.com", "password": "pw"})
+        headers = {"X-Session-Id": login.json()["session_id"]}
+        for _ in range(2):
+            r = client.post("/query", json={"text": "hello"}, headers=headers)
+            assert r.json()["answer"] == "Echo: hello"
+    assert container.answer_query.stats().hits == 1
+
+
+def test_query_records_conversation_history_per_user():
+    container = build_container(conversation_turns=2)
+    client = TestClient(create_app(container))
+    headers = {}
+    for email in ("a@example.com", "b@example.com"):
+        client.post("/users", json={"email": email, "password": "pw"})
+        login = client.post("/login", json={"email": email, "password": "pw"})
+        headers[email] = ({"X-Session-Id": login.json()["session_id"]}, login.json()["user_id"])
+
+    a_headers, a_id = headers["a@example.com"]
+    for text in ("one", "two", "three"):
+        assert client.post("/query", json={"text": text}, headers=a_headers).status_code == 200
+    client.post("/query", json={"text": "hi"}, headers=headers["b@example.com"][0])
+    r = client.post("/query/stream", json={"text": "four"}, headers=a_headers)
+    assert "event: done" in r.text
+
+    history = container.answer_query.history
+    assert [t.query for t in history.window(a_id).turns] == ["three", "four"]
+    assert [t.answer for t in history.window(headers["b@example.com"][1]).turns] == ["Echo: hi"]
+    assert 'conversation_history_stats{stat="users"} 2' in client.get("/metrics").text
+
+
+def test_conversation_history_refuses_text_keyed_caches():
+    with pytest.raises(ValueError, match="answer cache"):
+        build_container(conversation_turns=2, query_cache_size=8)
+    with pytest.raises(ValueError, match="answer cache"):
+        build_container(conversation_turns=2, semantic_cache_size=8)
+
+
+def test_metrics_endpoint_exports_route_and_port_latency():
+    client = TestClient(create_app())
+    client.post("/users", json={"email": "a@example.com", "password": "pw"})
+    login = client.post("/login", json={"email": "a@example.com", "password": "pw"})
+    headers = {"X-Session-Id": login.json()["session_id"]}
+    client.post("/query", json={"text": "hello"}, headers=headers)
+
+    r = client.get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain")
+    text = r.text
+    assert 'http_request_duration_seconds_count{method="POST",route="/query",status="200"} 1' in text
+    assert 'port_call_duration_seconds_count{port="sessions",method="get_session"} 1' in text
+    assert 'port_call_duration_seconds_count{port="hasher",method="verify_password"} 1' in text
+    assert 'port_call_duration_seconds_count{port="query",method="call"} 1' in text
+    assert 'session_store_stats{stat="size"} 1' in text
+
+
+def test_metrics_export_each_answer_layer_under_its_own_name():
+    pytest.importorskip("numpy")
+    container = build_container(query_batch_size=4, semantic_cache_size=8, query_cache_size=8)
+    client = TestClient(create_app(container))
+    client.post("/users", json={"email": "a@example.com", "password": "pw"})
+    login = client.post("/login", json={"email": "a@example.com", "password": "pw"})
+    headers = {"X-Session-Id": login.json()["session_id"]}
+    for _ in range(2):
+        client.post("/query", json={"text": "hello"}, headers=headers)
+
+    text = client.get("/metrics").text
+    assert 'query_batcher_stats{stat="batches"} 1' in text
+    assert 'semantic_cache_stats{stat="hit_rate"}' in text
+    assert 'answer_cache_stats{stat="hits"} 1' in text
+    assert 'answer_cache_stats{stat="batches"}' not in text
+
+    only_batching = TestClient(create_app(build_container(query_batch_size=4)))
+    assert "answer_cache_stats" not in only_batching.get("/metrics").text
+
+
+def test_metrics_can_be_disabled():
+    client = TestClient(create_app(build_container(instrument=False)))
+    assert client.get("/metrics").status_code == 404
+
+
+def test_login_rate_limited_per_email_before_hashing():
+    container = build_container(email_rate_limit=RateLimit(rate=0.01, burst=2))
+    client = TestClient(create_app(container))
+    client.post("/users", json={"email": "a@example.com", "password": "pw"})
+    for _ in range(2):
+        r = client.post("/login", json={"email": "A@example.com", "password": "bad"})
+        assert r.status_code == 401
+    r = client.post("/login", json={"email": "a@example.com", "password": "pw"})
+    assert r.status_code == 429
+    assert int(r.headers["Retry-After"]) >= 1
+    text = client.get("/metrics").text
+    assert 'port_call_duration_seconds_count{port="hasher",method="verify_password"} 2' in text
+    assert 'email_rate_limiter_stats{stat="rejected"} 1' in text
+    # Other accounts are unaffected.
+    r = client.post("/login", json={"email": "b@example.com", "password": "pw"})
+    assert r.status_code == 401
+
+
+def test_login_email_buckets_follow_account_normalization():
+    client = TestClient(create_app(build_container(email_rate_limit=RateLimit(rate=0.01, burst=1))))
+    # Two accounts under identity normalization (lower()), though casefold()
+    # would map both to the same key.
+    for email in ("straße@example.com", "strasse@example.com"):
+        assert client.post("/users", json={"email": email, "password": "pw"}).status_code == 201
+    assert client.post("/login", json={"email": " Straße@example.com", "password": "x"}).status_code == 401
+    r = client.post("/login", json={"email": "strasse@example.com", "password": "pw"})
+    assert r.status_code == 200
+    r = client.post("/login", json={"email": "STRAßE@example.com", "password": "pw"})
+    assert r.status_code == 429
+
+
+def test_users_and_login_rate_limited_per_client_ip():
+    client = TestClient(create_app(build_container(ip_rate_limit=RateLimit(rate=0.01, burst=2))))
+    assert client.post("/users", json={"email": "a@example.com", "password": "pw"}).status_code == 201
+    assert client.post("/login", json={"email": "a@example.com", "password": "pw"}).status_code == 200
+    assert client.post("/users", json={"email": "b@example.com", "password": "pw"}).status_code == 429
+    assert client.post("/login", json={"email": "a@example.com", "password": "pw"}).status_code == 429
+
+
+def test_rate_limit_sees_forwarded_client_ip_behind_trusted_proxy():
+    proxy_headers = pytest.importorskip("uvicorn.middleware.proxy_headers")
+    app = create_app(build_container(ip_rate_limit=RateLimit(rate=0.01, burst=1)))
+    client = TestClient(proxy_headers.ProxyHeadersMiddleware(app, trusted_hosts="testclient"))
+
+    def signup(email: str, client_ip: str) -> int:
+        body = {"email": email, "password": "pw"}
+        return client.post("/users", json=body, headers={"X-Forwarded-For": client_ip}).status_code
+
+    assert signup("a@example.com", "203.0.113.1") == 201
+    assert signup("b@example.com", "203.0.113.2") == 201
+    assert signup("c@example.com", "203.0.113.1") == 429
+
+
+def test_signed_session_mode_skips_session_store():
+    client = TestClient(create_app(build_container(session_mode="signed")))
+    client.post("/users", json={"email": "a@example.com", "password": "pw"})
+    login = client.post("/login", json={"email": "a@example.com", "password": "pw"})
+    headers = {"X-Session-Id": login.json()["session_id"]}
+    assert client.get("/me", headers=headers).json() == {"user_id": login.json()["user_id"]}
+    assert client.post("/logout", headers=headers).status_code == 204
+    assert client.get("/me", headers=headers).status_code == 401
+    assert 'port="sessions",method="get_session"' not in client.get("/metrics").text
+
+
+def _signed_in(client: TestClient) -> dict:
+    client.post("/users", json={"email": "admin@example.com", "password": "pw"})
+    login = client.post("/login", json={"email": "admin@example.com", "password": "pw"})
+    return {"X-Session-Id": login.json()["session_id"]}
+
+
+def test_bulk_user_import_streams_per_row_results():
+    client = TestClient(create_app())
+    headers = _signed_in(client)
+    client.post("/users", json={"email": "taken@example.com", "password": "pw"})
+    body = "\n".join(
+        [
+            json.dumps({"email": "a@example.com", "password": "pw"}),
+            json.dumps({"email": "taken@example.com", "password": "pw"}),
+            "",
+            "{not json",
+            json.dumps({"email": "A@example.com", "password": "pw"}),
+            json.dumps({"email": "b@example.com", "password": ""}),
+        ]
+    )
+    assert client.post("/users:bulk", content=body).status_code == 401
+    r = client.post("/users:bulk", content=body, headers=headers)
+    assert r.status_code == 200
+    assert r.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in r.text.splitlines()]
+    assert [(row["line"], row["status"]) for row in rows] == [
+        (1, "created"),
+        (2, "exists"),
+        (4, "invalid"),
+        (5, "exists"),
+        (6, "invalid"),
+    ]
+    login = client.post("/login", json={"email": "a@example.com", "password": "pw"})
+    assert login.json()["user_id"] == rows[0]["user_id"]
+
+
+def test_bulk_user_import_is_bounded_and_charged_per_row(monkeypatch):
+    container = build_container(ip_rate_limit=RateLimit(rate=0.01, burst=6))
+    client = TestClient(create_app(container))
+    headers = _signed_in(client)  # 2 tokens: /users and /login
+
+    def rows(n: int) -> str:
+        return "\n".join(
+            json.dumps({"email": f"u{i}@example.com", "password": "pw"}) for i in range(n)
+        )
+
+    assert client.post("/users:bulk", content=rows(7), headers=headers).status_code == 413
+    r = client.post("/users:bulk", content=rows(5), headers=headers)
+    assert r.status_code == 429  # 4 tokens left, 5 rows
+    assert client.get("/me", headers=headers).status_code == 200
+    assert client.post("/login", json={"email": "u0@example.com", "password": "pw"}).status_code == 401
+
+    monkeypatch.setattr("xagent2.assistant_api.core._BULK_MAX_BYTES", 64)
+    assert client.post("/users:bulk", content=rows(3), headers=headers).status_code == 413
+
+
+def test_bulk_user_import_reports_overloaded_rows():
+    container = build_container()
+    client = TestClient(create_app(container))
+    headers = _signed_in(client)
+
+    async def saturated(cmds):
+        raise HasherOverloaded("password hashing queue is full")
+
+    object.__setattr__(container.identity, "create_users", saturated)
+    body = "{bad\n" + json.dumps({"email": "a@example.com", "password": "pw"})
+    r = client.post("/users:bulk", content=body, headers=headers)
+    rows = [json.loads(line) for line in r.text.splitlines()]
+    assert [(row["line"], row["status"]) for row in rows] == [(1, "invalid"), (2, "overloaded")]
+
+
+def test_logout_all_revokes_every_session_of_the_user():
+    client = TestClient(create_app(build_container(session_cache_size=100)))
+    client.post("/users", json={"email": "a@example.com", "password": "pw"})
+    tokens = [
+        client.post("/login", json={"email": "a@example.com", "password": "pw"}).json()[
+            "session_id"
+        ]
+        for _ in range(3)
+    ]
+    for token in tokens:
+        assert client.get("/me", headers={"X-Session-Id": token}).status_code == 200
+    r = client.post("/logout/all", headers={"X-Session-Id": tokens[0]})
+    assert r.json() == {"revoked": 3}
+    for token in tokens:
+        assert client.get("/me", headers={"X-Session-Id": token}).status_code == 401
+
+
+def test_replicas_share_sessions_through_redis_protocol_server(tmp_path):
+    db = str(tmp_path / "users.db")
+    with RespServer() as server:
+        first = build_container(sqlite_path=db, redis_address=server.address)
+        second = build_container(sqlite_path=db, redis_address=server.address)
+        with TestClient(create_app(first)) as a, TestClient(create_app(second)) as b:
+            a.post("/users", json={"email": "a@example.com", "password": "pw"})
+            login = b.post("/login", json={"email": "a@example.com", "password": "pw"})
+            headers = {"X-Session-Id": login.json()["session_id"]}
+            assert a.get("/me", headers=headers).json() == {"user_id": login.json()["user_id"]}
+            assert a.post("/logout", headers=headers).status_code == 204
+            assert b.get("/me", headers=headers).status_code == 401
+        first.close()
+        second.close()
+
+
+def test_semantic_cache_without_numpy_fails_clearly(monkeypatch):
+    monkeypatch.setitem(sys.modules, "numpy", None)
+    monkeypatch.delitem(sys.modules, "xagent2.query_service.semantic_cache", raising=False)
+    with pytest.raises(RuntimeError, match="'numpy' extra"):
+        build_container(semantic_cache_size=4)
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+
+from xagent2.assistant_api.core import (
+    LoginResponse,
+    QueryResponse,
+    _encode_answer,
+    _encode_login,
+    create_app,
+)
+from xagent2.assistant_api.encoders import compile_encoder
+from xagent2.assistant_api.wiring import build_container
+from xagent2.identity_api.core import AuthResult
+from xagent2.query_service.core import Answer
+
+AWKWARD = ['plain', 'quote " and \\ backslash', "tab\tnewline\n\x01", "ünïcødé ✓ 😀", "</script>", ""]
+
+
+@pytest.mark.parametrize("text", AWKWARD)
+def test_encoders_match_json_response_bytes(text):
+    at = datetime(2026, 1, 2, 3, 4, 5, 6789, tzinfo=timezone(timedelta(hours=2)))
+    result = AuthResult(user_id=text, session_id=text[::-1], expires_at=at)
+    expected = LoginResponse(
+        user_id=result.user_id, session_id=result.session_id, expires_at=at.isoformat()
+    )
+    assert _encode_login(result) == JSONResponse(expected.model_dump()).body
+
+    answer = Answer(text=text, created_at=at.replace(microsecond=0))
+    expected = QueryResponse(answer=text, created_at=answer.created_at.isoformat())
+    assert _encode_answer(answer) == JSONResponse(expected.model_dump()).body
+
+
+def test_compile_encoder_checks_fields():
+    class Pair(BaseModel):
+        a: str
+        n: int
+
+    with pytest.raises(TypeError, match="exactly"):
+        compile_encoder(LoginResponse, user_id=str)
+    with pytest.raises(TypeError, match="only str"):
+        compile_encoder(Pair, a=str, n=str)
+
+
+def _session(client: TestClient) -> tuple[dict, dict]:
+    client.post("/users", json={"email": "a@example.com", "password": "pw"})
+    login = client.post("/login", json={"email": "a@example.com", "password": "pw"})
+    return login, {"X-Session-Id": login.json()["session_id"]}
+
+
+def test_fast_responses_keep_json_and_schema():
+    fast = TestClient(create_app(build_container(), fast_responses=True))
+    slow = TestClient(create_app(build_container()))
+    assert fast.get("/openapi.json").json() == slow.get("/openapi.json").json()
+
+    login, headers = _session(fast)
+    assert login.status_code == 200
+    assert login.headers["content-type"] == "application/json"
+    assert login.content == JSONResponse(LoginResponse(**login.json()).model_dump()).body
+
+    me = fast.get("/me", headers=headers)
+    assert me.content == JSONResponse({"user_id": login.json()["user_id"]}).body
+
+    r = fast.post("/query", json={"text": "hello"}, headers=headers)
+    assert r.status_code == 200
+    assert r.content == JSONResponse(QueryResponse(**r.json()).model_dump()).body
+    assert r.json()["answer"] == slow.post(
+        "/query", json={"text": "hello"}, headers=_session(slow)[1]
+    ).json()["answer"]
+
+    assert fast.get("/me", headers={"X-Session-Id": "nope"}).status_code == 401
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import asyncio
+import importlib
+import sys
+import threading
+
+from fastapi.testclient import TestClient
+
+from xagent2.assistant_api.core import create_app
+from xagent2.assistant_api.startup import (
+    LazyContainer,
+    StartupProfiler,
+    profile_imports,
+    warm_answers,
+)
+from xagent2.assistant_api.wiring import build_container
+
+
+def test_profile_imports_times_each_new_module(tmp_path, monkeypatch):
+    (tmp_path / "slow_outer.py").write_text("import time, slow_inner\ntime.sleep(0.02)\n")
+    (tmp_path / "slow_inner.py").write_text("import time\ntime.sleep(0.03)\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    profiler = StartupProfiler()
+    with profile_imports(profiler):
+        importlib.import_module("slow_outer")
+    monkeypatch.delitem(sys.modules, "slow_outer")
+    monkeypatch.delitem(sys.modules, "slow_inner")
+
+    timings = {t.name: t for t in profiler.imports}
+    assert timings["slow_outer"].seconds >= 0.05
+    assert 0.02 <= timings["slow_outer"].self_seconds < timings["slow_outer"].seconds
+    assert timings["slow_inner"].self_seconds >= 0.03
+    assert "slow_outer" in profiler.report()
+
+
+def test_build_container_records_adapter_laps():
+    profiler = StartupProfiler()
+    build_container(profiler=profiler, query_cache_size=4).close()
+    names = [t.name for t in profiler.phases]
+    assert names[:2] == ["container.identity_stores", "container.identity_service"]
+    assert names[-1] == "container.query_and_limits"
+
+
+def test_lazy_container_is_built_on_first_request():
+    built = []
+
+    def factory(**options):
+        built.append(options)
+        return build_container(**options)
+
+    container = LazyContainer(factory, query_cache_size=4)
+    client = TestClient(create_app(container))
+    assert not container.built
+    assert client.get("/ready").status_code == 503  # no lifespan, nothing warmed
+
+    r = client.post("/users", json={"email": "a@example.com", "password": "pw"})
+    assert r.status_code == 201
+    assert container.built and len(built) == 1
+    assert built[0]["metrics"] is container.metrics
+    container.close()
+
+
+def test_ready_after_background_build_and_warmups():
+    release = threading.Event()
+    order = []
+
+    async def first(container):
+        order.append("first")
+        await asyncio.to_thread(release.wait, 5)
+
+    def second(container):
+        order.append("second")
+
+    profiler = StartupProfiler()
+    container = LazyContainer(profiler=profiler, query_cache_size=4)
+    app = create_app(
+        container, warmups=[first, second, warm_answers(["hello"])], profiler=profiler
+    )
+    with TestClient(app) as client:
+        r = client.get("/ready")
+        assert r.status_code == 503 and r.json()["ready"] is False
+        release.set()
+        for _ in range(200):
+            r = client.get("/ready")
+            if r.status_code == 200:
+                break
+            threading.Event().wait(0.01)
+        assert r.status_code == 200
+        assert order == ["first", "second"]
+        phases = r.json()["startup"]["phases"]
+        assert "container" in phases
+        assert any(name.endswith("warm_answers") for name in phases)
+        stats = container.get().answer_query.stats()
+        assert stats.misses == 1  # the warmup query is already cached
+
+
+def test_failing_warmup_keeps_app_unready():
+    def broken(container):
+        raise RuntimeError("index missing")
+
+    with TestClient(create_app(build_container(), warmups=[broken])) as client:
+        for _ in range(200):
+            r = client.get("/ready")
+            if "error" in r.json():
+                break
+            threading.Event().wait(0.01)
+        assert r.status_code == 503
+        assert r.json()["error"] == "RuntimeError: index missing"
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import pytest
+from fastapi.testclient import TestClient
+
+from xagent2.assistant_api import workers
+from xagent2.assistant_api.shared_state import new_authkey, start_shared_state
+
+
+@pytest.fixture
+def shared_state(tmp_path, monkeypatch):
+    authkey = new_authkey()
+    state = start_shared_state(authkey=authkey, address=str(tmp_path / "state.sock"))
+    monkeypatch.setenv(workers.ADDRESS_ENV, state.address)
+    monkeypatch.setenv(workers.AUTHKEY_ENV, authkey.hex())
+    yield state
+    state.shutdown()
+
+
+def test_workers_share_users_and_sessions(shared_state):
+    first = TestClient(workers.create_worker_app())
+    second = TestClient(workers.create_worker_app())
+
+    assert first.post("/users", json={"email": "a@example.com", "password": "pw"}).status_code == 201
+    r = second.post("/users", json={"email": "a@example.com", "password": "pw"})
+    assert r.status_code == 409
+
+    login = second.post("/login", json={"email": "a@example.com", "password": "pw"})
+    headers = {"X-Session-Id": login.json()["session_id"]}
+    assert first.get("/me", headers=headers).json() == {"user_id": login.json()["user_id"]}
+    assert first.post("/logout", headers=headers).status_code == 204
+    assert second.get("/me", headers=headers).status_code == 401
+
+
+def test_workers_share_signed_token_secret(shared_state, monkeypatch):
+    monkeypatch.setenv(workers.SESSION_MODE_ENV, "signed")
+    monkeypatch.setenv(workers.TOKEN_SECRET_ENV, "ab" * 32)
+    first = TestClient(workers.create_worker_app())
+    second = TestClient(workers.create_worker_app())
+    first.post("/users", json={"email": "a@example.com", "password": "pw"})
+    login = second.post("/login", json={"email": "a@example.com", "password": "pw"})
+    headers = {"X-Session-Id": login.json()["session_id"]}
+    assert first.get("/me", headers=headers).status_code == 200
+
+
+def test_signed_logout_reaches_other_workers(shared_state, monkeypatch):
+    monkeypatch.setenv(workers.SESSION_MODE_ENV, "signed")
+    monkeypatch.setenv(workers.TOKEN_SECRET_ENV, "ab" * 32)
+    first = TestClient(workers.create_worker_app())
+    second = TestClient(workers.create_worker_app())
+    first.post("/users", json={"email": "a@example.com", "password": "pw"})
+    tokens = [
+        first.post("/login", json={"email": "a@example.com", "password": "pw"}).json()["session_id"]
+        for _ in range(3)
+    ]
+    headers = [{"X-Session-Id": token} for token in tokens]
+    assert all(second.get("/me", headers=h).status_code == 200 for h in headers)
+
+    assert first.post("/logout", headers=headers[0]).status_code == 204
+    assert second.get("/me", headers=headers[0]).status_code == 401
+    assert second.get("/me", headers=headers[1]).status_code == 200
+
+    assert second.post("/logout/all", headers=headers[1]).status_code == 200
+    assert first.get("/me", headers=headers[2]).status_code == 401
+    assert second.get("/me", headers=headers[2]).status_code == 401
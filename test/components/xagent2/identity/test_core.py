@@ -1,11 +1,20 @@
 from __future__ import annotations
 
+import asyncio
 from datetime import datetime, timedelta, timezone
 
 import pytest
 
-from xagent2.identity.core import IdentityConfig, IdentityService
-from xagent2.identity_api.core import CreateUserCmd, InvalidCredentials, LoginCmd, SessionNotFound
+from xagent2.identity.core import AsyncIdentityService, IdentityConfig, IdentityService
+from xagent2.identity_api.core import (
+    CreateUserCmd,
+    InvalidCredentials,
+    LoginCmd,
+    LogoutCmd,
+    SessionNotFound,
+    User,
+    UserAlreadyExists,
+)
 
 
 class FixedClock:
@@ -33,6 +42,19 @@ class FakeHasher:
         return password_hash == f"h:{password}"
 
 
+class AsyncFakeHasher:
+    def __init__(self):
+        self.calls = 0
+
+    async def hash_password(self, password: str) -> str:
+        self.calls += 1
+        return f"h:{password}"
+
+    async def verify_password(self, password: str, password_hash: str) -> bool:
+        self.calls += 1
+        return password_hash == f"h:{password}"
+
+
 class MemUsers:
     def __init__(self):
         self.by_email = {}
@@ -48,6 +70,15 @@ class MemUsers:
         self.by_email[user.email] = user
         self.by_id[user.user_id] = user
 
+    def create_if_absent(self, user):
+        if user.email in self.by_email:
+            return False
+        self.create(user)
+        return True
+
+    def create_many(self, users):
+        return [self.create_if_absent(user) for user in users]
+
 
 class MemSessions:
     def __init__(self):
@@ -62,6 +93,12 @@ class MemSessions:
     def delete_session(self, session_id: str):
         self.sessions.pop(session_id, None)
 
+    def delete_sessions_for_user(self, user_id: str) -> int:
+        doomed = [s for s, sess in self.sessions.items() if sess.user_id == user_id]
+        for session_id in doomed:
+            del self.sessions[session_id]
+        return len(doomed)
+
 
 def build_identity(now: datetime, ttl: timedelta = timedelta(hours=1)) -> IdentityService:
     return IdentityService(
@@ -105,3 +142,226 @@ def test_session_expires_and_is_removed():
 
     with pytest.raises(SessionNotFound):
         identity.authenticate_session(auth.session_id)
+
+
+class AsyncMem:
+    """Exposes a sync in-memory fake through the async ports."""
+
+    def __init__(self, inner):
+        self._inner = inner
+
+    def __getattr__(self, name):
+        method = getattr(self._inner, name)
+
+        async def call(*args):
+            return method(*args)
+
+        return call
+
+
+def build_async_identity(now: datetime, ttl: timedelta = timedelta(hours=1)):
+    return AsyncIdentityService(
+        config=IdentityConfig(session_ttl=ttl),
+        users=AsyncMem(MemUsers()),
+        sessions=AsyncMem(MemSessions()),
+        hasher=AsyncFakeHasher(),
+        ids=FixedIds(),
+        clock=FixedClock(now),
+    )
+
+
+def test_async_identity_create_login_logout():
+    now = datetime(2026, 2, 8, tzinfo=timezone.utc)
+    identity = build_async_identity(now)
+
+    async def scenario():
+        u = await identity.create_user(CreateUserCmd(email="A@Example.com", password="pw"))
+        with pytest.raises(UserAlreadyExists):
+            await identity.create_user(CreateUserCmd(email="a@example.com", password="pw"))
+        with pytest.raises(InvalidCredentials):
+            await identity.login(LoginCmd(email="a@example.com", password="nope"))
+        auth = await identity.login(LoginCmd(email="a@example.com", password="pw"))
+        assert auth.user_id == u.user_id
+        assert await identity.authenticate_session(auth.session_id) == u.user_id
+        await identity.logout(LogoutCmd(session_id=auth.session_id))
+        with pytest.raises(SessionNotFound):
+            await identity.authenticate_session(auth.session_id)
+
+    asyncio.run(scenario())
+    assert identity._hasher.calls == 3  # type: ignore[attr-defined]
+
+
+def test_async_identity_session_expires():
+    now = datetime(2026, 2, 8, tzinfo=timezone.utc)
+    identity = build_async_identity(now, ttl=timedelta(seconds=10))
+
+    async def scenario():
+        await identity.create_user(CreateUserCmd(email="a@example.com", password="pw"))
+        auth = await identity.login(LoginCmd(email="a@example.com", password="pw"))
+        identity._clock._now = now + timedelta(seconds=11)  # type: ignore[attr-defined]
+        with pytest.raises(SessionNotFound):
+            await identity.authenticate_session(auth.session_id)
+
+    asyncio.run(scenario())
+
+
+SIGNED = dict(session_mode="signed", token_secret=b"s" * 32)
+
+
+def test_signed_sessions_authenticate_without_store():
+    now = datetime(2026, 2, 8, tzinfo=timezone.utc)
+    identity = IdentityService(
+        config=IdentityConfig(session_ttl=timedelta(seconds=10), **SIGNED),
+        users=MemUsers(),
+        sessions=MemSessions(),
+        hasher=FakeHasher(),
+        ids=FixedIds(),
+        clock=FixedClock(now),
+    )
+    u = identity.create_user(CreateUserCmd(email="a@example.com", password="pw"))
+    auth = identity.login(LoginCmd(email="a@example.com", password="pw"))
+    assert identity._sessions.sessions == {}  # type: ignore[attr-defined]
+    assert auth.expires_at == now + timedelta(seconds=10)
+    assert identity.authenticate_session(auth.session_id) == u.user_id
+    tail = "BB" if auth.session_id.endswith("AA") else "AA"
+    with pytest.raises(SessionNotFound):
+        identity.authenticate_session(auth.session_id[:-2] + tail)
+
+    identity.logout(LogoutCmd(session_id=auth.session_id))
+    with pytest.raises(SessionNotFound):
+        identity.authenticate_session(auth.session_id)
+    with pytest.raises(SessionNotFound):
+        identity.logout(LogoutCmd(session_id=auth.session_id))
+
+    other = identity.login(LoginCmd(email="a@example.com", password="pw"))
+    identity._clock._now = now + timedelta(seconds=10)  # type: ignore[attr-defined]
+    with pytest.raises(SessionNotFound):
+        identity.authenticate_session(other.session_id)
+
+
+def test_async_signed_sessions():
+    now = datetime(2026, 2, 8, tzinfo=timezone.utc)
+    identity = AsyncIdentityService(
+        config=IdentityConfig(**SIGNED),
+        users=AsyncMem(MemUsers()),
+        sessions=AsyncMem(MemSessions()),
+        hasher=AsyncFakeHasher(),
+        ids=FixedIds(),
+        clock=FixedClock(now),
+    )
+
+    async def scenario():
+        u = await identity.create_user(CreateUserCmd(email="a@example.com", password="pw"))
+        auth = await identity.login(LoginCmd(email="a@example.com", password="pw"))
+        assert await identity.authenticate_session(auth.session_id) == u.user_id
+        await identity.logout(LogoutCmd(session_id=auth.session_id))
+        with pytest.raises(SessionNotFound):
+            await identity.authenticate_session(auth.session_id)
+
+    asyncio.run(scenario())
+
+
+def test_signed_mode_requires_secret():
+    with pytest.raises(ValueError):
+        build_identity_with(IdentityConfig(session_mode="signed"))
+
+
+def build_identity_with(config: IdentityConfig) -> IdentityService:
+    return IdentityService(
+        config=config,
+        users=MemUsers(),
+        sessions=MemSessions(),
+        hasher=FakeHasher(),
+        ids=FixedIds(),
+        clock=FixedClock(datetime(2026, 2, 8, tzinfo=timezone.utc)),
+    )
+
+
+class BatchFakeHasher(FakeHasher):
+    def __init__(self):
+        self.batches = []
+
+    def hash_many(self, passwords):
+        self.batches.append(list(passwords))
+        return [self.hash_password(p) for p in passwords]
+
+
+def test_create_users_reports_per_row_results_and_hashes_in_one_batch():
+    now = datetime(2026, 2, 8, tzinfo=timezone.utc)
+    identity = build_identity(now)
+    identity._hasher = hasher = BatchFakeHasher()  # type: ignore[attr-defined]
+    identity.create_user(CreateUserCmd(email="taken@example.com", password="pw"))
+
+    results = identity.create_users(
+        [
+            CreateUserCmd(email="a@example.com", password="pa"),
+            CreateUserCmd(email="Taken@example.com", password="pw"),
+            CreateUserCmd(email="b@example.com", password=""),
+            CreateUserCmd(email="A@example.com", password="pa2"),
+            CreateUserCmd(email="c@example.com", password="pc"),
+        ]
+    )
+    assert isinstance(results[0], User) and results[0].email == "a@example.com"
+    assert isinstance(results[1], UserAlreadyExists)
+    assert isinstance(results[2], ValueError)
+    assert isinstance(results[3], UserAlreadyExists)
+    assert isinstance(results[4], User)
+    assert hasher.batches == [["pa", "pc"]]
+    auth = identity.login(LoginCmd(email="c@example.com", password="pc"))
+    assert auth.user_id == results[4].user_id
+
+
+def test_async_create_users_falls_back_to_per_password_hashing():
+    now = datetime(2026, 2, 8, tzinfo=timezone.utc)
+    identity = build_async_identity(now)
+    results = asyncio.run(
+        identity.create_users(
+            [CreateUserCmd(email=f"u{i}@example.com", password="pw") for i in range(3)]
+        )
+    )
+    assert all(isinstance(r, User) for r in results)
+    assert identity._hasher.calls == 3  # type: ignore[attr-defined]
+
+
+def test_revoke_sessions_for_user_in_both_modes():
+    now = datetime(2026, 2, 8, tzinfo=timezone.utc)
+    for config in (IdentityConfig(), IdentityConfig(**SIGNED)):
+        identity = build_identity_with(config)
+        identity.create_user(CreateUserCmd(email="a@example.com", password="pw"))
+        identity.create_user(CreateUserCmd(email="b@example.com", password="pw"))
+        mine = [identity.login(LoginCmd(email="a@example.com", password="pw")) for _ in range(2)]
+        theirs = identity.login(LoginCmd(email="b@example.com", password="pw"))
+
+        revoked = identity.revoke_sessions_for_user(mine[0].user_id)
+        assert revoked == (2 if config.session_mode == "store" else 0)
+        for auth in mine:
+            with pytest.raises(SessionNotFound):
+                identity.authenticate_session(auth.session_id)
+        assert identity.authenticate_session(theirs.session_id) == theirs.user_id
+
+        identity._clock._now = now + timedelta(microseconds=1)  # type: ignore[attr-defined]
+        again = identity.login(LoginCmd(email="a@example.com", password="pw"))
+        assert identity.authenticate_session(again.session_id) == mine[0].user_id
+
+
+def test_concurrent_signups_for_one_email_create_one_user():
+    now = datetime(2026, 2, 8, tzinfo=timezone.utc)
+    identity = build_async_identity(now)
+
+    class YieldingHasher(AsyncFakeHasher):
+        async def hash_password(self, password: str) -> str:
+            await asyncio.sleep(0)
+            return await super().hash_password(password)
+
+    identity._hasher = YieldingHasher()  # type: ignore[attr-defined]
+
+    async def scenario():
+        cmd = CreateUserCmd(email="a@example.com", password="pw")
+        # Both lookups run before either insert (hashing yields to the loop).
+        return await asyncio.gather(
+            identity.create_user(cmd), identity.create_user(cmd), return_exceptions=True
+        )
+
+    results = asyncio.run(scenario())
+    assert sum(isinstance(r, User) for r in results) == 1
+    assert sum(isinstance(r, UserAlreadyExists) for r in results) == 1
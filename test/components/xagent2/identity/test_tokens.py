@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+from xagent2.identity.tokens import (
+    RevocationList,
+    SessionTokenCodec,
+    SignedSessions,
+    TokenRevocations,
+)
+
+NOW = datetime(2026, 2, 8, tzinfo=timezone.utc)
+
+
+def test_codec_round_trip_and_rejects_tampering():
+    codec = SessionTokenCodec(b"k" * 32)
+    token = codec.encode("user-1", NOW)
+    user_id, expires_us, _mac = codec.decode(token)
+    assert user_id == "user-1"
+    assert expires_us == int(NOW.timestamp() * 1_000_000)
+    assert codec.decode(token[:-1] + ("A" if token[-1] != "A" else "B")) is None
+    assert codec.decode("not a token!") is None
+    assert codec.decode("") is None
+    assert SessionTokenCodec(b"x" * 32).decode(token) is None
+    assert codec.encode("user-1", NOW) != token  # random nonce
+
+
+def test_revocation_list_prunes_expired_entries():
+    revoked = RevocationList(bits=1024)
+    revoked.add(b"a", expires_us=100, now_us=0)
+    revoked.add(b"b", expires_us=200, now_us=0)
+    assert b"a" in revoked and b"b" in revoked and b"c" not in revoked
+    revoked.add(b"c", expires_us=300, now_us=150)
+    assert b"a" not in revoked
+    assert len(revoked) == 2
+
+
+def test_signed_sessions_verify_and_revoke():
+    signed = SignedSessions(b"k" * 32)
+    session = signed.issue("u", NOW, NOW + timedelta(minutes=5))
+    assert signed.verify(session.session_id, NOW) == "u"
+    assert signed.verify(session.session_id, NOW + timedelta(minutes=5)) is None
+    assert signed.revoke(session.session_id, NOW)
+    assert not signed.revoke(session.session_id, NOW)
+    assert signed.verify(session.session_id, NOW) is None
+
+
+def test_signed_sessions_sharing_revocations_see_each_others_logouts():
+    revocations = TokenRevocations()
+    first = SignedSessions(b"k" * 32, revocations)
+    second = SignedSessions(b"k" * 32, revocations)
+    session = first.issue("u", NOW, NOW + timedelta(minutes=5))
+    other = first.issue("u", NOW, NOW + timedelta(minutes=5))
+    assert first.revoke(session.session_id, NOW)
+    assert second.verify(session.session_id, NOW) is None
+    assert second.verify(other.session_id, NOW) == "u"
+    second.revoke_user("u", NOW, NOW + timedelta(minutes=5))
+    assert first.verify(other.session_id, NOW) is None
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from xagent2.identity_api.core import Session, User, UserAlreadyExists
+from xagent2.identity_sqlite.core import (
+    SqliteConnectionPool,
+    SqliteSessionStore,
+    SqliteUserRepo,
+)
+
+NOW = datetime(2026, 2, 8, 12, 30, 15, 123456, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = SqliteConnectionPool(tmp_path / "identity.db", size=2)
+    yield pool
+    pool.close()
+
+
+def test_pool_uses_wal(pool):
+    with pool.connection() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_user_repo_round_trip_and_unique_email(pool):
+    repo = SqliteUserRepo(pool)
+    user = User(user_id="u1", email="a@example.com", password_hash="h", is_active=True)
+    repo.create(user)
+
+    assert repo.get_by_email("a@example.com") == user
+    assert repo.get_by_id("u1") == user
+    assert repo.get_by_email("b@example.com") is None
+    with pytest.raises(UserAlreadyExists):
+        repo.create(User(user_id="u2", email="a@example.com", password_hash="h"))
+    assert not repo.create_if_absent(User(user_id="u2", email="a@example.com", password_hash="h"))
+    assert repo.create_if_absent(User(user_id="u2", email="b@example.com", password_hash="h"))
+
+
+def test_session_store_round_trip_and_delete(pool):
+    store = SqliteSessionStore(pool)
+    sess = Session(session_id="s1", user_id="u1", created_at=NOW, expires_at=NOW + timedelta(hours=1))
+    store.create_session(sess)
+
+    assert store.get_session("s1") == sess
+    store.delete_session("s1")
+    assert store.get_session("s1") is None
+
+
+def test_session_store_bulk_deletes_expired(pool):
+    store = SqliteSessionStore(pool)
+    for i in range(3):
+        store.create_session(
+            Session(session_id=f"old{i}", user_id="u", created_at=NOW, expires_at=NOW)
+        )
+    store.create_session(
+        Session(session_id="new", user_id="u", created_at=NOW, expires_at=NOW + timedelta(days=1))
+    )
+
+    assert store.delete_expired(NOW + timedelta(seconds=1)) == 3
+    assert store.get_session("new") is not None
+
+
+def test_session_store_sweeps_expired_while_creating(pool):
+    class Clock:
+        def now(self):
+            return NOW
+
+    store = SqliteSessionStore(pool, clock=Clock(), sweep_every=4, sweep_batch=2)
+    for i in range(3):
+        store.create_session(
+            Session(session_id=f"old{i}", user_id="u", created_at=NOW, expires_at=NOW)
+        )
+    live = Session(
+        session_id="new", user_id="u", created_at=NOW, expires_at=NOW + timedelta(hours=1)
+    )
+    store.create_session(live)  # 4th write: sweeps two of the three expired
+
+    with pool.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0] == 2
+    assert store.get_session("new") == live
+
+
+def test_data_survives_reopen(tmp_path):
+    path = tmp_path / "identity.db"
+    pool = SqliteConnectionPool(path)
+    SqliteUserRepo(pool).create(User(user_id="u1", email="a@example.com", password_hash="h"))
+    pool.close()
+
+    pool = SqliteConnectionPool(path)
+    try:
+        assert SqliteUserRepo(pool).get_by_id("u1") is not None
+    finally:
+        pool.close()
+
+
+def test_user_repo_create_many_in_one_transaction(pool):
+    repo = SqliteUserRepo(pool)
+    repo.create(User(user_id="u0", email="a@example.com", password_hash="h"))
+    created = repo.create_many(
+        [
+            User(user_id="u1", email="a@example.com", password_hash="h"),
+            User(user_id="u2", email="b@example.com", password_hash="h"),
+            User(user_id="u3", email="b@example.com", password_hash="h"),
+            User(user_id="u4", email="c@example.com", password_hash="h", is_active=False),
+        ]
+    )
+    assert created == [False, True, False, True]
+    assert repo.get_by_email("b@example.com").user_id == "u2"
+    assert repo.get_by_id("u4").is_active is False
+
+
+def test_session_store_deletes_sessions_for_user(pool):
+    store = SqliteSessionStore(pool)
+    for i, user_id in enumerate(["u1", "u1", "u2"]):
+        store.create_session(
+            Session(session_id=f"s{i}", user_id=user_id, created_at=NOW, expires_at=NOW)
+        )
+    assert store.delete_sessions_for_user("u1") == 2
+    assert store.get_session("s0") is None
+    assert store.get_session("s2") is not None
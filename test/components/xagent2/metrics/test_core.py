@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import asyncio
+
+from xagent2.metrics.core import InstrumentedPort, MetricsRegistry
+
+
+def test_histogram_renders_cumulative_prometheus_buckets():
+    registry = MetricsRegistry()
+    hist = registry.histogram("op_seconds", "Op latency.", ("op",), buckets=(0.1, 1.0))
+    child = hist.labels(op="read")
+    for value in (0.05, 0.5, 0.5, 3.0):
+        child.observe(value)
+
+    text = registry.render()
+    assert "# TYPE op_seconds histogram" in text
+    assert 'op_seconds_bucket{op="read",le="0.1"} 1' in text
+    assert 'op_seconds_bucket{op="read",le="1"} 3' in text
+    assert 'op_seconds_bucket{op="read",le="+Inf"} 4' in text
+    assert 'op_seconds_count{op="read"} 4' in text
+    assert 'op_seconds_sum{op="read"} 4.05' in text
+
+
+def test_counter_and_callback_gauge_render():
+    registry = MetricsRegistry()
+    registry.counter("hits", "Hits.", ("kind",)).labels(kind='a"b').inc(2)
+    registry.gauge_callback("size", "Size.", lambda: 7)
+    registry.gauge_callback("stats", "Stats.", lambda: {("hits",): 3, ("misses",): 1}, ("stat",))
+
+    text = registry.render()
+    assert 'hits_total{kind="a\\"b"} 2' in text
+    assert "size 7" in text
+    assert 'stats{stat="hits"} 3' in text
+
+
+def test_registry_returns_existing_family():
+    registry = MetricsRegistry()
+    assert registry.histogram("x", "X.") is registry.histogram("x", "X.")
+
+
+class Port:
+    def lookup(self, key):
+        return key * 2
+
+    async def fetch(self, key):
+        return key + 1
+
+    def __call__(self, key):
+        return -key
+
+
+def test_instrumented_port_times_sync_async_and_call():
+    registry = MetricsRegistry()
+    hist = registry.histogram("port_seconds", "Port latency.", ("port", "method"))
+    port = InstrumentedPort(Port(), hist, "demo")
+
+    assert port.lookup(2) == 4
+    assert asyncio.run(port.fetch(2)) == 3
+    assert port(2) == -2
+
+    text = registry.render()
+    for method in ("lookup", "fetch", "call"):
+        assert f'port_seconds_count{{port="demo",method="{method}"}} 1' in text
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from xagent2.query_service.batching import MicroBatcher
+from xagent2.query_service.core import Query, answer_queries
+
+
+class RecordingBackend:
+    def __init__(self):
+        self.batches: list[list[str]] = []
+        self._lock = threading.Lock()
+
+    def __call__(self, queries):
+        with self._lock:
+            self.batches.append([q.text for q in queries])
+        return answer_queries(queries)
+
+
+def test_concurrent_queries_are_batched_and_fanned_out():
+    backend = RecordingBackend()
+    sizes = []
+    batcher = MicroBatcher(
+        backend, max_batch_size=4, max_wait_ms=200, on_batch=lambda n, _: sizes.append(n)
+    )
+    try:
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda i: batcher(Query(text=f"q{i}")), range(8)))
+    finally:
+        batcher.close()
+
+    assert [r.text for r in results] == [f"Echo: q{i}" for i in range(8)]
+    assert max(sizes) > 1
+    assert all(n <= 4 for n in sizes)
+    stats = batcher.stats()
+    assert stats.items == 8
+    assert stats.batches == len(backend.batches) == len(sizes)
+
+
+def test_single_query_is_sent_after_max_wait():
+    backend = RecordingBackend()
+    batcher = MicroBatcher(backend, max_batch_size=100, max_wait_ms=1)
+    try:
+        assert batcher(Query(text="alone")).text == "Echo: alone"
+    finally:
+        batcher.close()
+    assert backend.batches == [["alone"]]
+
+
+def test_bad_query_only_fails_its_own_caller():
+    batcher = MicroBatcher(answer_queries, max_batch_size=2, max_wait_ms=200)
+    try:
+        good = batcher.submit(Query(text="fine"))
+        bad = batcher.submit(Query(text="  "))
+        assert good.result(timeout=5).text == "Echo: fine"
+        with pytest.raises(ValueError):
+            bad.result(timeout=5)
+    finally:
+        batcher.close()
+
+
+def test_closed_batcher_rejects_new_queries():
+    batcher = MicroBatcher(answer_queries)
+    batcher.close()
+    with pytest.raises(RuntimeError):
+        batcher(Query(text="late"))
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from xagent2.query_service.cache import CachedAnswerer
+from xagent2.query_service.core import Query, answer_query
+
+
+class CountingAnswer:
+    def __init__(self, gate: threading.Event | None = None):
+        self.calls = 0
+        self._gate = gate
+
+    def __call__(self, query: Query):
+        self.calls += 1
+        if self._gate is not None:
+            self._gate.wait(timeout=5)
+        return answer_query(query)
+
+
+class ManualClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_normalized_queries_share_an_entry():
+    backend = CountingAnswer()
+    cached = CachedAnswerer(backend)
+
+    first = cached(Query(text="Reset  password"))
+    second = cached(Query(text=" reset password "))
+    assert second is first
+    assert backend.calls == 1
+    assert cached.stats().hit_rate == 0.5
+
+
+def test_entries_expire_after_ttl():
+    backend = CountingAnswer()
+    clock = ManualClock()
+    cached = CachedAnswerer(backend, ttl_seconds=10, clock=clock)
+
+    cached(Query(text="hello"))
+    clock.now = 11
+    cached(Query(text="hello"))
+    assert backend.calls == 2
+
+
+def test_lru_eviction_bounds_size():
+    cached = CachedAnswerer(CountingAnswer(), max_entries=2)
+    for text in ("a", "b", "c"):
+        cached(Query(text=text))
+    stats = cached.stats()
+    assert stats.size == 2
+    assert stats.evictions == 1
+
+
+def test_concurrent_identical_queries_are_coalesced():
+    gate = threading.Event()
+    backend = CountingAnswer(gate)
+    cached = CachedAnswerer(backend)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = [pool.submit(cached, Query(text="same")) for _ in range(8)]
+        deadline = time.monotonic() + 5
+        while cached.stats().coalesced + cached.stats().misses < 8:
+            assert time.monotonic() < deadline
+            time.sleep(0.001)
+        gate.set()
+        answers = {id(f.result()) for f in futures}
+
+    assert backend.calls == 1
+    assert len(answers) == 1
+    assert cached.stats().coalesced == 7
+
+
+def test_failures_are_not_cached():
+    backend = CountingAnswer()
+    cached = CachedAnswerer(backend)
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            cached(Query(text="   "))
+    assert backend.calls == 2
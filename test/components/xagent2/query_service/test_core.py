@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import pytest
 
-from xagent2.query_service.core import Query, answer_query
+from xagent2.query_service.core import Answer, Query, answer_query, chunked, stream_answer
 
 
 def test_answer_query_echoes_text():
@@ -13,3 +13,28 @@ def test_answer_query_echoes_text():
 def test_answer_query_rejects_empty():
     with pytest.raises(ValueError):
         answer_query(Query(text="   "))
+
+
+def test_stream_answer_chunks_join_to_full_answer():
+    chunks = list(stream_answer(Query(text="hello  there")))
+    assert [c.index for c in chunks] == list(range(len(chunks)))
+    assert "".join(c.text for c in chunks) == answer_query(Query(text="hello  there")).text
+
+
+def test_stream_answer_validates_eagerly():
+    with pytest.raises(ValueError):
+        stream_answer(Query(text=""))
+
+
+def test_chunked_streams_any_answerer_and_fails_early():
+    def shout(query: Query) -> Answer:
+        if not query.text:
+            raise ValueError("empty")
+        return answer_query(Query(text=query.text.upper()))
+
+    stream = chunked(shout)
+    chunks = list(stream(Query(text="hi  there")))
+    assert "".join(c.text for c in chunks) == "Echo: HI  THERE"
+    assert [c.index for c in chunks] == list(range(len(chunks)))
+    with pytest.raises(ValueError):
+        stream(Query(text=""))
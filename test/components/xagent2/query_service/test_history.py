@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import threading
+from datetime import datetime, timezone
+
+import pytest
+
+from xagent2.query_service.core import Answer, Query, answer_query
+from xagent2.query_service.history import ConversationalAnswerer, ConversationHistory
+
+AT = datetime(2026, 5, 1, 12, 0, 0, 123456, tzinfo=timezone.utc)
+
+
+def _answer(text: str) -> Answer:
+    return Answer(text=text, created_at=AT)
+
+
+def test_ring_keeps_newest_turns_in_order():
+    history = ConversationHistory(turns_per_user=3)
+    for i in range(5):
+        assert history.append("u", f"q{i}", _answer(f"a{i}")) == i
+
+    window = history.window("u")
+    assert [(t.seq, t.query, t.answer) for t in window.turns] == [
+        (2, "q2", "a2"),
+        (3, "q3", "a3"),
+        (4, "q4", "a4"),
+    ]
+    assert (window.first, window.end) == (2, 5)
+    assert window.turns[0].created_at == AT
+    assert history.stats().dropped_turns == 2
+    assert history.window("nobody").turns == ()
+
+
+def test_incremental_reader_sees_only_new_turns():
+    history = ConversationHistory(turns_per_user=3)
+    context, cursor = [], 0
+
+    def refresh():
+        nonlocal cursor
+        window = history.window("u", since=cursor)
+        context.extend(window.turns)
+        context[:] = [t for t in context if t.seq >= window.first]
+        cursor = window.end
+        return window.turns
+
+    history.append("u", "q0", _answer("a0"))
+    assert [t.query for t in refresh()] == ["q0"]
+    assert refresh() == ()
+    for i in range(1, 5):
+        history.append("u", f"q{i}", _answer(f"a{i}"))
+    assert [t.query for t in refresh()] == ["q2", "q3", "q4"]
+    assert [t.query for t in context] == ["q2", "q3", "q4"]
+
+    # Evicted and back: the reader's copies all fall below the new window.
+    history.forget("u")
+    history.append("u", "fresh", _answer("x"))
+    refresh()
+    assert [t.query for t in context] == ["fresh"]
+
+
+def test_least_recently_used_users_are_evicted():
+    history = ConversationHistory(turns_per_user=2, max_users=2)
+    history.append("a", "q", _answer("x"))
+    history.append("b", "q", _answer("x"))
+    history.window("a")  # reads count as use
+    history.append("c", "q", _answer("x"))
+    assert history.window("b").turns == ()
+    assert len(history.window("a").turns) == 1
+    stats = history.stats()
+    assert (stats.users, stats.turns, stats.evicted_users) == (2, 2, 1)
+
+
+def test_byte_limit_evicts_idle_users_then_trims_the_active_one():
+    history = ConversationHistory(turns_per_user=4, max_bytes=2_000)
+    history.append("idle", "q", _answer("x"))
+    history.append("busy", "q" * 400, _answer("a" * 400))
+    history.append("busy", "q" * 400, _answer("a" * 400))
+    assert history.window("idle").turns == ()
+    assert history.stats().evicted_users == 1
+    assert history.stats().bytes <= 2_000
+
+    # One turn alone is over the limit; it still stays, as the only one.
+    history.append("busy", "q" * 1200, _answer("a" * 1200))
+    window = history.window("busy")
+    assert [t.seq for t in window.turns] == [window.end - 1]
+    assert history.stats().dropped_turns == 2
+
+    history.forget("busy")
+    stats = history.stats()
+    assert (stats.users, stats.turns, stats.bytes) == (0, 0, 0)
+
+
+def test_invalid_limits():
+    with pytest.raises(ValueError):
+        ConversationHistory(turns_per_user=0)
+    with pytest.raises(ValueError):
+        ConversationHistory(max_bytes=0)
+
+
+def test_answerer_passes_context_and_records_turns():
+    seen = []
+
+    def backend(query: Query) -> Answer:
+        seen.append([t.query for t in query.context])
+        return answer_query(query)
+
+    answerer = ConversationalAnswerer(backend, ConversationHistory(turns_per_user=2))
+    answerer(Query(text="one", user_id="u"))
+    answerer(Query(text="two", user_id="u"))
+    answerer(Query(text="three", user_id="u"))
+    answerer(Query(text="other", user_id="v"))
+    answerer(Query(text="anonymous"))
+    assert seen == [[], ["one"], ["one", "two"], [], []]
+    assert [t.answer for t in answerer.history.window("u").turns] == ["Echo: two", "Echo: three"]
+
+
+def test_answerer_reads_only_new_turns():
+    history = ConversationHistory(turns_per_user=3)
+    read = []
+    window = history.window
+
+    def counting_window(user_id: str, since: int = 0):
+        result = window(user_id, since)
+        read.append(len(result.turns))
+        return result
+
+    history.window = counting_window
+    seen = []
+
+    def backend(query: Query) -> Answer:
+        seen.append([t.query for t in query.context])
+        return answer_query(query)
+
+    answerer = ConversationalAnswerer(backend, history)
+    for text in ["a", "b", "c", "d", "e"]:
+        answerer(Query(text=text, user_id="u"))
+    assert seen == [[], ["a"], ["a", "b"], ["a", "b", "c"], ["b", "c", "d"]]
+    assert read == [0, 1, 1, 1, 1]
+
+    # Forgotten turns are dropped from the kept context as well.
+    history.forget("u")
+    answerer(Query(text="f", user_id="u"))
+    assert seen[-1] == []
+
+
+def test_concurrent_appends_keep_counts_consistent():
+    history = ConversationHistory(turns_per_user=8, max_users=16)
+
+    def work(n: int):
+        for i in range(200):
+            history.append(f"u{(n * 7 + i) % 40}", "q", _answer("a"))
+            history.window(f"u{i % 40}")
+
+    threads = [threading.Thread(target=work, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    stats = history.stats()
+    assert stats.users == 16
+    assert stats.turns == sum(len(history.window(f"u{i}").turns) for i in range(40))
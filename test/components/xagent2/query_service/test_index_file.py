@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import pytest
+
+from xagent2.query_service import retrieval
+from xagent2.query_service.core import Query
+from xagent2.query_service.index_file import IndexFormatError, MmapIndex, write_index
+from xagent2.query_service.retrieval import IndexBuilder, RetrievalAnswerer
+
+DOCS = {
+    "pw": "How do I reset my password? Open settings and choose reset password.",
+    "email": "Change the email address on your account from the profile page.",
+    "billing": "Invoices and billing history are listed under billing.",
+    "2fa": "Enable two factor authentication to protect your account password.",
+    "uni": "Zürich café opening hours",
+}
+
+
+@pytest.fixture(params=["numpy", "python"])
+def scoring(request, monkeypatch):
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(retrieval, "np", None)
+    return request.param
+
+
+def build(store_text: bool = True):
+    builder = IndexBuilder(store_text=store_text)
+    builder.add_many(DOCS.items())
+    return builder.build()
+
+
+def test_mmap_index_searches_like_in_memory_index(tmp_path, scoring):
+    index = build()
+    path = tmp_path / "corpus.idx"
+    write_index(index, path)
+
+    with MmapIndex(path) as mapped:
+        assert len(mapped) == len(index)
+        assert mapped.vocabulary_size == index.vocabulary_size
+        for query in ("reset password", "account", "café zürich", "billing history", "nothing"):
+            assert mapped.search(query, k=3) == index.search(query, k=3)
+        hit = mapped.search("invoices", k=1)[0]
+        assert hit.doc_id == "billing"
+        assert mapped.document_text(hit.doc_no) == DOCS["billing"]
+
+
+def test_mmap_index_without_texts(tmp_path):
+    path = tmp_path / "corpus.idx"
+    write_index(build(store_text=False), path)
+    with MmapIndex(path) as mapped:
+        assert mapped.document_text(0) is None
+
+
+def test_retrieval_answerer_over_mmap_index(tmp_path):
+    path = tmp_path / "corpus.idx"
+    write_index(build(), path)
+    with MmapIndex(path) as mapped:
+        answer = RetrievalAnswerer(mapped)
+        assert answer(Query(text="two factor")).text == DOCS["2fa"]
+
+
+def test_rejects_foreign_and_future_files(tmp_path):
+    bogus = tmp_path / "bogus.idx"
+    bogus.write_bytes(b"not an index at all, just some bytes padding it out" * 2)
+    with pytest.raises(IndexFormatError):
+        MmapIndex(bogus)
+
+    path = tmp_path / "corpus.idx"
+    write_index(build(), path)
+    raw = bytearray(path.read_bytes())
+    raw[8] = 99  # format version
+    path.write_bytes(bytes(raw))
+    with pytest.raises(IndexFormatError):
+        MmapIndex(path)
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import json
+import math
+import random
+
+import pytest
+
+from xagent2.query_service import retrieval
+from xagent2.query_service.core import Query
+from xagent2.query_service.retrieval import (
+    IndexBuilder,
+    RetrievalAnswerer,
+    load_jsonl_corpus,
+    tokenize,
+)
+
+DOCS = {
+    "pw": "How do I reset my password? Open settings and choose reset password.",
+    "email": "Change the email address on your account from the profile page.",
+    "billing": "Invoices and billing history are listed under billing.",
+    "2fa": "Enable two factor authentication to protect your account password.",
+}
+
+
+@pytest.fixture(params=["numpy", "python"])
+def scoring(request, monkeypatch):
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(retrieval, "np", None)
+    return request.param
+
+
+def build(docs):
+    builder = IndexBuilder()
+    builder.add_many(docs.items())
+    return builder.build()
+
+
+def brute_force_bm25(docs, query, k1=1.2, b=0.75):
+    tokenized = {doc_id: tokenize(text) for doc_id, text in docs.items()}
+    n = len(docs)
+    avgdl = sum(len(t) for t in tokenized.values()) / n
+    scores = {}
+    for term in set(tokenize(query)):
+        df = sum(1 for toks in tokenized.values() if term in toks)
+        if not df:
+            continue
+        idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+        for doc_id, toks in tokenized.items():
+            tf = toks.count(term)
+            if tf:
+                norm = k1 * (1 - b + b * len(toks) / avgdl)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+    return scores
+
+
+def test_search_matches_reference_bm25(scoring):
+    index = build(DOCS)
+    hits = index.search("reset password", k=10)
+    expected = brute_force_bm25(DOCS, "reset password")
+
+    assert hits[0].doc_id == "pw"
+    assert {h.doc_id for h in hits} == set(expected)
+    for hit in hits:
+        assert hit.score == pytest.approx(expected[hit.doc_id])
+
+
+def test_early_termination_keeps_exact_top_k(scoring):
+    rng = random.Random(7)
+    vocab = [f"w{i}" for i in range(200)]
+    weights = [1 / (i + 1) for i in range(len(vocab))]
+    docs = {
+        f"d{i}": " ".join(rng.choices(vocab, weights=weights, k=rng.randint(5, 40)))
+        for i in range(500)
+    }
+    index = build(docs)
+    for _ in range(20):
+        query = " ".join(rng.choices(vocab, k=4))
+        expected = brute_force_bm25(docs, query)
+        best = sorted(expected.values(), reverse=True)[:5]
+        hits = index.search(query, k=5)
+        assert [h.score for h in hits] == pytest.approx(best)
+
+
+def test_unknown_terms_return_nothing(scoring):
+    assert build(DOCS).search("kubernetes", k=3) == []
+
+
+def test_retrieval_answerer_uses_best_document_and_falls_back(tmp_path):
+    corpus = tmp_path / "corpus.jsonl"
+    corpus.write_text("\n".join(json.dumps({"id": k, "text": v}) for k, v in DOCS.items()))
+    answer = RetrievalAnswerer(load_jsonl_corpus(corpus))
+
+    assert answer(Query(text="how to reset password")).text == DOCS["pw"]
+    assert answer(Query(text="kubernetes")).text == "Echo: kubernetes"
+    assert [a.text for a in answer.answer_many([Query(text="billing"), Query(text="x")])] == [
+        DOCS["billing"],
+        "Echo: x",
+    ]
+    with pytest.raises(ValueError):
+        answer(Query(text=" "))
+
+
+def test_ties_at_the_kth_score_go_to_the_lowest_doc_number(monkeypatch):
+    pytest.importorskip("numpy")
+    rng = random.Random(3)
+    # Few distinct texts, so many documents score exactly the same.
+    texts = ["reset password", "password help", "reset the device", "billing"]
+    docs = {f"d{i}": rng.choice(texts) for i in range(60)}
+    index = build(docs)
+    queries = ("reset password", "password", "reset", "billing help")
+    cases = [(q, k) for q in queries for k in (1, 3, 7)]
+    with_numpy = {(q, k): [h.doc_id for h in index.search(q, k=k)] for q, k in cases}
+    monkeypatch.setattr(retrieval, "np", None)
+    for q, k in cases:
+        assert with_numpy[q, k] == [h.doc_id for h in index.search(q, k=k)]
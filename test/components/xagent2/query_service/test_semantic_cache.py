@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from xagent2.query_service.core import Query, answer_query  # noqa: E402
+from xagent2.query_service.semantic_cache import (  # noqa: E402
+    HashingEmbedder,
+    SemanticAnswerCache,
+)
+
+
+class CountingAnswer:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, query: Query):
+        self.calls += 1
+        return answer_query(query)
+
+
+def test_hashing_embedder_rows_are_unit_length():
+    vectors = HashingEmbedder(dim=64).embed(["reset my password", "how do i"])
+    assert vectors.shape == (2, 64)
+    assert np.linalg.norm(vectors[0]) == pytest.approx(1.0, rel=1e-5)
+    assert not vectors[1].any()
+
+
+def test_paraphrase_is_served_from_cache():
+    backend = CountingAnswer()
+    cache = SemanticAnswerCache(backend, HashingEmbedder(), threshold=0.9)
+
+    first = cache(Query(text="reset my password"))
+    second = cache(Query(text="How do I reset password?"))
+    assert second is first
+    assert backend.calls == 1
+
+    cache(Query(text="billing history for march"))
+    assert backend.calls == 2
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.size) == (1, 2, 2)
+
+
+def test_lru_eviction_replaces_least_recently_used():
+    backend = CountingAnswer()
+    cache = SemanticAnswerCache(backend, HashingEmbedder(), capacity=2)
+    cache(Query(text="alpha topic"))
+    cache(Query(text="beta subject"))
+    cache(Query(text="alpha topic"))
+    cache(Query(text="gamma matter"))  # evicts "beta subject"
+
+    assert cache.stats().evictions == 1
+    calls = backend.calls
+    cache(Query(text="alpha topic"))
+    assert backend.calls == calls
+    cache(Query(text="beta subject"))
+    assert backend.calls == calls + 1
+
+
+def test_entries_expire_after_ttl():
+    now = [0.0]
+    backend = CountingAnswer()
+    cache = SemanticAnswerCache(
+        backend, HashingEmbedder(), capacity=2, ttl_seconds=10, clock=lambda: now[0]
+    )
+    cache(Query(text="alpha topic"))
+    now[0] = 9.0
+    cache(Query(text="alpha topic"))
+    assert backend.calls == 1
+
+    now[0] = 10.0
+    cache(Query(text="alpha topic"))
+    assert backend.calls == 2
+    stats = cache.stats()
+    assert (stats.expired, stats.evictions, stats.size) == (1, 0, 1)
+    cache(Query(text="beta subject"))
+    assert cache.stats().size == 2
+
+
+def test_lfu_eviction_keeps_frequently_used_entries():
+    backend = CountingAnswer()
+    cache = SemanticAnswerCache(backend, HashingEmbedder(), capacity=2, eviction="lfu")
+    cache(Query(text="alpha topic"))
+    for _ in range(3):
+        cache(Query(text="alpha topic"))
+    cache(Query(text="beta subject"))
+    cache(Query(text="gamma matter"))  # evicts "beta subject" (used once)
+
+    calls = backend.calls
+    cache(Query(text="alpha topic"))
+    assert backend.calls == calls
+
+
+def test_batched_answers_match_single_calls():
+    backend = CountingAnswer()
+    cache = SemanticAnswerCache(backend, HashingEmbedder())
+    cache(Query(text="reset my password"))
+
+    answers = cache.answer_many([Query(text="reset password"), Query(text="delete account")])
+    assert answers[0].text == "Echo: reset my password"
+    assert answers[1].text == "Echo: delete account"
+    assert cache.lookup_many(["delete my account", "unrelated words here"])[1] is None
+
+
+def test_stopword_only_queries_are_not_cached_and_empty_is_rejected():
+    backend = CountingAnswer()
+    cache = SemanticAnswerCache(backend, HashingEmbedder())
+    cache(Query(text="how do i"))
+    cache(Query(text="how do i"))
+    assert backend.calls == 2
+    with pytest.raises(ValueError):
+        cache(Query(text="  "))
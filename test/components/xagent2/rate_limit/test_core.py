@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import threading
+
+import pytest
+
+from xagent2.rate_limit.core import BucketStore, InMemoryBucketStore, RateLimit, RateLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_bucket_allows_burst_then_refills_at_rate():
+    clock = FakeClock()
+    store = InMemoryBucketStore(clock=clock)
+    limit = RateLimit(rate=2.0, burst=3)
+    assert [store.acquire("k", limit).allowed for _ in range(4)] == [True, True, True, False]
+    assert store.acquire("k", limit).retry_after == pytest.approx(0.5)
+    clock.now += 0.5
+    assert store.acquire("k", limit).allowed
+    assert not store.acquire("k", limit).allowed
+    assert store.acquire("other", limit).allowed
+
+
+def test_full_buckets_are_evicted():
+    clock = FakeClock()
+    store = InMemoryBucketStore(shards=1, clock=clock)
+    limit = RateLimit(rate=1.0, burst=2)
+    for i in range(10):
+        store.acquire(f"k{i}", limit)
+    assert len(store) == 10
+    clock.now += 1.0
+    store.acquire("fresh", limit)  # each acquire sweeps a few refilled buckets
+    assert len(store) < 10
+    store.sweep()
+    assert len(store) == 1
+    assert store.evicted == 10
+
+
+def test_max_keys_caps_memory_by_dropping_least_recently_used():
+    store = InMemoryBucketStore(shards=2, max_keys=4, clock=FakeClock())
+    limit = RateLimit.per_minute(1)
+    for i in range(100):
+        store.acquire(f"k{i}", limit)
+    assert len(store) <= 4
+
+
+def test_concurrent_acquires_never_exceed_burst():
+    store = InMemoryBucketStore(shards=4)
+    limit = RateLimit(rate=1e-6, burst=100)
+    allowed = []
+
+    def worker():
+        allowed.append(sum(store.acquire("hot", limit).allowed for _ in range(100)))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sum(allowed) == 100
+
+
+def test_limiters_namespace_keys_and_count_decisions():
+    store = InMemoryBucketStore(clock=FakeClock())
+    assert isinstance(store, BucketStore)
+    ip = RateLimiter(store, RateLimit(rate=1, burst=1), name="ip")
+    email = RateLimiter(store, RateLimit(rate=1, burst=1), name="email")
+    assert ip.acquire("x").allowed and email.acquire("x").allowed
+    assert not ip.acquire("x").allowed
+    assert ip.stats().allowed == 1 and ip.stats().rejected == 1
+
+
+def test_rate_limit_validation():
+    with pytest.raises(ValueError):
+        RateLimit(rate=0, burst=1)
+    assert RateLimit.per_minute(30) == RateLimit(rate=0.5, burst=30)
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import pytest
+
+from xagent2.service_config.core import (
+    ConfigError,
+    changed_keys,
+    freeze_config,
+    load_service_config_from_files,
+    merge_config,
+    parse_simple_yaml,
+    parse_yaml,
+    parse_yaml_text,
+)
+
+HELM_VALUES = """
+# defaults
+replicaCount: 3
+image:
+  repository: "ghcr.io/acme/assistant"   # quoted, with a comment
+  tag: '1.2'
+hosts:
+  - host: a.example.com
+    paths:
+      - /
+      - /api
+  - host: b.example.com
+    paths: [/, "/x, y"]
+resources: {limits: {cpu: 500m, memory: 128Mi}, requests: {}}
+url: http://example.com/#anchor
+empty:
+banner: |
+  hello
+    world
+summary: >-
+  one
+  two
+"""
+
+
+def test_parse_yaml_nested_mappings_and_lists():
+    assert parse_yaml_text(HELM_VALUES) == {
+        "replicaCount": 3,
+        "image": {"repository": "ghcr.io/acme/assistant", "tag": "1.2"},
+        "hosts": [
+            {"host": "a.example.com", "paths": ["/", "/api"]},
+            {"host": "b.example.com", "paths": ["/", "/x, y"]},
+        ],
+        "resources": {"limits": {"cpu": "500m", "memory": "128Mi"}, "requests": {}},
+        "url": "http://example.com/#anchor",
+        "empty": None,
+        "banner": "hello\n  world\n",
+        "summary": "one two",
+    }
+
+
+def test_parse_yaml_flat_scalars():
+    assert parse_yaml_text("a: 1\nb: true\nc: ~\nd: 2.5\ne: text # note\n") == {
+        "a": 1,
+        "b": True,
+        "c": None,
+        "d": 2.5,
+        "e": "text",
+    }
+
+
+def test_parse_simple_yaml_keeps_the_flat_behaviour(tmp_path):
+    path = tmp_path / "flat.yaml"
+    path.write_text("a:b\nq: 'x'\nh: x#y\nn:\n  k: 1\n")
+    assert parse_simple_yaml(path) == {"a": "b", "q": "'x'", "h": "x", "n": "", "k": 1}
+    path.write_text("q: 'x'\nh: x#y\nn:\n  k: 1\n")
+    assert parse_yaml(path) == {"q": "x", "h": "x#y", "n": {"k": 1}}
+    path.write_text("a:b\n")
+    with pytest.raises(ConfigError):
+        parse_yaml(path)
+
+
+@pytest.mark.parametrize(
+    "text, message",
+    [
+        ("a:\n  b: 1\n c: 2\n", "values.yaml:3: unexpected indentation"),
+        ("a: 1\na: 2\n", "duplicate key"),
+        ("a: [1, 2\n", "unterminated"),
+        ("- a\n", "top level must be a mapping"),
+        ("a:\n\tb: 1\n", "tabs"),
+    ],
+)
+def test_parse_yaml_errors_name_the_line(text, message):
+    with pytest.raises(ConfigError, match=message):
+        parse_yaml_text(text, "values.yaml")
+
+
+def test_merge_config_is_deep_and_leaves_inputs_alone():
+    base = {"limits": {"ip": 10, "email": 5}, "hosts": ["a", "b"], "name": "x"}
+    override = {"limits": {"ip": 20}, "hosts": ["c"]}
+    merged = merge_config(base, override)
+    assert merged == {"limits": {"ip": 20, "email": 5}, "hosts": ["c"], "name": "x"}
+    assert base["limits"] == {"ip": 10, "email": 5}
+
+
+def test_changed_keys_are_dotted_leaf_paths():
+    old = {"limits": {"ip": 10, "email": 5}, "name": "x", "gone": 1}
+    new = {"limits": {"ip": 20, "email": 5}, "name": {"first": "x"}, "added": 2}
+    assert changed_keys(old, new) == {"limits.ip", "name", "gone", "added"}
+
+
+def test_freeze_config_is_read_only():
+    frozen = freeze_config({"a": {"b": [1, {"c": 2}]}})
+    assert frozen["a"]["b"] == (1, {"c": 2})
+    with pytest.raises(TypeError):
+        frozen["a"]["x"] = 1
+
+
+def test_load_from_files_deep_merges_layers(tmp_path):
+    (tmp_path / "base.yaml").write_text("limits:\n  ip: 10\n  email: 5\n")
+    (tmp_path / "prod.yaml").write_text("limits:\n  ip: 20\n")
+    (tmp_path / ".env").write_text("MODE=prod\n")
+    config = load_service_config_from_files(
+        tmp_path / ".env", [tmp_path / "base.yaml", tmp_path / "prod.yaml"]
+    )
+    assert config.values == {"limits": {"ip": 20, "email": 5}, "MODE": "prod"}
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import os
+import threading
+from dataclasses import dataclass
+
+import pytest
+
+from xagent2.service_config.core import parse_service_args
+from xagent2.service_config.live import LiveServiceConfig, watch_service_args
+from xagent2.service_config.schema import ConfigSchema
+
+
+def write(path, text: str) -> None:
+    path.write_text(text)
+    # Make sure the change is visible even on filesystems with coarse mtimes.
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+@pytest.fixture
+def files(tmp_path):
+    env, base, override = tmp_path / ".env", tmp_path / "base.yaml", tmp_path / "prod.yaml"
+    write(env, "QUERY_CACHE_SIZE=100\n")
+    write(base, "ip_rate_limit: 10\nquery_cache_ttl: 60\n")
+    write(override, "ip_rate_limit: 20\n")
+    return env, base, override
+
+
+def test_initial_snapshot_matches_parse_service_args(files):
+    env, base, override = files
+    argv = ["--env", str(env), "--conf", str(base), "--conf", str(override)]
+    config = watch_service_args(argv)
+    assert dict(config.current().values) == dict(parse_service_args(argv).values)
+    with pytest.raises(TypeError):
+        config.current().values["ip_rate_limit"] = 1  # type: ignore[index]
+
+
+def test_poll_reparses_only_changed_layers(files):
+    env, base, override = files
+    config = LiveServiceConfig(env, [base, override])
+    assert config.stats().layers_parsed == 3
+
+    assert config.poll() == frozenset()
+    assert config.stats().layers_parsed == 3
+
+    before = config.current()
+    write(override, "ip_rate_limit: 30\n")
+    assert config.poll() == {"ip_rate_limit"}
+    assert config.stats().layers_parsed == 4
+    assert config.current().values["ip_rate_limit"] == 30
+    assert config.current().values["query_cache_ttl"] == 60
+    assert before.values["ip_rate_limit"] == 20  # old snapshots are untouched
+
+
+def test_subscribers_get_changed_keys(files):
+    env, base, override = files
+    config = LiveServiceConfig(env, [base, override])
+    seen = []
+    unsubscribe = config.subscribe(lambda snapshot, keys: seen.append((snapshot, keys)))
+
+    write(env, "QUERY_CACHE_SIZE=100\nSESSION_MODE=signed\n")
+    write(base, "ip_rate_limit: 11\nquery_cache_ttl: 60\n")  # shadowed by prod.yaml
+    config.poll()
+    assert len(seen) == 1
+    snapshot, keys = seen[0]
+    assert keys == {"SESSION_MODE"}
+    assert snapshot is config.current()
+
+    unsubscribe()
+    write(env, "QUERY_CACHE_SIZE=5\n")
+    assert config.poll() == {"QUERY_CACHE_SIZE", "SESSION_MODE"}
+    assert len(seen) == 1
+
+
+def test_unreadable_layer_keeps_previous_values(files):
+    env, base, override = files
+    config = LiveServiceConfig(env, [base, override])
+    failing = []
+    config.subscribe(lambda snapshot, keys: failing.append(1 / 0))
+
+    override.unlink()
+    assert config.poll() == frozenset()
+    assert config.current().values["ip_rate_limit"] == 20
+
+    write(override, "ip_rate_limit: 40\n")
+    assert config.poll() == {"ip_rate_limit"}
+    stats = config.stats()
+    assert stats.reloads == 1
+    assert stats.errors == 2  # the missing file and the broken subscriber
+    assert "subscriber" in stats.last_error
+
+
+def test_background_watcher_publishes_changes(files):
+    env, base, override = files
+    changed = threading.Event()
+    with LiveServiceConfig(env, [base, override], poll_interval=0.01) as config:
+        config.subscribe(lambda snapshot, keys: changed.set())
+        write(base, "ip_rate_limit: 10\nquery_cache_ttl: 5\n")
+        assert changed.wait(5)
+        assert config.current().values["query_cache_ttl"] == 5
+
+
+@dataclass(frozen=True, slots=True)
+class Limits:
+    ip_per_minute: float = 60.0
+    burst: int = 10
+
+
+@dataclass(frozen=True, slots=True)
+class Settings:
+    limits: Limits
+    query_cache_ttl: int = 60
+
+
+def test_nested_reload_updates_typed_settings(tmp_path):
+    env, conf = tmp_path / ".env", tmp_path / "values.yaml"
+    write(env, "")
+    write(conf, "limits:\n  ip_per_minute: 30\n  burst: 5\n")
+    config = LiveServiceConfig(env, [conf], schema=ConfigSchema(Settings))
+    assert config.settings().limits == Limits(30.0, 5)
+
+    write(conf, "limits:\n  ip_per_minute: 30\n  burst: 8\nhosts: [a, b]\n")
+    assert config.poll() == {"limits.burst", "hosts"}
+    assert config.settings().limits.burst == 8
+    assert config.current().values["hosts"] == ("a", "b")
+
+    # Values that don't fit the schema are rejected; the last good snapshot stays.
+    write(conf, "limits:\n  burst: lots\n")
+    assert config.poll() == frozenset()
+    assert config.settings().limits.burst == 8
+    assert "limits.burst" in config.stats().last_error
+
+
+def test_cache_path_skips_parsing_at_next_startup(files, tmp_path):
+    env, base, override = files
+    cache = tmp_path / "config.snapshot"
+    first = LiveServiceConfig(env, [base, override], cache_path=cache)
+    write(override, "ip_rate_limit: 50\n")
+    first.poll()
+
+    second = LiveServiceConfig(env, [base, override], cache_path=cache)
+    assert second.stats().layers_parsed == 0
+    assert second.current() == first.current()
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Literal, Optional
+
+import pytest
+
+from xagent2.service_config.core import ConfigError, parse_yaml_text
+from xagent2.service_config.schema import ConfigSchema
+
+
+@dataclass(frozen=True, slots=True)
+class Limits:
+    ip_per_minute: float = 60.0
+    burst: int = 10
+
+
+@dataclass(frozen=True, slots=True)
+class Host:
+    host: str
+    paths: tuple[str, ...] = ("/",)
+
+
+@dataclass(frozen=True, slots=True)
+class Settings:
+    limits: Limits
+    hosts: tuple[Host, ...] = ()
+    session_mode: Literal["store", "signed"] = "store"
+    redis_address: Optional[str] = None
+    debug: bool = False
+    labels: dict[str, str] = field(default_factory=dict)
+
+
+SCHEMA = ConfigSchema(Settings)
+
+
+def test_load_builds_typed_objects():
+    values = parse_yaml_text(
+        """
+limits:
+  ip_per_minute: 120
+hosts:
+  - host: a.example.com
+  - host: b.example.com
+    paths: [/api]
+session_mode: signed
+debug: "yes"
+labels: {tier: 1}
+extra: ignored
+"""
+    )
+    settings = SCHEMA.load(values)
+    assert settings == Settings(
+        limits=Limits(ip_per_minute=120.0, burst=10),
+        hosts=(Host("a.example.com"), Host("b.example.com", ("/api",))),
+        session_mode="signed",
+        debug=True,
+        labels={"tier": "1"},
+    )
+    assert isinstance(settings.limits.ip_per_minute, float)
+
+
+def test_missing_sections_use_defaults():
+    assert SCHEMA.load({}) == Settings(limits=Limits())
+
+
+@pytest.mark.parametrize(
+    "values, message",
+    [
+        ({"limits": {"burst": "many"}}, r"limits\.burst: expected an integer"),
+        ({"hosts": [{"paths": []}]}, r"hosts\[0\]\.host: required"),
+        ({"session_mode": "cookie"}, "session_mode: expected one of"),
+        ({"limits": [1]}, "limits: expected a mapping"),
+        ({"debug": 2}, "debug: expected a boolean"),
+    ],
+)
+def test_invalid_values_name_the_path(values, message):
+    with pytest.raises(ConfigError, match=message):
+        SCHEMA.load(values)
+
+
+def test_unsupported_types_fail_at_compile_time():
+    @dataclass
+    class Bad:
+        either: int | str = 0
+
+    with pytest.raises(TypeError):
+        ConfigSchema(Bad)
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import os
+
+from xagent2.service_config.core import load_service_config_from_files
+from xagent2.service_config.snapshot import (
+    load_layers,
+    load_service_config_cached,
+    service_layers,
+)
+
+
+def bump(path, text: str) -> None:
+    path.write_text(text)
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+def test_snapshot_skips_parsing_unchanged_files(tmp_path):
+    env, base, prod = tmp_path / ".env", tmp_path / "base.yaml", tmp_path / "prod.yaml"
+    env.write_text("MODE=prod\n")
+    base.write_text("limits:\n  ip: 10\n  email: 5\nhosts: [a, b]\n")
+    prod.write_text("limits:\n  ip: 20\n")
+    cache = tmp_path / "config.snapshot"
+
+    merged, parsed = load_layers(service_layers(env, [base, prod]), cache)
+    assert parsed == 3 and cache.exists()
+    assert merged == dict(load_service_config_from_files(env, [base, prod]).values)
+
+    again, parsed = load_layers(service_layers(env, [base, prod]), cache)
+    assert (again, parsed) == (merged, 0)
+
+    bump(prod, "limits:\n  ip: 30\n")
+    merged, parsed = load_layers(service_layers(env, [base, prod]), cache)
+    assert parsed == 1
+    assert merged["limits"] == {"ip": 30, "email": 5}
+
+    # Same files in another order merge differently, so the cached result is not reused.
+    swapped, parsed = load_layers(service_layers(env, [prod, base]), cache)
+    assert parsed == 0
+    assert swapped["limits"] == {"ip": 10, "email": 5}
+
+
+def test_corrupt_or_unwritable_snapshot_falls_back_to_parsing(tmp_path):
+    env, conf = tmp_path / ".env", tmp_path / "conf.yaml"
+    env.write_text("A=1\n")
+    conf.write_text("b:\n  c: [1, 2]\n")
+    cache = tmp_path / "config.snapshot"
+    cache.write_bytes(b"garbage")
+    config = load_service_config_cached(env, [conf], cache)
+    assert config.values["b"]["c"] == (1, 2)
+    assert config.values["A"] == 1
+
+    missing_dir = tmp_path / "nope" / "config.snapshot"
+    assert load_service_config_cached(env, [conf], missing_dir).values["A"] == 1
@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from xagent2.identity_api.core import Session
+from xagent2.session_cache.core import AsyncCachingSessionStore, CachingSessionStore
+
+NOW = datetime(2026, 2, 8, tzinfo=timezone.utc)
+
+
+class FixedClock:
+    def __init__(self, now: datetime):
+        self._now = now
+
+    def now(self) -> datetime:
+        return self._now
+
+
+class CountingSessions:
+    def __init__(self):
+        self.sessions = {}
+        self.gets = 0
+
+    def create_session(self, session):
+        self.sessions[session.session_id] = session
+
+    def get_session(self, session_id: str):
+        self.gets += 1
+        return self.sessions.get(session_id)
+
+    def delete_session(self, session_id: str):
+        self.sessions.pop(session_id, None)
+
+    def delete_sessions_for_user(self, user_id: str) -> int:
+        doomed = [s for s, sess in self.sessions.items() if sess.user_id == user_id]
+        for session_id in doomed:
+            del self.sessions[session_id]
+        return len(doomed)
+
+
+def make_session(session_id: str, ttl: timedelta = timedelta(hours=1)) -> Session:
+    return Session(session_id=session_id, user_id="u", created_at=NOW, expires_at=NOW + ttl)
+
+
+def build(**kwargs):
+    inner = CountingSessions()
+    clock = FixedClock(NOW)
+    return inner, clock, CachingSessionStore(inner, clock=clock, **kwargs)
+
+
+def test_hits_are_served_without_touching_inner_store():
+    inner, _, cache = build()
+    inner.create_session(make_session("s1"))
+
+    assert cache.get_session("s1") is not None
+    assert cache.get_session("s1") is not None
+    assert inner.gets == 1
+    stats = cache.stats()
+    assert (stats.hits, stats.misses) == (1, 1)
+    assert stats.hit_rate == 0.5
+
+
+def test_unknown_ids_are_negatively_cached():
+    inner, clock, cache = build(negative_ttl=timedelta(seconds=5))
+    for _ in range(10):
+        assert cache.get_session("bogus") is None
+    assert inner.gets == 1
+    assert cache.stats().negative_hits == 9
+
+    clock._now = NOW + timedelta(seconds=6)
+    cache.get_session("bogus")
+    assert inner.gets == 2
+
+
+def test_create_replaces_negative_entry():
+    _, _, cache = build()
+    assert cache.get_session("s1") is None
+    cache.create_session(make_session("s1"))
+    assert cache.get_session("s1") is not None
+
+
+def test_entry_ttl_is_capped_at_session_expiry():
+    inner, clock, cache = build(ttl=timedelta(minutes=5))
+    inner.create_session(make_session("s1", ttl=timedelta(seconds=10)))
+    cache.get_session("s1")
+
+    clock._now = NOW + timedelta(seconds=11)
+    cache.get_session("s1")
+    assert inner.gets == 2
+
+
+def test_delete_invalidates_cached_session():
+    inner, _, cache = build()
+    cache.create_session(make_session("s1"))
+    cache.delete_session("s1")
+    assert cache.get_session("s1") is None
+    assert "s1" not in inner.sessions
+
+
+def test_lru_bound_evicts_least_recently_used():
+    inner, _, cache = build(max_entries=2)
+    for sid in ("a", "b", "c"):
+        inner.create_session(make_session(sid))
+    cache.get_session("a")
+    cache.get_session("b")
+    cache.get_session("a")
+    cache.get_session("c")
+
+    assert cache.stats().size == 2
+    gets = inner.gets
+    cache.get_session("b")
+    assert inner.gets == gets + 1
+
+
+def test_rejects_non_positive_capacity():
+    with pytest.raises(ValueError):
+        CachingSessionStore(CountingSessions(), clock=FixedClock(NOW), max_entries=0)
+
+
+def test_delete_sessions_for_user_invalidates_their_cached_entries():
+    inner = CountingSessions()
+    cache = CachingSessionStore(inner, clock=FixedClock(NOW))
+    cache.create_session(make_session("a"))
+    cache.create_session(make_session("b"))
+    cache.create_session(
+        Session(session_id="c", user_id="other", created_at=NOW, expires_at=NOW + timedelta(hours=1))
+    )
+
+    assert cache.delete_sessions_for_user("u") == 2
+    assert cache.get_session("a") is None
+    assert cache.get_session("b") is None
+    assert cache.get_session("c") is not None
+
+
+class AsyncCountingSessions:
+    def __init__(self, inner: CountingSessions):
+        self.inner = inner
+        self.calls = 0
+
+    async def create_session(self, session):
+        self.calls += 1
+        self.inner.create_session(session)
+
+    async def get_session(self, session_id: str):
+        self.calls += 1
+        return self.inner.get_session(session_id)
+
+    async def delete_session(self, session_id: str):
+        self.calls += 1
+        self.inner.delete_session(session_id)
+
+    async def delete_sessions_for_user(self, user_id: str) -> int:
+        self.calls += 1
+        return self.inner.delete_sessions_for_user(user_id)
+
+
+def test_async_cache_answers_hits_without_awaiting_inner_store():
+    inner = AsyncCountingSessions(CountingSessions())
+    cache = AsyncCachingSessionStore(inner, clock=FixedClock(NOW))
+
+    async def scenario():
+        await cache.create_session(make_session("s1"))
+        for _ in range(3):
+            assert (await cache.get_session("s1")).session_id == "s1"
+        assert await cache.get_session("bogus") is None
+        assert await cache.get_session("bogus") is None
+        assert inner.calls == 2  # the create and the first unknown-ID lookup
+
+        assert await cache.delete_sessions_for_user("u") == 1
+        assert await cache.get_session("s1") is None
+
+    asyncio.run(scenario())
+    stats = cache.stats()
+    assert (stats.hits, stats.negative_hits) == (3, 1)
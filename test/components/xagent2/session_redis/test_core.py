@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from resp_server import RespServer
+
+from xagent2.identity_api.core import Session
+from xagent2.session_redis.core import (
+    RedisConnection,
+    RedisConnectionPool,
+    RedisSessionStore,
+    RespError,
+    encode_command,
+)
+
+
+class MovableClock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return MovableClock(time.time())
+
+
+@pytest.fixture
+def server(clock):
+    with RespServer(clock=clock) as server:
+        yield server
+
+
+@pytest.fixture
+def pool(server):
+    pool = RedisConnectionPool(server.host, server.port, size=4)
+    yield pool
+    pool.close()
+
+
+def _session(session_id: str, user_id: str, clock: MovableClock, ttl: float = 60.0) -> Session:
+    now = datetime.fromtimestamp(clock.now, tz=timezone.utc)
+    return Session(
+        session_id=session_id,
+        user_id=user_id,
+        created_at=now,
+        expires_at=now + timedelta(seconds=ttl),
+    )
+
+
+def test_encode_command():
+    assert encode_command(["SET", b"k", 5]) == b"*3\r\n$3\r\nSET\r\n$1\r\nk\r\n$1\r\n5\r\n"
+
+
+def test_connection_pipeline_returns_replies_in_order(server):
+    conn = RedisConnection(server.host, server.port)
+    try:
+        replies = conn.pipeline(
+            [("SET", "a", "1"), ("GET", "a"), ("BOGUS",), ("GET", "missing"), ("SADD", "s", "x")]
+        )
+        assert replies[0] == b"OK"
+        assert replies[1] == b"1"
+        assert isinstance(replies[2], RespError)
+        assert replies[3:] == [None, 1]
+        with pytest.raises(RespError, match="WRONGTYPE"):
+            conn.execute("GET", "s")
+    finally:
+        conn.close()
+
+
+def test_store_round_trip(pool, clock):
+    store = RedisSessionStore(pool)
+    session = _session("s1", "u1", clock)
+    store.create_session(session)
+
+    assert store.get_session("s1") == session
+    assert store.get_session("missing") is None
+    assert store.get_sessions(["missing", "s1"]) == [None, session]
+
+    store.delete_session("s1")
+    assert store.get_session("s1") is None
+    assert store.delete_sessions_for_user("u1") == 0
+
+
+def test_sessions_expire_server_side(pool, clock):
+    store = RedisSessionStore(pool)
+    store.create_session(_session("short", "u1", clock, ttl=10))
+    store.create_session(_session("long", "u1", clock, ttl=100))
+
+    clock.now += 11
+    assert store.get_session("short") is None
+    assert store.get_session("long") is not None
+
+    # The per-user index lives as long as the user's longest session.
+    clock.now += 90
+    assert pool.execute("EXISTS", "xagent2:user-sessions:u1") == 0
+
+
+def test_user_index_drops_expired_ids_on_create(pool, clock):
+    store = RedisSessionStore(pool)
+    for i in range(5):
+        store.create_session(_session(f"old{i}", "u1", clock, ttl=10))
+        store.create_session(_session(f"live{i}", "u1", clock, ttl=1000))
+    assert pool.execute("ZCARD", "xagent2:user-sessions:u1") == 10
+
+    clock.now += 11
+    store.create_session(_session("new", "u1", clock, ttl=10))
+    assert pool.execute("ZCARD", "xagent2:user-sessions:u1") == 6
+    assert store.delete_sessions_for_user("u1") == 6
+
+
+def test_delete_sessions_for_user(pool, clock):
+    store = RedisSessionStore(pool)
+    for i in range(3):
+        store.create_session(_session(f"a{i}", "alice", clock))
+    store.create_session(_session("b0", "bob", clock))
+
+    assert store.delete_sessions_for_user("alice") == 3
+    assert store.get_sessions(["a0", "a1", "a2", "b0"])[:3] == [None, None, None]
+    assert store.get_session("b0") is not None
+    assert store.delete_sessions_for_user("alice") == 0
+
+
+def test_prefix_separates_stores(pool, clock):
+    one = RedisSessionStore(pool, prefix="one:")
+    two = RedisSessionStore(pool, prefix="two:")
+    one.create_session(_session("s", "u", clock))
+    assert two.get_session("s") is None
+
+
+def test_pool_reuses_connections_and_caps_concurrency(server, clock):
+    pool = RedisConnectionPool(server.host, server.port, size=2)
+    store = RedisSessionStore(pool)
+    seen: set[int] = set()
+    errors: list[BaseException] = []
+
+    def work(worker: int) -> None:
+        try:
+            for i in range(50):
+                sid = f"{worker}-{i}"
+                store.create_session(_session(sid, f"u{worker}", clock))
+                assert store.get_session(sid).user_id == f"u{worker}"
+                with pool.connection() as conn:
+                    seen.add(id(conn))
+        except BaseException as exc:  # pragma: no cover - surfaced below
+            errors.append(exc)
+
+    threads = [threading.Thread(target=work, args=(n,)) for n in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    pool.close()
+
+    assert not errors
+    assert len(seen) <= 2
+
+
+def test_pool_keeps_connection_after_error_reply(pool):
+    with pytest.raises(RespError):
+        pool.execute("BOGUS")
+    with pool.connection() as first:
+        pass
+    with pytest.raises(RespError):
+        with pool.connection() as conn:
+            assert conn is first
+            conn.execute("BOGUS")
+    with pool.connection() as again:
+        assert again is first
+
+
+def test_pool_drops_broken_connection(server):
+    pool = RedisConnectionPool(server.host, server.port, size=1)
+    with pool.connection() as first:
+        pass
+    with pytest.raises(ConnectionError):
+        with pool.connection() as conn:
+            raise ConnectionError("lost")
+    with pool.connection() as fresh:
+        assert fresh is not first
+        assert fresh.execute("PING") == b"PONG"
+    pool.close()
+    with pytest.raises(RuntimeError):
+        pool.execute("PING")